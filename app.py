@@ -1,8 +1,10 @@
 from __future__ import annotations
 
+import argparse
 import os
 from typing import Optional
 
+from utils.metrics import metrics
 from utils.movie_db import MovieDB
 from core.entities.movie import Movie
 
@@ -11,6 +13,13 @@ from recommender.strategies import (            # <<< добавили импо
     UserGenreRecommendationStrategy,
     RatingStrategy,
 )
+from recommender.collaborative import (
+    ItemSimilarityModel,
+    ItemSimilarityStrategy,
+    SimilarUsersStrategy,
+)
+from recommender.query import RecommendationQuery
+from recommender.similarity import UserLSHIndex
 
 # ===== Цвета ANSI =====
 RESET = "\033[0m"
@@ -30,19 +39,42 @@ class ConsoleUser:
         self.name = name
         self.ratings: dict[int, float] = {}      # {movie_id: score}
         self.preferred_genres: list[str] = []    # любимые жанры (строки)
+        self._listeners: list = []               # наблюдатели (модели рекомендаций)
+
+    def add_listener(self, listener) -> None:
+        """
+        Подписывает объект с методами on_rate(user, movie_id, score)
+        и on_preferences(user).
+        """
+        self._listeners.append(listener)
 
     def rate(self, movie_id: int, score: float) -> None:
         self.ratings[movie_id] = score
+        for listener in self._listeners:
+            listener.on_rate(self, movie_id, score)
 
     def get_rating(self, movie_id: int) -> Optional[float]:
         return self.ratings.get(movie_id)
 
     def set_preferences(self, genres: list[str]) -> None:
         self.preferred_genres = genres
+        for listener in self._listeners:
+            listener.on_preferences(self)
 
 
 class ConsoleApp:
-    def __init__(self) -> None:
+    # куда режим профилирования выгружает статистику при выходе
+    PROFILE_PATH = "profile_stats.json"
+
+    # фильмов на странице списка
+    PAGE_SIZE = 10
+
+    def __init__(self, profile: bool = False) -> None:
+        # профилирование: замеры хранилищ, движка и стратегий (utils/metrics.py)
+        self._profile = profile
+        if profile:
+            metrics.enable(memory=True)
+
         # JSON лежит рядом с app.py
         self._db = MovieDB("test_movies.json")
 
@@ -58,9 +90,16 @@ class ConsoleApp:
             UserGenreRecommendationStrategy(top_n=5)
         )  # стратегия по умолчанию
 
+        # item-item модель обновляется при каждой оценке пользователя
+        self._item_model = ItemSimilarityModel()
+        # LSH-индекс похожих пользователей: регистрация, оценки, жанры
+        self._user_index = UserLSHIndex()
+
         self._strategies = {
             "1": UserGenreRecommendationStrategy(top_n=5),
             "2": RatingStrategy(limit=5),
+            "3": ItemSimilarityStrategy(self._item_model, top_n=5),
+            "4": SimilarUsersStrategy(self._user_index, top_n=5),
         }
 
     # ================== ГЛАВНЫЙ ЦИКЛ ==================
@@ -83,8 +122,14 @@ class ConsoleApp:
                 self._recommend_menu()
             elif choice == "6":
                 self._set_preferences()
+            elif choice == "7" and self._profile:
+                metrics.dump()
             elif choice == "0":
                 print(MAGENTA + "Выход из приложения..." + RESET)
+                if self._profile:
+                    metrics.dump()
+                    metrics.export(self.PROFILE_PATH)
+                    print(f"Статистика сохранена в {self.PROFILE_PATH}")
                 break
             else:
                 print(RED + "Неизвестная команда.\n" + RESET)
@@ -103,6 +148,8 @@ class ConsoleApp:
         print("4. Оценить фильм")
         print("5. Получить рекомендации")
         print("6. Настроить предпочтения по жанрам")
+        if self._profile:
+            print("7. Статистика производительности")
         print("0. Выход")
         print("-" * 40)
 
@@ -116,6 +163,9 @@ class ConsoleApp:
             return
 
         user = ConsoleUser(name)
+        user.add_listener(self._item_model)
+        user.add_listener(self._user_index)
+        self._user_index.add_user(user)
         self._users[name] = user
         self._current_user = user
         print(GREEN + f"Пользователь '{name}' зарегистрирован и авторизован.\n" + RESET)
@@ -135,18 +185,44 @@ class ConsoleApp:
             print(RED + "Список фильмов пуст.\n" + RESET)
             return
 
+        self._browse_movies("Enter — следующая страница, 0 — в меню: ")
+
+    def _browse_movies(self, prompt: str, last_prompt: Optional[str] = None) -> str:
+        """
+        Выводит каталог страницами по PAGE_SIZE (курсор MovieDB.page —
+        страница стоит O(PAGE_SIZE), а не O(каталога)). Пустой ввод —
+        следующая страница; первый непустой ввод возвращается вызывающему.
+        На последней странице спрашивает last_prompt (None — не спрашивает).
+        """
         print("\n" + CYAN + "Список фильмов:" + RESET)
         print("-" * 40)
-        for m in self._movies:
-            print(f"[{m.id}] {m.title} ({m.year}) — рейтинг: {m.rating}")
-        print()
+        cursor = None
+        while True:
+            page = self._db.page(limit=self.PAGE_SIZE, cursor=cursor)
+            for m in page.movies:
+                print(f"[{m.id}] {m.title} ({m.year}) — рейтинг: {m.rating}")
+
+            if page.next_cursor is None:
+                print()
+                return "" if last_prompt is None else input(last_prompt).strip()
+
+            answer = input(prompt).strip()
+            if answer:
+                return answer
+            cursor = page.next_cursor
 
     def _rate_movie(self) -> None:
         if not self._ensure_logged_in():
             return
 
-        self._show_movies()
-        raw_id = input("Введите ID фильма: ").strip()
+        if not self._movies:
+            print(RED + "Список фильмов пуст.\n" + RESET)
+            return
+
+        raw_id = self._browse_movies(
+            "Введите ID фильма (Enter — следующая страница): ",
+            "Введите ID фильма: ",
+        )
         try:
             movie_id = int(raw_id)
         except ValueError:
@@ -176,20 +252,17 @@ class ConsoleApp:
         if not self._ensure_logged_in():
             return
 
-        # собираем все жанры из фильмов
-        all_genres: set[str] = set()
-        for m in self._movies:
-            for g in m.genres:
-                all_genres.add(g)
+        # жанры каталога со счётчиками — из агрегатов MovieDB, без прохода по фильмам
+        genre_counts = self._db.facets()["genres"]
 
-        if not all_genres:
+        if not genre_counts:
             print(RED + "Жанры не найдены.\n" + RESET)
             return
 
-        genres_list = sorted(all_genres)
+        genres_list = sorted(genre_counts)
         print("\n" + CYAN + "Доступные жанры:" + RESET)
         for i, g in enumerate(genres_list, start=1):
-            print(f"{i}. {g}")
+            print(f"{i}. {g} ({genre_counts[g]})")
 
         raw = input(
             "Введите номера любимых жанров через запятую (например, 1,3,5): "
@@ -223,12 +296,13 @@ class ConsoleApp:
         print(CYAN + "Выберите стратегию:" + RESET)
         print("1. По любимым жанрам пользователя")
         print("2. Фильмы с наивысшим рейтингом")
-        print("3. На основе похожих пользователей (пока не реализовано)")
+        print("3. Похожие на оценённые вами (по оценкам пользователей)")
+        print("4. На основе похожих пользователей")
         choice = input(YELLOW + "Ваш выбор: " + RESET).strip()
 
         strategy = self._strategies.get(choice)
         if not strategy:
-            print(RED + "Неизвестная или ещё не реализованная стратегия.\n" + RESET)
+            print(RED + "Неизвестная стратегия.\n" + RESET)
             return
 
         # фильтры
@@ -239,17 +313,24 @@ class ConsoleApp:
             "Минимальный год выпуска (Enter — без фильтра): "
         )
 
+        # фильтры проверяются до ранжирования, уже оценённые фильмы исключаем
+        query = RecommendationQuery(
+            min_rating=min_rating,
+            min_year=min_year,
+            exclude_ids=self._current_user.ratings,
+        )
+
         # выставляем стратегию в движке и считаем рекомендации
         self._engine.set_strategy(strategy)
         recommended = self._engine.recommend(
             self._movies,
+            catalog_version=self._db.version,
+            db=self._db,
+            query=query,
             user=self._current_user,
             users=self._users,
         )
 
-        # применяем фильтры
-        recommended = self._apply_filters(recommended, min_rating, min_year)
-
         if not recommended:
             print(RED + "Подходящих фильмов нет.\n" + RESET)
             return
@@ -266,21 +347,6 @@ class ConsoleApp:
             return False
         return True
 
-    @staticmethod
-    def _apply_filters(
-        movies: list[Movie],
-        min_rating: Optional[float],
-        min_year: Optional[int],
-    ) -> list[Movie]:
-        result: list[Movie] = []
-        for m in movies:
-            if min_rating is not None and m.rating < min_rating:
-                continue
-            if min_year is not None and m.year < min_year:
-                continue
-            result.append(m)
-        return result
-
     @staticmethod
     def _ask_optional_float(prompt: str) -> Optional[float]:
         value = input(prompt).strip()
@@ -305,5 +371,13 @@ class ConsoleApp:
 
 
 if __name__ == "__main__":
-    app = ConsoleApp()
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="замерять операции и показать статистику (пункт 7 и при выходе)",
+    )
+    args = parser.parse_args()
+
+    app = ConsoleApp(profile=args.profile)
     app.run()
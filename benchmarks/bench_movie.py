@@ -0,0 +1,133 @@
+"""
+Стоимость объекта Movie: скорость создания и память на объект.
+
+    python benchmarks/bench_movie.py --movies 1000000
+
+Сравнивает прежнюю раскладку класса (LegacyMovie ниже: __dict__, список
+жанров, проверка жанра проходом по allowed_genres, копия списка при каждом
+чтении genres) с текущей: __slots__, общие интернированные кортежи жанров
+и Movie.trusted для уже проверенных данных (снапшоты, колонки MovieTable).
+"""
+import sys, os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import argparse
+import gc
+import time
+import tracemalloc
+from typing import List
+
+from benchmarks.datagen import iter_movies
+from core.entities.movie import Movie
+
+
+class LegacyMovie:
+    """Movie до __slots__ и интернирования жанров (для сравнения)."""
+
+    allowed_genres = Movie.allowed_genres
+
+    def __init__(self, movie_id, title, genres, year, rating, director="Не указан"):
+        self.__id = movie_id
+        self.title = title
+        self.genres = genres
+        self.year = year
+        self.rating = rating
+        self.director = director
+
+    @property
+    def id(self):
+        return self.__id
+
+    @property
+    def rating(self):
+        return self.__rating
+
+    @rating.setter
+    def rating(self, value: float):
+        if 0 <= value <= 10:
+            self.__rating = round(value, 1)
+        else:
+            raise ValueError("Рейтинг должен быть от 0 до 10")
+
+    @property
+    def genres(self):
+        return self.__genres.copy()
+
+    @genres.setter
+    def genres(self, genres_list: List[str]):
+        invalid_genres = [
+            genre for genre in genres_list if genre not in self.allowed_genres
+        ]
+        if invalid_genres:
+            raise ValueError(f"Некорректные жанры: {', '.join(invalid_genres)}")
+        self.__genres = genres_list
+        self.__genre_mask = self.genres_to_mask(genres_list)
+
+    @classmethod
+    def genres_to_mask(cls, genres: List[str]) -> int:
+        mask = 0
+        for genre in genres:
+            mask |= 1 << cls.allowed_genres.index(genre)
+        return mask
+
+
+def build(label: str, make, rows: list) -> list:
+    """Создаёт объекты по rows; печатает скорость и память на объект."""
+    gc.collect()
+    start = time.perf_counter()
+    objects = [make(row) for row in rows]
+    elapsed = time.perf_counter() - start
+    del objects
+
+    gc.collect()
+    tracemalloc.start()
+    objects = [make(row) for row in rows]
+    # сам список ссылок к объекту не относится
+    per_object = (tracemalloc.get_traced_memory()[0] - sys.getsizeof(objects)) / len(rows)
+    tracemalloc.stop()
+
+    print(
+        f"{label:<26} {len(rows) / elapsed / 1e6:8.2f} млн/с {per_object:10.0f} Б/объект"
+    )
+    return objects
+
+
+def read_genres(label: str, objects: list) -> None:
+    start = time.perf_counter()
+    for obj in objects:
+        obj.genres
+    elapsed = time.perf_counter() - start
+    print(f"{label:<26} {elapsed / len(objects) * 1e9:8.0f} нс/чтение genres")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--movies", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    # входные данные — как после json.load: у каждой записи свой список жанров
+    rows = [
+        (m.id, m.title, list(m.genres), m.year, m.rating, m.director, m.genre_mask)
+        for m in iter_movies(args.movies, args.seed, skewed=True)
+    ]
+    print(f"фильмов: {len(rows)}")
+
+    legacy = build(
+        "прежний Movie", lambda r: LegacyMovie(r[0], r[1], r[2], r[3], r[4], r[5]), rows
+    )
+    current = build(
+        "Movie(...)", lambda r: Movie(r[0], r[1], r[2], r[3], r[4], r[5]), rows
+    )
+    build(
+        "Movie.trusted(...)",
+        lambda r: Movie.trusted(r[0], r[1], r[6], r[3], r[4], r[5]),
+        rows,
+    )
+
+    read_genres("прежний Movie", legacy)
+    read_genres("Movie", current)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Сравнение пакетных рекомендаций с обычным циклом по пользователям.
+
+    python benchmarks/bench_recommend_many.py --movies 100000 --users 20000
+    python benchmarks/bench_recommend_many.py --strategy similar_users --workers 4
+
+Печатает время трёх вариантов для выбранной стратегии
+(genres — UserGenreRecommendationStrategy, similar_users — SimilarUsersStrategy
+поверх UserLSHIndex, пользователям генерируются оценки):
+  loop      — engine.recommend(...) для каждого пользователя;
+  batch x1  — recommend_many(workers=1): общая подготовка каталога;
+  batch xN  — recommend_many(workers=N): плюс пул процессов.
+Ускорение xN имеет смысл только при N <= числу доступных ядер.
+"""
+import sys, os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import argparse
+import random
+import time
+
+from benchmarks.datagen import make_movies, make_users
+from recommender.collaborative import SimilarUsersStrategy
+from recommender.similarity import UserLSHIndex
+from recommender.strategies import RecommendationEngine, UserGenreRecommendationStrategy
+
+
+def timed(label: str, func) -> float:
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<12} {elapsed:8.2f} с")
+    return elapsed
+
+
+def rate_users(users: list, movies: list, per_user: int, seed: int = 4) -> None:
+    """Оценки пользователям: чаще — фильмам из популярной тысячи."""
+    rnd = random.Random(seed)
+    popular = [m.id for m in movies[:1000]]
+    for user in users:
+        for movie_id in rnd.sample(popular, min(per_user, len(popular))):
+            user.ratings[movie_id] = float(rnd.randint(1, 10))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--movies", type=int, default=50_000)
+    parser.add_argument("--users", type=int, default=5_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--strategy", choices=("genres", "similar_users"), default="genres")
+    args = parser.parse_args()
+
+    movies = make_movies(args.movies)
+    users = make_users(args.users)
+    kwargs = {}
+    if args.strategy == "genres":
+        strategy = UserGenreRecommendationStrategy(top_n=10)
+    else:
+        rate_users(users, movies, per_user=20)
+        index = UserLSHIndex()
+        for user in users:
+            index.add_user(user)
+        strategy = SimilarUsersStrategy(index, top_n=10)
+        kwargs["users"] = {user.name: user for user in users}
+    engine = RecommendationEngine(strategy)
+    if hasattr(os, "sched_getaffinity"):
+        cores = len(os.sched_getaffinity(0))
+    else:
+        cores = os.cpu_count()
+    print(f"фильмов: {len(movies)}, пользователей: {len(users)}, ядер доступно: {cores}")
+
+    loop = timed("loop", lambda: [engine.recommend(movies, user=u, **kwargs) for u in users])
+    one = timed(
+        "batch x1", lambda: list(engine.recommend_many(movies, users, workers=1, **kwargs))
+    )
+    many = timed(
+        f"batch x{args.workers}",
+        lambda: list(engine.recommend_many(movies, users, workers=args.workers, **kwargs)),
+    )
+    print(f"ускорение: x1 — {loop / one:.1f}, x{args.workers} — {loop / many:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Нагрузочный тест HTTP-сервиса рекомендаций (server.py) по loopback.
+
+    python benchmarks/bench_service.py --connections 32 --requests 20000 --pipeline 4
+
+Без --port поднимает сервер отдельным процессом на свободном порту
+(каталог — синтетический, --movies фильмов). Каждое соединение держится
+открытым (keep-alive) и отправляет по --pipeline запросов, не дожидаясь
+ответов. Смесь запросов: рекомендации разными стратегиями, выборки
+каталога и оценки. В конце — запросы/с и задержки p50/p99.
+"""
+import sys, os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import argparse
+import asyncio
+import json
+import random
+import socket
+import subprocess
+import tempfile
+import time
+from urllib.parse import quote
+
+from benchmarks.datagen import make_movies
+from core.entities.movie import Movie
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STRATEGIES = ["genres", "rating", "similar_items", "similar_users"]
+
+
+class Connection:
+    """Клиент HTTP/1.1 поверх одного keep-alive соединения."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._reader = reader
+        self._writer = writer
+
+    @classmethod
+    async def open(cls, host: str, port: int) -> "Connection":
+        return cls(*await asyncio.open_connection(host, port))
+
+    def send(self, method: str, path: str, payload=None) -> None:
+        body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+        head = (
+            f"{method} {path} HTTP/1.1\r\n"
+            "Host: localhost\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "\r\n"
+        )
+        self._writer.write(head.encode("latin-1") + body)
+
+    async def receive(self):
+        head = await self._reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        status = int(lines[0].split(" ", 2)[1])
+        length = 0
+        for line in lines[1:]:
+            key, _, value = line.partition(":")
+            if key.lower() == "content-length":
+                length = int(value)
+        body = await self._reader.readexactly(length)
+        return status, json.loads(body)
+
+    async def drain(self) -> None:
+        await self._writer.drain()
+
+    async def request(self, method: str, path: str, payload=None):
+        self.send(method, path, payload)
+        await self.drain()
+        return await self.receive()
+
+    async def close(self) -> None:
+        self._writer.close()
+        await self._writer.wait_closed()
+
+
+def make_request(rnd: random.Random, name: str, movie_count: int):
+    """Случайный запрос из смеси: 60% рекомендаций, 25% каталог, 15% оценки."""
+    roll = rnd.random()
+    if roll < 0.60:
+        strategy = rnd.choice(STRATEGIES)
+        return "GET", f"/users/{name}/recommendations?strategy={strategy}&limit=10", None
+    if roll < 0.85:
+        genre = quote(rnd.choice(Movie.allowed_genres))
+        min_rating = rnd.randint(50, 90) / 10
+        return "GET", f"/movies?genre={genre}&min_rating={min_rating}&limit=20", None
+    return (
+        "POST",
+        f"/users/{name}/ratings",
+        {"movie_id": rnd.randint(1, movie_count), "score": rnd.randint(1, 10)},
+    )
+
+
+async def run_client(
+    host: str,
+    port: int,
+    index: int,
+    requests: int,
+    pipeline: int,
+    movie_count: int,
+    latencies: list,
+    errors: list,
+) -> None:
+    rnd = random.Random(index)
+    name = f"bench{index}"
+    conn = await Connection.open(host, port)
+
+    # подготовка пользователя (в замер не входит)
+    await conn.request("POST", "/users", {"name": name})
+    await conn.request(
+        "PUT", f"/users/{name}/preferences", {"genres": rnd.sample(Movie.allowed_genres, 2)}
+    )
+
+    sent = 0
+    while sent < requests:
+        batch = min(pipeline, requests - sent)
+        started = []
+        for _ in range(batch):
+            conn.send(*make_request(rnd, name, movie_count))
+            started.append(time.perf_counter())
+        await conn.drain()
+
+        for start in started:
+            status, _ = await conn.receive()
+            latencies.append(time.perf_counter() - start)
+            if status >= 400:
+                errors.append(status)
+        sent += batch
+
+    await conn.close()
+
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port: int, movies_path: str) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "server.py"), "--port", str(port),
+         "--movies", movies_path],
+        cwd=ROOT,
+        stdout=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("Сервер не запустился")
+
+
+async def load(args, port: int) -> None:
+    latencies: list = []
+    errors: list = []
+    per_client = args.requests // args.connections
+
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            run_client(
+                args.host, port, args.offset + i, per_client, args.pipeline,
+                args.movies, latencies, errors,
+            )
+            for i in range(args.connections)
+        )
+    )
+    elapsed = time.perf_counter() - start
+
+    print(f"соединений: {args.connections}, конвейер: {args.pipeline}")
+    print(f"запросов:   {len(latencies)} за {elapsed:.2f} с, ошибок: {len(errors)}")
+    print(f"запросов/с: {len(latencies) / elapsed:,.0f}")
+    print(f"p50:        {percentile(latencies, 0.50) * 1000:.2f} мс")
+    print(f"p99:        {percentile(latencies, 0.99) * 1000:.2f} мс")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, help="уже запущенный сервер")
+    parser.add_argument("--movies", type=int, default=10_000)
+    parser.add_argument("--connections", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=10_000)
+    parser.add_argument("--pipeline", type=int, default=1)
+    parser.add_argument(
+        "--offset", type=int, default=0, help="сдвиг номеров пользователей bench<N>"
+    )
+    args = parser.parse_args()
+
+    if args.port is not None:
+        asyncio.run(load(args, args.port))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "movies.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(
+                [m.to_dict() for m in make_movies(args.movies)], f, ensure_ascii=False
+            )
+
+        port = free_port()
+        server = start_server(port, path)
+        try:
+            asyncio.run(load(args, port))
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
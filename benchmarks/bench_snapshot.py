@@ -0,0 +1,65 @@
+"""
+Холодный старт MovieDB: JSON против бинарного снапшота.
+
+    python benchmarks/bench_snapshot.py --movies 1000000
+
+Генерирует каталог во временной папке и замеряет время MovieDB(...)
+при чтении JSON и при чтении свежего снапшота (обычный и колоночный режим).
+"""
+import sys, os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import argparse
+import contextlib
+import io
+import json
+import tempfile
+import time
+
+from benchmarks.datagen import make_movies
+from utils.movie_db import MovieDB
+
+
+def timed(label: str, func) -> float:
+    start = time.perf_counter()
+    # MovieDB печатает статус загрузки — в замерах он не нужен
+    with contextlib.redirect_stdout(io.StringIO()):
+        db = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed:8.2f} с")
+    # база освобождается после замера: удаление миллиона объектов —
+    # не часть холодного старта
+    del db
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--movies", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "movies.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(
+                [m.to_dict() for m in make_movies(args.movies)], f, ensure_ascii=False
+            )
+        print(f"фильмов: {args.movies}, JSON: {os.path.getsize(path) / 1e6:.1f} МБ")
+
+        json_time = timed("JSON", lambda: MovieDB(path))
+        json_col_time = timed("JSON, columnar", lambda: MovieDB(path, columnar=True))
+        timed("JSON + запись снапшота", lambda: MovieDB(path, snapshot=True))
+        print(f"снапшот: {os.path.getsize(path + '.snap') / 1e6:.1f} МБ")
+        snap_time = timed("снапшот", lambda: MovieDB(path, snapshot=True))
+        col_time = timed(
+            "снапшот, columnar", lambda: MovieDB(path, snapshot=True, columnar=True)
+        )
+        # каждый режим сравнивается со своим JSON
+        print(
+            f"ускорение: снапшот — x{json_time / snap_time:.1f}, "
+            f"columnar — x{json_col_time / col_time:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Синтетические данные для бенчмарков.
+
+Всё детерминировано: одинаковые (count, seed) дают одинаковые данные.
+skewed=True — распределения, похожие на реальный каталог:
+  жанры     — по закону Ципфа (драмы и комедии встречаются на порядок
+              чаще военных фильмов и биографий);
+  рейтинг   — колокол около 6.5, хвосты к 1 и 10 редкие;
+  год       — свежих фильмов больше, чем старых;
+  режиссёры — немногие снимают много, у большинства — единицы фильмов.
+"""
+import sys, os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import itertools
+import json
+import random
+from typing import Iterator, List
+
+from core.entities.movie import Movie
+from core.entities.user import User
+from recommender.strategies import UserSnapshot
+
+# жанры от самого частого к самому редкому (для skewed=True)
+GENRES_BY_POPULARITY = [
+    "драма",
+    "комедия",
+    "триллер",
+    "боевик",
+    "мелодрама",
+    "криминал",
+    "приключения",
+    "детектив",
+    "фантастика",
+    "ужасы",
+    "фэнтези",
+    "аниме",
+    "биография",
+    "военный",
+]
+_GENRE_CUM_WEIGHTS = list(
+    itertools.accumulate(1 / (rank + 1) ** 1.1 for rank in range(len(GENRES_BY_POPULARITY)))
+)
+
+
+def _skewed_genres(rnd: random.Random, count: int) -> List[str]:
+    genres: List[str] = []
+    while len(genres) < count:
+        genre = rnd.choices(GENRES_BY_POPULARITY, cum_weights=_GENRE_CUM_WEIGHTS)[0]
+        if genre not in genres:
+            genres.append(genre)
+    return genres
+
+
+def iter_movies(count: int, seed: int = 1, skewed: bool = False) -> Iterator[Movie]:
+    """Фильмы с id 1..count по одному (для каталогов, которые не влезут списком)."""
+    rnd = random.Random(seed)
+    directors = max(1, count // 20)
+
+    for i in range(1, count + 1):
+        if skewed:
+            genres = _skewed_genres(rnd, rnd.choices((1, 2, 3), (5, 4, 2))[0])
+            rating = min(100, max(10, round(rnd.gauss(6.5, 1.3) * 10))) / 10
+            year = max(1920, 2024 - int(rnd.expovariate(1 / 15)))
+            director = int(directors ** rnd.random())
+        else:
+            genres = rnd.sample(Movie.allowed_genres, rnd.randint(1, 3))
+            rating = rnd.randint(10, 100) / 10
+            year = rnd.randint(1950, 2024)
+            director = rnd.randint(1, directors)
+
+        yield Movie(
+            movie_id=i,
+            title=f"Фильм {i}",
+            genres=genres,
+            year=year,
+            rating=rating,
+            director=f"Режиссёр {director}",
+        )
+
+
+def make_movies(count: int, seed: int = 1, skewed: bool = False) -> list:
+    return list(iter_movies(count, seed, skewed))
+
+
+def write_movies_json(
+    path: str, count: int, seed: int = 1, skewed: bool = True
+) -> None:
+    """
+    Пишет каталог в формате MovieDB (.jsonl — по строке на фильм, иначе
+    JSON-массив) потоково: память не зависит от размера каталога.
+    """
+    lines = path.endswith(".jsonl")
+    with open(path, "w", encoding="utf-8") as f:
+        if not lines:
+            f.write("[\n")
+        for i, movie in enumerate(iter_movies(count, seed, skewed)):
+            record = json.dumps(movie.to_dict(), ensure_ascii=False)
+            if lines:
+                f.write(record + "\n")
+            else:
+                f.write(("" if i == 0 else ",\n") + record)
+        if not lines:
+            f.write("\n]\n")
+
+
+def make_users(count: int, seed: int = 2, skewed: bool = False) -> list:
+    rnd = random.Random(seed)
+    return [
+        UserSnapshot(
+            f"user{i}",
+            _skewed_genres(rnd, 2) if skewed else rnd.sample(Movie.allowed_genres, 2),
+            {},
+        )
+        for i in range(count)
+    ]
+
+
+def make_db_users(count: int, seed: int = 3) -> List[User]:
+    """Пользователи для UserDB (ID выдаст база), с популярными жанрами чаще."""
+    rnd = random.Random(seed)
+    users = []
+    for i in range(count):
+        user = User(f"user{i}", f"pass{rnd.getrandbits(32):08x}")
+        user.addGenre(_skewed_genres(rnd, rnd.randint(1, 3)))
+        users.append(user)
+    return users
@@ -0,0 +1,257 @@
+"""
+Набор бенчмарков хранилищ, сущностей и стратегий на синтетических данных.
+
+    python benchmarks/suite.py --movies 100000 --users 10000
+    python benchmarks/suite.py --movies 100000 --users 10000 --save-baseline base.json
+    python benchmarks/suite.py --movies 100000 --users 10000 --compare base.json
+
+Данные генерируются детерминированно (benchmarks/datagen.py, skewed=True),
+поэтому прогоны с одинаковыми --movies/--users/--seed сравнимы. Каждая
+операция выполняется --repeat раз: в отчёте минимальное и медианное время
+и время на элемент. Пик памяти меряется отдельным прогоном под tracemalloc
+(--no-memory — пропустить). --compare сверяет минимальное время и пик
+памяти с сохранённым базовым прогоном и завершается с кодом 1, если
+что-то стало хуже больше чем на --threshold.
+"""
+import sys, os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import argparse
+import contextlib
+import io
+import json
+import platform
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, NamedTuple
+
+from benchmarks.datagen import (
+    GENRES_BY_POPULARITY,
+    make_db_users,
+    make_users,
+    write_movies_json,
+)
+from core.entities.movie import Movie
+from recommender.strategies import RatingStrategy, UserGenreRecommendationStrategy
+from utils.movie_db import MovieDB
+from utils.user_db import UserDB
+
+
+class Operation(NamedTuple):
+    name: str
+    items: int                       # сколько элементов обрабатывает один прогон
+    setup: Callable[[], Callable]    # готовит данные, возвращает замеряемый вызов
+
+
+@contextlib.contextmanager
+def quiet():
+    """Хранилища печатают статус загрузки/сохранения — в замерах он не нужен."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def build_operations(args, workdir: str) -> List[Operation]:
+    movies_path = os.path.join(workdir, "movies.json")
+    write_movies_json(movies_path, args.movies, seed=args.seed, skewed=True)
+    with open(movies_path, encoding="utf-8") as f:
+        raw_movies = json.load(f)
+    with quiet():
+        db = MovieDB(movies_path)
+    movies = list(db.db)
+    snapshots = make_users(args.queries, seed=args.seed + 1, skewed=True)
+
+    def load_db():
+        with quiet():
+            MovieDB(movies_path)
+
+    # отдельная копия, чтобы save() не перезаписывал файл для load_db
+    save_path = os.path.join(workdir, "saved.json")
+    shutil.copyfile(movies_path, save_path)
+    with quiet():
+        save_db = MovieDB(save_path)
+
+    def save():
+        with quiet():
+            save_db.save()
+
+    def from_dict():
+        for item in raw_movies:
+            Movie.from_dict(item)
+
+    def find_by_genre():
+        for genre in GENRES_BY_POPULARITY:
+            db.find_by_genre(genre)
+
+    def sort_by_rating():
+        db.sort_by_rating()
+
+    def user_strategy(strategy):
+        def run():
+            for user in snapshots:
+                strategy.recommend(movies, user=user)
+
+        return run
+
+    def add_users_setup():
+        users = make_db_users(args.users, seed=args.seed + 2)
+        path = os.path.join(workdir, "users.json")
+        if os.path.exists(path):
+            os.remove(path)
+        with quiet():
+            user_db = UserDB(path)
+
+        def run():
+            for user in users:
+                user_db.add_user(user)
+
+        return run
+
+    n, q = args.movies, args.queries
+    return [
+        Operation("Movie.from_dict", n, lambda: from_dict),
+        Operation("MovieDB.load_db", n, lambda: load_db),
+        Operation("MovieDB.save", n, lambda: save),
+        Operation("MovieDB.find_by_genre", len(GENRES_BY_POPULARITY), lambda: find_by_genre),
+        Operation("MovieDB.sort_by_rating", n, lambda: sort_by_rating),
+        Operation("UserDB.add_user", args.users, add_users_setup),
+        Operation(
+            "UserGenreRecommendationStrategy",
+            q,
+            lambda: user_strategy(UserGenreRecommendationStrategy(top_n=10)),
+        ),
+        Operation("RatingStrategy", q, lambda: user_strategy(RatingStrategy(limit=10))),
+    ]
+
+
+def measure(op: Operation, repeat: int, memory: bool) -> Dict:
+    times = []
+    for _ in range(repeat):
+        run = op.setup()  # свежие данные на каждый прогон (UserDB.add_user)
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+
+    peak = None
+    if memory:
+        run = op.setup()
+        tracemalloc.start()
+        try:
+            run()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    best = min(times)
+    return {
+        "items": op.items,
+        "time_min": best,
+        "time_median": statistics.median(times),
+        "ns_per_item": best / max(1, op.items) * 1e9,
+        "peak_bytes": peak,
+    }
+
+
+def print_results(results: Dict[str, Dict]) -> None:
+    print(f"{'операция':<34} {'мин, с':>9} {'медиана':>9} {'нс/элем':>10} {'пик, МБ':>9}")
+    for name, r in results.items():
+        peak = "—" if r["peak_bytes"] is None else f"{r['peak_bytes'] / 1e6:.1f}"
+        print(
+            f"{name:<34} {r['time_min']:9.3f} {r['time_median']:9.3f} "
+            f"{r['ns_per_item']:10.0f} {peak:>9}"
+        )
+
+
+def compare(report: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Сравнивает с базовым прогоном; возвращает список регрессий."""
+    if report["meta"]["params"] != baseline["meta"]["params"]:
+        print("Внимание: параметры прогона отличаются от базового:",
+              baseline["meta"]["params"])
+
+    regressions = []
+    print(f"\n{'операция':<34} {'время':>9} {'память':>9}")
+    for name, r in report["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"{name:<34} {'новая':>9}")
+            continue
+
+        time_ratio = r["time_min"] / base["time_min"] if base["time_min"] else 1.0
+        mem_ratio = None
+        if r["peak_bytes"] and base.get("peak_bytes"):
+            mem_ratio = r["peak_bytes"] / base["peak_bytes"]
+
+        marks = []
+        if time_ratio > 1 + threshold:
+            marks.append("время")
+        if mem_ratio is not None and mem_ratio > 1 + threshold:
+            marks.append("память")
+        if marks:
+            regressions.append(f"{name}: {', '.join(marks)}")
+
+        mem = "—" if mem_ratio is None else f"x{mem_ratio:.2f}"
+        flag = "  <-- регрессия" if marks else ""
+        print(f"{name:<34} {'x' + format(time_ratio, '.2f'):>9} {mem:>9}{flag}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--movies", type=int, default=10_000, help="10k–10M")
+    parser.add_argument("--users", type=int, default=1_000, help="1k–1M")
+    parser.add_argument("--queries", type=int, default=100,
+                        help="пользователей на замер стратегии")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", nargs="*", help="только эти операции")
+    parser.add_argument("--no-memory", action="store_true")
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--compare", metavar="PATH")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="допустимое ухудшение, доля (0.15 = 15%%)")
+    args = parser.parse_args()
+
+    params = {
+        "movies": args.movies,
+        "users": args.users,
+        "queries": args.queries,
+        "seed": args.seed,
+    }
+    print("параметры:", params)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for op in build_operations(args, workdir):
+            if args.only and op.name not in args.only:
+                continue
+            results[op.name] = measure(op, args.repeat, not args.no_memory)
+
+    report = {
+        "meta": {
+            "params": params,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+    print_results(results)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print("Базовый прогон сохранён:", args.save_baseline)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print("\nРегрессии:", "; ".join(regressions))
+            sys.exit(1)
+        print("\nРегрессий нет.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,10 @@
-from typing import List
+from typing import Dict, Iterable, List, Tuple
 
 
 class Movie:
+    # без __dict__: в каталоге на миллионы фильмов это основная часть памяти объекта
+    __slots__ = ("__id", "title", "__genres", "__genre_mask", "year", "__rating", "director")
+
     allowed_genres = [
         "ужасы",
         "комедия",
@@ -19,6 +22,19 @@ class Movie:
         "фэнтези",
     ]
 
+    # жанр -> бит маски (проверка жанра за O(1) вместо прохода по списку)
+    _GENRE_BITS: Dict[str, int] = {genre: 1 << i for i, genre in enumerate(allowed_genres)}
+
+    # интернированные жанры: один неизменяемый кортеж на набор жанров,
+    # общий для всех фильмов с этим набором (и его маска)
+    _GENRE_SETS: Dict[Tuple[str, ...], Tuple[Tuple[str, ...], int]] = {}
+    _GENRE_SETS_LIMIT = 65536
+    _MASK_GENRES: Dict[int, Tuple[str, ...]] = {}
+
+    # порядок жанров для колоночного хранения рядом с маской (см. genres_to_order)
+    _GENRE_ORDERS: Dict[Tuple[str, ...], bytes] = {}
+    _ORDER_GENRES: Dict[bytes, Tuple[str, ...]] = {}
+
     def __init__(
         self,
         movie_id: int,
@@ -55,17 +71,135 @@ class Movie:
             raise ValueError("Рейтинг должен быть от 0 до 10")
 
     @property
-    def genres(self):
-        return self.__genres.copy()
+    def genres(self) -> Tuple[str, ...]:
+        """Жанры — общий неизменяемый кортеж, копировать при чтении не нужно."""
+        return self.__genres
 
     @genres.setter
-    def genres(self, genres_list: List[str]):
-        invalid_genres = [
-            genre for genre in genres_list if genre not in self.allowed_genres
-        ]
+    def genres(self, genres_list: Iterable[str]):
+        self.__genres, self.__genre_mask = self._intern_genres(tuple(genres_list))
+
+    @property
+    def genre_mask(self) -> int:
+        """Жанры фильма битовой маской (см. genres_to_mask)."""
+        return self.__genre_mask
+
+    # ---
+    #  GENRE MASKS
+    # ---
+
+    @classmethod
+    def genres_to_mask(cls, genres: Iterable[str]) -> int:
+        """Битовая маска жанров: бит i — жанр allowed_genres[i]."""
+        bits = cls._GENRE_BITS
+        mask = 0
+        for genre in genres:
+            bit = bits.get(genre)
+            if bit is None:
+                raise ValueError(f"Некорректные жанры: {genre}")
+            mask |= bit
+        return mask
+
+    @classmethod
+    def mask_to_genres(cls, mask: int) -> List[str]:
+        """Список жанров по битовой маске (в порядке allowed_genres)."""
+        return list(cls._genres_for_mask(mask))
+
+    @classmethod
+    def _genres_for_mask(cls, mask: int) -> Tuple[str, ...]:
+        """Интернированный кортеж жанров маски (в порядке allowed_genres)."""
+        genres = cls._MASK_GENRES.get(mask)
+        if genres is None:
+            genres = tuple(
+                genre for i, genre in enumerate(cls.allowed_genres) if mask >> i & 1
+            )
+            genres, _ = cls._intern_genres(genres)
+            cls._MASK_GENRES[mask] = genres
+        return genres
+
+    @classmethod
+    def genres_to_order(cls, genres: Iterable[str]) -> bytes:
+        """
+        Порядок жанров, который маска не хранит: индексы жанров
+        в allowed_genres, по байту на жанр. b"" — порядок совпадает
+        с allowed_genres (жанры восстанавливаются по одной маске).
+        """
+        genres = tuple(genres)
+        order = cls._GENRE_ORDERS.get(genres)
+        if order is None:
+            if genres == cls._genres_for_mask(cls.genres_to_mask(genres)):
+                order = b""
+            else:
+                order = bytes(cls.allowed_genres.index(genre) for genre in genres)
+            if len(cls._GENRE_ORDERS) < cls._GENRE_SETS_LIMIT:
+                cls._GENRE_ORDERS[genres] = order
+        return order
+
+    @classmethod
+    def _genres_for_order(cls, order: bytes) -> Tuple[str, ...]:
+        """Интернированный кортеж жанров по непустому порядку genres_to_order."""
+        genres = cls._ORDER_GENRES.get(order)
+        if genres is None:
+            genres, _ = cls._intern_genres(
+                tuple(cls.allowed_genres[i] for i in order)
+            )
+            if len(cls._ORDER_GENRES) < cls._GENRE_SETS_LIMIT:
+                cls._ORDER_GENRES[bytes(order)] = genres
+        return genres
+
+    @classmethod
+    def _intern_genres(cls, genres: Tuple[str, ...]) -> Tuple[Tuple[str, ...], int]:
+        """
+        Проверяет набор жанров и возвращает (общий кортеж, маска).
+        Набор проверяется один раз — дальше берётся из кеша.
+        """
+        known = cls._GENRE_SETS.get(genres)
+        if known is not None:
+            return known
+
+        invalid_genres = [genre for genre in genres if genre not in cls._GENRE_BITS]
         if invalid_genres:
             raise ValueError(f"Некорректные жанры: {', '.join(invalid_genres)}")
-        self.__genres = genres_list
+
+        known = (genres, cls.genres_to_mask(genres))
+        if len(cls._GENRE_SETS) < cls._GENRE_SETS_LIMIT:
+            cls._GENRE_SETS[genres] = known
+        return known
+
+    # ---
+    #  TRUSTED CONSTRUCTION
+    # ---
+
+    @classmethod
+    def trusted(
+        cls,
+        movie_id: int,
+        title: str,
+        genre_mask: int,
+        year: int,
+        rating: float,
+        director: str,
+        genre_order: bytes = b"",
+    ) -> "Movie":
+        """
+        Быстрый конструктор для уже проверенных данных (снапшоты, колонки
+        MovieTable): без проверки рейтинга и жанров. Жанры задаются маской
+        и порядком из genres_to_order и берутся общим кортежем;
+        rating уже округлён до десятых.
+        """
+        movie = cls.__new__(cls)
+        movie.__id = movie_id
+        movie.title = title
+        movie.__genres = (
+            cls._genres_for_order(genre_order)
+            if genre_order
+            else cls._genres_for_mask(genre_mask)
+        )
+        movie.__genre_mask = genre_mask
+        movie.year = year
+        movie.__rating = rating
+        movie.director = director
+        return movie
 
     # ---
     #  SERIALIZATION
@@ -76,7 +210,7 @@ class Movie:
         return {
             "id": self.__id,
             "title": self.title,
-            "genres": self.genres,
+            "genres": list(self.__genres),
             "year": self.year,
             "rating": self.rating,
             "director": self.director,
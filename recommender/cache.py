@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import sys
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class RecommendationCache:
+    """
+    LRU-кеш результатов рекомендаций, ограниченный числом записей
+    и примерным объёмом в байтах (сам список + ключ; объекты Movie
+    общие с каталогом и не учитываются).
+
+    Версия каталога входит в ключ: при появлении новой версии все
+    записи старых версий удаляются сразу, остальные живут по LRU.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 1 << 20) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._entries: OrderedDict[Hashable, tuple[list, int]] = OrderedDict()
+        self._bytes = 0
+        self._catalog_version: Optional[int] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0       # вытеснено по LRU
+        self.invalidations = 0   # удалено из-за смены версии каталога
+
+    def get(self, key: Hashable) -> Optional[list]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return list(entry[0])
+
+    def put(self, key: Hashable, value: list) -> None:
+        size = sys.getsizeof(key) + sys.getsizeof(value)
+        if size > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (list(value), size)
+        self._bytes += size
+
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def set_catalog_version(self, version: int) -> None:
+        """Удаляет записи, посчитанные по другой версии каталога."""
+        if version == self._catalog_version:
+            return
+        self._catalog_version = version
+
+        stale = [key for key in self._entries if key[0] != version]
+        for key in stale:
+            self._drop(key)
+        self.invalidations += len(stale)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def _drop(self, key: Hashable) -> None:
+        _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+import heapq
+import math
+from typing import Any, Hashable, Optional
+
+from core.entities.movie import Movie
+from recommender.query import RecommendationQuery
+from recommender.similarity import UserLSHIndex
+from recommender.strategies import RecommendationStrategy
+
+
+class ItemSimilarityModel:
+    """
+    Item-item модель коллаборативной фильтрации.
+
+    Хранит разреженную матрицу оценок пользователь × фильм (словари строк
+    и столбцов) и для каждой пары фильмов, которые оценил хотя бы один
+    общий пользователь, — скалярное произведение их столбцов.
+    Сходство — косинус: dot(i, j) / (|i| * |j|).
+
+    Новая оценка обновляет только затронутые произведения и нормы:
+    O(число оценок пользователя), без перестройки модели. Топ-K соседей
+    фильма кешируется и пересчитывается лениво, когда кеш устарел.
+    """
+
+    def __init__(self, neighbours: int = 20) -> None:
+        self.neighbours = neighbours
+
+        self._by_user: dict[Hashable, dict[int, float]] = {}   # строки матрицы
+        self._by_item: dict[int, dict[Hashable, float]] = {}   # столбцы матрицы
+        self._dots: dict[int, dict[int, float]] = {}
+        self._norms_sq: dict[int, float] = {}
+
+        self._top: dict[int, list[tuple[float, int]]] = {}     # кеш соседей
+        self._dirty: set[int] = set()
+
+        # растёт при каждом изменении матрицы (для кеша рекомендаций)
+        self.version = 0
+
+    # ---
+    # ОБНОВЛЕНИЕ
+    # ---
+
+    def add_rating(self, user_key: Hashable, movie_id: int, score: float) -> None:
+        """Записывает (или заменяет) оценку и обновляет сходства."""
+        row = self._by_user.setdefault(user_key, {})
+        old = row.get(movie_id, 0.0)
+        delta = score - old
+        if delta == 0 and movie_id in row:
+            return
+
+        row[movie_id] = score
+        self.version += 1
+        self._by_item.setdefault(movie_id, {})[user_key] = score
+        self._norms_sq[movie_id] = self._norms_sq.get(movie_id, 0.0) + score**2 - old**2
+
+        dots_i = self._dots.setdefault(movie_id, {})
+        for other_id, other_score in row.items():
+            if other_id == movie_id:
+                continue
+            value = dots_i.get(other_id, 0.0) + delta * other_score
+            dots_i[other_id] = value
+            self._dots.setdefault(other_id, {})[movie_id] = value
+
+        # у фильма поменялась норма — устарели соседи всех, кто с ним связан
+        self._dirty.add(movie_id)
+        self._dirty.update(dots_i)
+
+    def on_rate(self, user: Any, movie_id: int, score: float) -> None:
+        """Наблюдатель для ConsoleUser.rate."""
+        self.add_rating(user.name, movie_id, score)
+
+    def on_preferences(self, user: Any) -> None:
+        """Жанры пользователя на item-item сходство не влияют."""
+
+    def fit(self, users: Any) -> None:
+        """Заполняет модель оценками из словаря/списка пользователей."""
+        values = users.values() if isinstance(users, dict) else users
+        for user in values:
+            for movie_id, score in user.ratings.items():
+                self.add_rating(user.name, movie_id, score)
+
+    # ---
+    # ЧТЕНИЕ
+    # ---
+
+    def similarity(self, movie_a: int, movie_b: int) -> float:
+        dot = self._dots.get(movie_a, {}).get(movie_b, 0.0)
+        if not dot:
+            return 0.0
+        return dot / math.sqrt(self._norms_sq[movie_a] * self._norms_sq[movie_b])
+
+    def neighbours_of(self, movie_id: int) -> list[tuple[float, int]]:
+        """Топ-K похожих фильмов: список (сходство, movie_id)."""
+        if movie_id in self._dirty or movie_id not in self._top:
+            candidates = self._dots.get(movie_id, {})
+            self._top[movie_id] = heapq.nlargest(
+                self.neighbours,
+                (
+                    (self.similarity(movie_id, other_id), other_id)
+                    for other_id in candidates
+                ),
+            )
+            self._dirty.discard(movie_id)
+        return self._top[movie_id]
+
+
+class ItemSimilarityStrategy(RecommendationStrategy):
+    """
+    Стратегия №3: фильмы, похожие на уже оценённые пользователем.
+    Оценка кандидата — среднее оценок пользователя, взвешенное
+    сходством с ними (по топ-K соседям из ItemSimilarityModel);
+    при равенстве выше тот, у кого больше суммарное сходство.
+    """
+
+    def __init__(self, model: ItemSimilarityModel, top_n: int = 5) -> None:
+        self.model = model
+        self.top_n = top_n
+
+    def cache_key(self) -> Hashable:
+        return ("item", id(self.model), self.model.version, self.top_n)
+
+    def recommend(
+            self,
+            movies: list[Movie],
+            user: Any = None,
+            query: Optional[RecommendationQuery] = None,
+            **kwargs,
+    ) -> list[Movie]:
+        if user is None:
+            raise ValueError("Для item-item рекомендаций требуется user")
+
+        rated = getattr(user, "ratings", {})
+        weighted: dict[int, float] = {}
+        weights: dict[int, float] = {}
+        for movie_id, score in rated.items():
+            for sim, other_id in self.model.neighbours_of(movie_id):
+                if other_id in rated or sim <= 0:
+                    continue
+                weighted[other_id] = weighted.get(other_id, 0.0) + sim * score
+                weights[other_id] = weights.get(other_id, 0.0) + sim
+
+        if not weighted:
+            return []
+
+        candidates = (
+            m
+            for m in movies
+            if m.id in weighted and (query is None or query.matches(m))
+        )
+        return heapq.nlargest(
+            self.top_n,
+            candidates,
+            key=lambda m: (weighted[m.id] / weights[m.id], weights[m.id], m.rating),
+        )
+
+
+class SimilarUsersStrategy(RecommendationStrategy):
+    """
+    Стратегия №4: фильмы, которые высоко оценили похожие пользователи.
+    Похожие ищутся приближённо через UserLSHIndex, оценка кандидата —
+    среднее оценок соседей, взвешенное их сходством с пользователем.
+    """
+
+    def __init__(
+        self,
+        index: UserLSHIndex,
+        top_n: int = 5,
+        neighbours: int = 20,
+    ) -> None:
+        self.index = index
+        self.top_n = top_n
+        self.neighbours = neighbours
+
+    def cache_key(self) -> Hashable:
+        return (
+            "users",
+            id(self.index),
+            self.index.version,
+            self.top_n,
+            self.neighbours,
+        )
+
+    def recommend(
+            self,
+            movies: list[Movie],
+            user: Any = None,
+            users: Any = None,
+            query: Optional[RecommendationQuery] = None,
+            **kwargs,
+    ) -> list[Movie]:
+        weighted, weights = self._scores(user, users)
+        if not weighted:
+            return []
+
+        candidates = (
+            m
+            for m in movies
+            if m.id in weighted and (query is None or query.matches(m))
+        )
+        return self._top(candidates, weighted, weights)
+
+    def prepare(self, movies: list[Movie]) -> dict[int, Movie]:
+        # каталог по ID: кандидатов берём из оценок соседей, а не проходом
+        # по всему каталогу для каждого пользователя
+        return {m.id: m for m in movies}
+
+    def recommend_prepared(
+            self,
+            prepared: dict[int, Movie],
+            user: Any = None,
+            users: Any = None,
+            query: Optional[RecommendationQuery] = None,
+            **kwargs,
+    ) -> list[Movie]:
+        weighted, weights = self._scores(user, users)
+        if not weighted:
+            return []
+
+        candidates = (
+            m
+            for m in map(prepared.get, weighted)
+            if m is not None and (query is None or query.matches(m))
+        )
+        return self._top(candidates, weighted, weights)
+
+    def _scores(self, user: Any, users: Any) -> tuple[dict[int, float], dict[int, float]]:
+        """Взвешенные суммы оценок соседей и суммы весов по ID фильма."""
+        if user is None or users is None:
+            raise ValueError("Для рекомендаций по похожим пользователям нужны user и users")
+
+        rated = getattr(user, "ratings", {})
+        weighted: dict[int, float] = {}
+        weights: dict[int, float] = {}
+        for sim, key in self.index.most_similar(user, self.neighbours):
+            other = users.get(key)
+            if other is None:
+                continue
+            for movie_id, score in other.ratings.items():
+                if movie_id in rated:
+                    continue
+                weighted[movie_id] = weighted.get(movie_id, 0.0) + sim * score
+                weights[movie_id] = weights.get(movie_id, 0.0) + sim
+        return weighted, weights
+
+    def _top(self, candidates, weighted: dict, weights: dict) -> list[Movie]:
+        # при равенстве — меньший ID: результат не зависит от порядка кандидатов
+        return heapq.nlargest(
+            self.top_n,
+            candidates,
+            key=lambda m: (
+                weighted[m.id] / weights[m.id], weights[m.id], m.rating, -m.id
+            ),
+        )
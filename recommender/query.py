@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+from typing import Any, Iterable, Optional
+
+from core.entities.movie import Movie
+
+
+class RecommendationQuery:
+    """
+    Фильтры рекомендаций, которые проверяются до ранжирования:
+    границы рейтинга и года (включительно), жанры (хотя бы один из)
+    и исключённые ID (например, уже оценённые пользователем фильмы).
+
+    Передаётся в RecommendationEngine.recommend(query=...) и в стратегии.
+    Если движку дан ещё и MovieDB, кандидаты берутся из его индексов
+    (find_in_range / find_by_genres), а не полным проходом по каталогу.
+    """
+
+    def __init__(
+        self,
+        min_rating: Optional[float] = None,
+        max_rating: Optional[float] = None,
+        min_year: Optional[int] = None,
+        max_year: Optional[int] = None,
+        genres: Optional[Iterable[str]] = None,
+        exclude_ids: Iterable[int] = (),
+    ) -> None:
+        self.min_rating = min_rating
+        self.max_rating = max_rating
+        self.min_year = min_year
+        self.max_year = max_year
+        self.genres = tuple(sorted(genres)) if genres else ()
+        self.exclude_ids = frozenset(exclude_ids)
+
+        self._genre_mask = Movie.genres_to_mask(
+            [g for g in self.genres if g in Movie.allowed_genres]
+        )
+
+    # ---
+    # ПРОВЕРКИ
+    # ---
+
+    def has_range(self) -> bool:
+        return any(
+            bound is not None
+            for bound in (self.min_rating, self.max_rating, self.min_year, self.max_year)
+        )
+
+    def uses_index(self) -> bool:
+        """Есть ли фильтр, который MovieDB отбирает по индексу (select)."""
+        return bool(self.genres) or self.has_range()
+
+    def matches(self, movie: Movie) -> bool:
+        if movie.id in self.exclude_ids:
+            return False
+        if self.min_rating is not None and movie.rating < self.min_rating:
+            return False
+        if self.max_rating is not None and movie.rating > self.max_rating:
+            return False
+        if self.min_year is not None and movie.year < self.min_year:
+            return False
+        if self.max_year is not None and movie.year > self.max_year:
+            return False
+        if self.genres and not movie.genre_mask & self._genre_mask:
+            return False
+        return True
+
+    def filter(self, movies: Iterable[Movie]) -> Iterable[Movie]:
+        """
+        Фильмы, прошедшие фильтры. Без границ и жанров (обычный случай —
+        только exclude_ids) проверяется один id, без полного matches().
+        """
+        if self.uses_index():
+            return (m for m in movies if self.matches(m))
+        if not self.exclude_ids:
+            return movies
+        exclude_ids = self.exclude_ids
+        return (m for m in movies if m.id not in exclude_ids)
+
+    # ---
+    # ВЫБОРКА
+    # ---
+
+    def select(self, db: Any) -> list[Movie]:
+        """
+        Кандидаты из индексов MovieDB, уже прошедшие все фильтры.
+        Имеет смысл только при uses_index(): иначе это полный проход
+        по каталогу, который стратегия и так сделает при ранжировании.
+        """
+        if self.has_range():
+            # упорядочиваем по полю, у которого есть граница,
+            # чтобы бинарный поиск отсёк больше
+            order_by = (
+                "rating"
+                if self.min_rating is not None or self.max_rating is not None
+                else "year"
+            )
+            movies = db.find_in_range(
+                self.min_rating,
+                self.max_rating,
+                self.min_year,
+                self.max_year,
+                order_by=order_by,
+            )
+        elif self.genres:
+            movies = db.find_by_genres(any_of=list(self.genres))
+        else:
+            movies = db.db
+
+        return [m for m in movies if self.matches(m)]
+
+    def scan_table(self, table: Any, genre_mask: int = 0) -> list[int]:
+        """Ordinal'ы строк MovieTable, прошедших фильтры (без создания Movie)."""
+        ordinals = table.scan(
+            genre_mask=genre_mask,
+            min_rating=self.min_rating,
+            min_year=self.min_year,
+            max_rating=self.max_rating,
+            max_year=self.max_year,
+        )
+        if not self.genres and not self.exclude_ids:
+            return ordinals
+
+        ids, masks = table.ids, table.genre_masks
+        return [
+            o
+            for o in ordinals
+            if ids[o] not in self.exclude_ids
+            and (not self.genres or masks[o] & self._genre_mask)
+        ]
+
+    # ---
+    # MAGIC METHODS
+    # ---
+
+    def _key(self) -> tuple:
+        return (
+            self.min_rating,
+            self.max_rating,
+            self.min_year,
+            self.max_year,
+            self.genres,
+            self.exclude_ids,
+        )
+
+    def __eq__(self, other):
+        return isinstance(other, RecommendationQuery) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self) -> str:
+        return (
+            f"RecommendationQuery(rating={self.min_rating}..{self.max_rating}, "
+            f"year={self.min_year}..{self.max_year}, genres={list(self.genres)}, "
+            f"exclude={len(self.exclude_ids)})"
+        )
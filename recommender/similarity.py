@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import heapq
+import random
+import zlib
+from typing import Any, Hashable
+
+# большое простое число для универсального хеширования (a * x + b) mod p
+_PRIME = (1 << 61) - 1
+
+
+class UserLSHIndex:
+    """
+    Приближённый поиск похожих пользователей: MinHash + LSH.
+
+    Пользователь описывается множеством признаков — любимые жанры
+    и оценённые фильмы (с пометкой «понравился / нет»). Для множества
+    считается MinHash-сигнатура из num_perm хешей, которая режется на bands
+    полос; пользователи с совпавшей полосой попадают в одну корзину.
+    Кандидаты на похожесть — соседи по корзинам, а не все пользователи,
+    поэтому запрос сублинейный. Кандидаты ранжируются точным Жаккаром.
+
+    Новая оценка только понижает сигнатуру (O(num_perm)), смена
+    предпочтений или оценки пересчитывает сигнатуру пользователя целиком.
+    """
+
+    def __init__(self, num_perm: int = 32, bands: int = 16, seed: int = 42) -> None:
+        if num_perm % bands:
+            raise ValueError("num_perm должно делиться на bands")
+
+        self.num_perm = num_perm
+        self.bands = bands
+        self._rows = num_perm // bands
+
+        rnd = random.Random(seed)
+        self._perms = [
+            (rnd.randrange(1, _PRIME), rnd.randrange(0, _PRIME))
+            for _ in range(num_perm)
+        ]
+
+        self._features: dict[Hashable, set[str]] = {}
+        self._signatures: dict[Hashable, list[int]] = {}
+        self._buckets: list[dict[tuple, set[Hashable]]] = [{} for _ in range(bands)]
+
+        # растёт при каждом изменении индекса (для кеша рекомендаций)
+        self.version = 0
+
+    # ---
+    # ПРИЗНАКИ И СИГНАТУРЫ
+    # ---
+
+    @staticmethod
+    def _user_key(user: Any) -> Hashable:
+        return user.name
+
+    @staticmethod
+    def _rating_feature(movie_id: int, score: float) -> str:
+        return f"m:{movie_id}:{'+' if score >= 6 else '-'}"
+
+    def _user_features(self, user: Any) -> set[str]:
+        features = {f"g:{g}" for g in getattr(user, "preferred_genres", [])}
+        for movie_id, score in getattr(user, "ratings", {}).items():
+            features.add(self._rating_feature(movie_id, score))
+        return features
+
+    def _hashes(self, feature: str) -> list[int]:
+        x = zlib.crc32(feature.encode("utf-8"))
+        return [(a * x + b) % _PRIME for a, b in self._perms]
+
+    def _signature(self, features: set[str]) -> list[int]:
+        signature = [_PRIME] * self.num_perm
+        for feature in features:
+            signature = list(map(min, signature, self._hashes(feature)))
+        return signature
+
+    def _bands_of(self, signature: list[int]) -> list[tuple]:
+        rows = self._rows
+        return [tuple(signature[b * rows:(b + 1) * rows]) for b in range(self.bands)]
+
+    def _store(self, key: Hashable, features: set[str], signature: list[int]) -> None:
+        old = self._signatures.get(key)
+        old_bands = self._bands_of(old) if old is not None else [None] * self.bands
+        new_bands = self._bands_of(signature)
+
+        for b, (old_band, new_band) in enumerate(zip(old_bands, new_bands)):
+            if old_band == new_band:
+                continue
+            buckets = self._buckets[b]
+            if old_band is not None:
+                bucket = buckets[old_band]
+                bucket.discard(key)
+                if not bucket:
+                    del buckets[old_band]
+            buckets.setdefault(new_band, set()).add(key)
+
+        self._features[key] = features
+        self._signatures[key] = signature
+        self.version += 1
+
+    # ---
+    # ОБНОВЛЕНИЕ
+    # ---
+
+    def add_user(self, user: Any) -> None:
+        """Добавляет (или полностью пересчитывает) пользователя."""
+        features = self._user_features(user)
+        self._store(self._user_key(user), features, self._signature(features))
+
+    def remove_user(self, user: Any) -> None:
+        key = self._user_key(user)
+        signature = self._signatures.pop(key, None)
+        self._features.pop(key, None)
+        if signature is None:
+            return
+        self.version += 1
+        for b, band in enumerate(self._bands_of(signature)):
+            bucket = self._buckets[b].get(band)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[b][band]
+
+    def on_rate(self, user: Any, movie_id: int, score: float) -> None:
+        """Наблюдатель для ConsoleUser.rate."""
+        key = self._user_key(user)
+        features = self._features.get(key)
+        if features is None:
+            self.add_user(user)
+            return
+
+        feature = self._rating_feature(movie_id, score)
+        stale = {f for f in features if f.startswith(f"m:{movie_id}:")} - {feature}
+        if stale:
+            # оценку поменяли — минимум мог уйти, считаем заново
+            self.add_user(user)
+            return
+        if feature in features:
+            return
+
+        features = features | {feature}
+        signature = list(map(min, self._signatures[key], self._hashes(feature)))
+        self._store(key, features, signature)
+
+    def on_preferences(self, user: Any) -> None:
+        """Наблюдатель для ConsoleUser.set_preferences."""
+        self.add_user(user)
+
+    # ---
+    # ПОИСК
+    # ---
+
+    def candidates(self, key: Hashable) -> set[Hashable]:
+        """Пользователи, совпавшие с key хотя бы в одной полосе."""
+        signature = self._signatures.get(key)
+        if signature is None:
+            return set()
+
+        result: set[Hashable] = set()
+        for b, band in enumerate(self._bands_of(signature)):
+            result |= self._buckets[b].get(band, set())
+        result.discard(key)
+        return result
+
+    def most_similar(self, user: Any, k: int = 10) -> list[tuple[float, Hashable]]:
+        """K самых похожих пользователей: список (Жаккар, ключ пользователя)."""
+        key = self._user_key(user)
+        features = self._features.get(key)
+        if not features:
+            return []
+
+        scored = []
+        for other in self.candidates(key):
+            other_features = self._features[other]
+            common = len(features & other_features)
+            if common:
+                scored.append((common / len(features | other_features), other))
+        return heapq.nlargest(k, scored)
+
+    def __len__(self) -> int:
+        return len(self._signatures)
@@ -1,9 +1,24 @@
 from __future__ import annotations
 
+import heapq
+import os
 from abc import ABC, abstractmethod
-from typing import Any
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Hashable, Iterable, Iterator, Optional
 
 from core.entities.movie import Movie
+from recommender.cache import RecommendationCache
+from recommender.query import RecommendationQuery
+from utils.metrics import instrumented, metrics
+
+
+def _rank_key(movie: Movie) -> tuple:
+    """
+    Порядок ранжирования: рейтинг по убыванию, при равенстве — меньший id.
+    Не зависит от порядка кандидатов, поэтому выборка из индексов MovieDB
+    и полный проход по каталогу дают одни и те же фильмы.
+    """
+    return movie.rating, -movie.id
 
 
 class RecommendationStrategy(ABC):
@@ -18,6 +33,24 @@ class RecommendationStrategy(ABC):
         """Вернуть список рекомендованных фильмов."""
         raise NotImplementedError
 
+    def cache_key(self) -> Optional[Hashable]:
+        """
+        Идентичность стратегии для кеша движка: класс, параметры и версия
+        внутренней модели, если она есть. None — результаты не кешируются.
+        """
+        return None
+
+    def prepare(self, movies: list[Movie]) -> Any:
+        """
+        Предобработка каталога, общая для многих пользователей
+        (RecommendationEngine.recommend_many). По умолчанию — сам каталог.
+        """
+        return movies
+
+    def recommend_prepared(self, prepared: Any, user: Any = None, **kwargs) -> list[Movie]:
+        """Рекомендации по результату prepare()."""
+        return self.recommend(prepared, user=user, **kwargs)
+
 
 class UserGenreRecommendationStrategy(RecommendationStrategy):
     """
@@ -25,17 +58,20 @@ class UserGenreRecommendationStrategy(RecommendationStrategy):
     Работает с:
       - user.favorite_genres  ИЛИ
       - user.preferred_genres (как в ConsoleUser)
+
+    Жанры пользователя и фильма сравниваются битовыми масками,
+    топ выбирается через heapq.nlargest без полной сортировки.
+    Для колоночного MovieDB (columnar=True) проход идёт по колонкам таблицы.
     """
 
     def __init__(self, top_n: int = 5) -> None:
         self.top_n = top_n
 
-    def recommend(
-            self,
-            movies: list[Movie],
-            user: Any = None,
-            **kwargs,
-    ) -> list[Movie]:
+    def cache_key(self) -> Hashable:
+        return ("genre", self.top_n)
+
+    @staticmethod
+    def _user_mask(user: Any) -> int:
         if user is None:
             raise ValueError("Для рекомендации по жанрам требуется user")
 
@@ -44,14 +80,60 @@ class UserGenreRecommendationStrategy(RecommendationStrategy):
         if favorite_genres is None:
             favorite_genres = getattr(user, "preferred_genres", [])
 
-        matched = [
-            movie
-            for movie in movies
-            if any(g in movie.genres for g in favorite_genres)
-        ]
+        return Movie.genres_to_mask(
+            [g for g in favorite_genres if g in Movie.allowed_genres]
+        )
 
-        sorted_movies = sorted(matched, key=lambda m: m.rating, reverse=True)
-        return sorted_movies[: self.top_n]
+    def recommend(
+            self,
+            movies: list[Movie],
+            user: Any = None,
+            query: Optional[RecommendationQuery] = None,
+            **kwargs,
+    ) -> list[Movie]:
+        user_mask = self._user_mask(user)
+        if not user_mask:
+            return []
+
+        table = getattr(movies, "table", None)
+        if table is not None:
+            if query is None:
+                ordinals = table.scan(genre_mask=user_mask)
+            else:
+                ordinals = query.scan_table(table, genre_mask=user_mask)
+            ratings, ids = table.ratings, table.ids
+            top = heapq.nlargest(
+                self.top_n, ordinals, key=lambda o: (ratings[o], -ids[o])
+            )
+            return [table[o] for o in top]
+
+        matched = (movie for movie in movies if movie.genre_mask & user_mask)
+        if query is not None:
+            matched = query.filter(matched)
+        return heapq.nlargest(self.top_n, matched, key=_rank_key)
+
+    def prepare(self, movies: list[Movie]) -> list[Movie]:
+        # каталог сортируется один раз на всех пользователей
+        return sorted(movies, key=_rank_key, reverse=True)
+
+    def recommend_prepared(
+            self,
+            prepared: list[Movie],
+            user: Any = None,
+            query: Optional[RecommendationQuery] = None,
+            **kwargs,
+    ) -> list[Movie]:
+        user_mask = self._user_mask(user)
+        if not user_mask:
+            return []
+
+        result = []
+        for movie in prepared:
+            if movie.genre_mask & user_mask and (query is None or query.matches(movie)):
+                result.append(movie)
+                if len(result) == self.top_n:
+                    break
+        return result
 
 
 class RatingStrategy(RecommendationStrategy):
@@ -62,29 +144,258 @@ class RatingStrategy(RecommendationStrategy):
     def __init__(self, limit: int = 5) -> None:
         self.limit = limit
 
+    def cache_key(self) -> Hashable:
+        return ("rating", self.limit)
+
+    def prepare(self, movies: list[Movie]) -> list[Movie]:
+        # порядок не зависит от пользователя — сортируем один раз
+        return sorted(movies, key=_rank_key, reverse=True)
+
+    def recommend_prepared(
+            self,
+            prepared: list[Movie],
+            query: Optional[RecommendationQuery] = None,
+            **kwargs,
+    ) -> list[Movie]:
+        if query is None:
+            return prepared[: self.limit]
+
+        result = []
+        for movie in prepared:
+            if query.matches(movie):
+                result.append(movie)
+                if len(result) == self.limit:
+                    break
+        return result
+
     def recommend(
             self,
             movies: list[Movie],
+            query: Optional[RecommendationQuery] = None,
             **kwargs,
     ) -> list[Movie]:
-        sorted_movies = sorted(
-            movies,
-            key=lambda m: m.rating,
-            reverse=True,
-        )
-        return sorted_movies[: self.limit]
+        if query is not None:
+            movies = query.filter(movies)
+        return heapq.nlargest(self.limit, movies, key=_rank_key)
 
 
 class RecommendationEngine:
     """
     Движок рекомендаций, который использует текущую стратегию.
+
+    Если передан catalog_version (например, MovieDB.version), результаты
+    кешируются по ключу: версия каталога, стратегия с параметрами,
+    отпечаток пользователя (жанры и оценки) и остальные фильтры.
+
+    query (RecommendationQuery) применяется до ранжирования; если передан
+    db (MovieDB) и у запроса есть границы или жанры, кандидаты для стратегии
+    сразу берутся из его индексов. Остальное (exclude_ids) стратегия
+    проверяет сама при ранжировании.
     """
 
-    def __init__(self, strategy: RecommendationStrategy) -> None:
+    def __init__(
+        self,
+        strategy: RecommendationStrategy,
+        cache: Optional[RecommendationCache] = None,
+    ) -> None:
         self._strategy = strategy
+        self._cache = cache if cache is not None else RecommendationCache()
 
     def set_strategy(self, strategy: RecommendationStrategy) -> None:
         self._strategy = strategy
 
-    def recommend(self, movies: list[Movie], **kwargs) -> list[Movie]:
-        return self._strategy.recommend(movies, **kwargs)
+    @property
+    def cache(self) -> RecommendationCache:
+        return self._cache
+
+    @instrumented("RecommendationEngine.recommend")
+    def recommend(
+        self,
+        movies: list[Movie],
+        catalog_version: Optional[int] = None,
+        db: Any = None,
+        **kwargs,
+    ) -> list[Movie]:
+        key = self._cache_key(catalog_version, kwargs)
+        if key is not None:
+            self._cache.set_catalog_version(catalog_version)
+            cached = self._cache.get(key)
+            if cached is not None:
+                return cached
+
+        query = kwargs.get("query")
+        if query is not None and db is not None and query.uses_index():
+            # кандидаты уже отфильтрованы — стратегии проверять их повторно незачем;
+            # без индексируемых фильтров остаётся исходный каталог (и путь по колонкам)
+            movies = query.select(db)
+            kwargs = dict(kwargs, query=None)
+
+        strategy = self._strategy
+        if metrics.enabled:
+            # время самой стратегии, отдельно для каждого её класса
+            result = metrics.call(
+                f"{type(strategy).__name__}.recommend",
+                strategy.recommend,
+                (movies,),
+                kwargs,
+            )
+        else:
+            result = strategy.recommend(movies, **kwargs)
+        if key is not None:
+            self._cache.put(key, result)
+        return result
+
+    def _cache_key(
+        self, catalog_version: Optional[int], kwargs: dict
+    ) -> Optional[Hashable]:
+        if catalog_version is None:
+            return None
+
+        strategy_key = self._strategy.cache_key()
+        if strategy_key is None:
+            return None
+
+        # users не входит в ключ: стратегии, зависящие от чужих оценок,
+        # учитывают их через версию своей модели в cache_key()
+        filters = tuple(
+            sorted(
+                (name, value)
+                for name, value in kwargs.items()
+                if name not in ("user", "users")
+            )
+        )
+        key = (
+            catalog_version,
+            strategy_key,
+            self._user_fingerprint(kwargs.get("user")),
+            filters,
+        )
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    # ---
+    # ПАКЕТНЫЙ РЕЖИМ
+    # ---
+
+    def recommend_many(
+        self,
+        movies: list[Movie],
+        targets: Iterable[Any],
+        workers: Optional[int] = None,
+        chunk_size: int = 256,
+        **kwargs,
+    ) -> Iterator[tuple[Hashable, list[Movie]]]:
+        """
+        Рекомендации для множества пользователей targets (ночной пересчёт).
+        Генератор пар (user.name, список фильмов) в порядке готовности.
+        Остальные kwargs уходят в стратегию, в том числе users=
+        (все пользователи по ключу) для SimilarUsersStrategy.
+
+        Каталог один раз проходит strategy.prepare() (например, сортировку
+        по рейтингу), затем пользователи режутся на чанки по chunk_size
+        и раздаются пулу из workers процессов. Подготовленный каталог
+        и стратегия передаются каждому процессу один раз через initializer,
+        задачи несут только лёгкие снимки пользователей, а обратно
+        приходят ID фильмов. workers=1 — всё в текущем процессе.
+
+        Кеш движка в пакетном режиме не используется.
+        """
+        strategy = self._strategy
+        prepared = strategy.prepare(movies)
+        if isinstance(kwargs.get("users"), dict):
+            kwargs["users"] = {
+                key: UserSnapshot.of(u) for key, u in kwargs["users"].items()
+            }
+
+        snapshots = [UserSnapshot.of(u) for u in targets]
+        chunks = [
+            snapshots[i:i + chunk_size] for i in range(0, len(snapshots), chunk_size)
+        ]
+        by_id = {m.id: m for m in movies}
+
+        workers = workers or os.cpu_count() or 1
+        if workers == 1 or len(chunks) <= 1:
+            _init_batch_worker(strategy, prepared, kwargs)
+            for chunk in chunks:
+                for key, ids in _recommend_chunk(chunk):
+                    yield key, [by_id[i] for i in ids]
+            return
+
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_batch_worker,
+            initargs=(strategy, prepared, kwargs),
+        ) as pool:
+            futures = [pool.submit(_recommend_chunk, chunk) for chunk in chunks]
+            for future in as_completed(futures):
+                for key, ids in future.result():
+                    yield key, [by_id[i] for i in ids]
+
+    @staticmethod
+    def _user_fingerprint(user: Any) -> Hashable:
+        if user is None:
+            return None
+        genres = getattr(user, "favorite_genres", None)
+        if genres is None:
+            genres = getattr(user, "preferred_genres", [])
+        ratings = getattr(user, "ratings", {})
+        return (
+            getattr(user, "name", None),
+            tuple(sorted(genres)),
+            tuple(sorted(ratings.items())),
+        )
+
+
+class UserSnapshot:
+    """
+    Лёгкая копия пользователя для передачи в процессы пула:
+    без наблюдателей и ссылок на модели.
+    """
+
+    def __init__(
+        self,
+        name: Hashable,
+        preferred_genres: list[str],
+        ratings: dict[int, float],
+    ) -> None:
+        self.name = name
+        self.preferred_genres = preferred_genres
+        self.ratings = ratings
+
+    @classmethod
+    def of(cls, user: Any) -> "UserSnapshot":
+        genres = getattr(user, "favorite_genres", None)
+        if genres is None:
+            genres = getattr(user, "preferred_genres", [])
+        return cls(
+            getattr(user, "name", None),
+            list(genres),
+            dict(getattr(user, "ratings", {})),
+        )
+
+
+# состояние процесса пула для recommend_many
+_batch_state: Optional[tuple[RecommendationStrategy, Any, dict]] = None
+
+
+def _init_batch_worker(
+    strategy: RecommendationStrategy, prepared: Any, kwargs: dict
+) -> None:
+    global _batch_state
+    _batch_state = (strategy, prepared, kwargs)
+
+
+def _recommend_chunk(
+    targets: list[UserSnapshot],
+) -> list[tuple[Hashable, list[int]]]:
+    strategy, prepared, kwargs = _batch_state
+    return [
+        (
+            user.name,
+            [m.id for m in strategy.recommend_prepared(prepared, user=user, **kwargs)],
+        )
+        for user in targets
+    ]
@@ -0,0 +1,468 @@
+"""
+HTTP/JSON-сервис рекомендаций поверх того же движка, что и ConsoleApp.
+
+    python server.py --port 8080 --movies test_movies.json
+
+Маршруты:
+    POST /users                            {"name": "..."}
+    PUT  /users/<name>/preferences         {"genres": ["драма", ...]}
+    POST /users/<name>/ratings             {"movie_id": 1, "score": 8}
+    GET  /users/<name>/recommendations     ?strategy=genres|rating|similar_items|similar_users
+                                           &min_rating=&min_year=&limit=
+    GET  /movies                           ?genre=&min_rating=&max_rating=
+                                           &min_year=&max_year=&order_by=&limit=
+    GET  /movies/facets                    ?genre=&director=&min_rating=&max_rating=
+                                           &min_year=&max_year=&limit=
+    GET  /movies/search                    ?q=&limit=  (автодополнение, опечатки)
+    GET  /movies/<id>
+
+HTTP/1.1 с keep-alive: запросы одного соединения (в т.ч. отправленные
+конвейером, без ожидания ответов) обрабатываются по очереди.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import functools
+import itertools
+import json
+import math
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from app import ConsoleUser
+from core.entities.movie import Movie
+from recommender.collaborative import (
+    ItemSimilarityModel,
+    ItemSimilarityStrategy,
+    SimilarUsersStrategy,
+)
+from recommender.query import RecommendationQuery
+from recommender.similarity import UserLSHIndex
+from recommender.strategies import (
+    RatingStrategy,
+    RecommendationEngine,
+    UserGenreRecommendationStrategy,
+)
+from utils.movie_db import MovieDB
+
+# больше рекомендаций стратегия не считает, limit только обрезает список
+MAX_RECOMMENDATIONS = 20
+DEFAULT_PAGE = 50
+
+_REASONS = {
+    200: "OK",
+    201: "Created",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    409: "Conflict",
+    413: "Payload Too Large",
+    431: "Request Header Fields Too Large",
+    500: "Internal Server Error",
+}
+
+MAX_BODY = 1 << 20
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class RecommendationService:
+    """
+    Состояние сервиса: каталог, пользователи, модели рекомендаций.
+
+    Модели, кеши движков и пользователи не потокобезопасны, поэтому
+    все операции с ними идут через один рабочий поток executor'а:
+    цикл событий только разбирает HTTP и ждёт результат, а тяжёлые
+    вызовы стратегий его не блокируют.
+    """
+
+    def __init__(self, db: MovieDB) -> None:
+        self._db = db
+        self._users: dict[str, ConsoleUser] = {}
+
+        self._item_model = ItemSimilarityModel()
+        self._user_index = UserLSHIndex()
+
+        # свой движок (и кеш) на каждую стратегию: set_strategy не нужен
+        self._engines = {
+            "genres": RecommendationEngine(
+                UserGenreRecommendationStrategy(top_n=MAX_RECOMMENDATIONS)
+            ),
+            "rating": RecommendationEngine(RatingStrategy(limit=MAX_RECOMMENDATIONS)),
+            "similar_items": RecommendationEngine(
+                ItemSimilarityStrategy(self._item_model, top_n=MAX_RECOMMENDATIONS)
+            ),
+            "similar_users": RecommendationEngine(
+                SimilarUsersStrategy(self._user_index, top_n=MAX_RECOMMENDATIONS)
+            ),
+        }
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="recommender"
+        )
+
+    # ---
+    # ОПЕРАЦИИ (выполняются в рабочем потоке)
+    # ---
+
+    def register(self, name: str) -> dict:
+        name = name.strip()
+        if not name:
+            raise HTTPError(400, "Имя не может быть пустым.")
+        if name in self._users:
+            raise HTTPError(409, "Такой пользователь уже существует.")
+
+        user = ConsoleUser(name)
+        user.add_listener(self._item_model)
+        user.add_listener(self._user_index)
+        self._user_index.add_user(user)
+        self._users[name] = user
+        return self._user_dict(user)
+
+    def rate(self, name: str, movie_id: int, score: float) -> dict:
+        user = self._user(name)
+        if self._db.get_by_id(movie_id) is None:
+            raise HTTPError(404, "Фильм с таким ID не найден.")
+        if not (1 <= score <= 10):
+            raise HTTPError(400, "Оценка должна быть от 1 до 10.")
+
+        user.rate(movie_id, score)
+        return self._user_dict(user)
+
+    def set_preferences(self, name: str, genres: list[str]) -> dict:
+        user = self._user(name)
+        invalid = [g for g in genres if g not in Movie.allowed_genres]
+        if invalid:
+            raise HTTPError(400, f"Некорректные жанры: {', '.join(invalid)}")
+
+        user.set_preferences(list(genres))
+        return self._user_dict(user)
+
+    def recommend(
+        self,
+        name: str,
+        strategy: str,
+        min_rating: Optional[float],
+        min_year: Optional[int],
+        limit: int,
+    ) -> list[dict]:
+        user = self._user(name)
+        engine = self._engines.get(strategy)
+        if engine is None:
+            raise HTTPError(400, f"Неизвестная стратегия: {strategy}")
+
+        query = RecommendationQuery(
+            min_rating=min_rating, min_year=min_year, exclude_ids=user.ratings
+        )
+        movies = engine.recommend(
+            self._db.db,
+            catalog_version=self._db.version,
+            db=self._db,
+            query=query,
+            user=user,
+            users=self._users,
+        )
+        return [m.to_dict() for m in movies[:limit]]
+
+    def find_movies(
+        self,
+        genre: Optional[str],
+        min_rating: Optional[float],
+        max_rating: Optional[float],
+        min_year: Optional[int],
+        max_year: Optional[int],
+        order_by: str,
+        limit: int,
+    ) -> list[dict]:
+        # ленивый обход индекса: ответ стоит O(limit), а не O(каталога)
+        movies = self._db.iter_movies(
+            order_by=order_by,
+            any_of=None if genre is None else [genre],
+            min_rating=min_rating,
+            max_rating=max_rating,
+            min_year=min_year,
+            max_year=max_year,
+        )
+        return [m.to_dict() for m in itertools.islice(movies, limit)]
+
+    def movie_facets(
+        self,
+        genre: Optional[str],
+        director: Optional[str],
+        min_rating: Optional[float],
+        max_rating: Optional[float],
+        min_year: Optional[int],
+        max_year: Optional[int],
+        limit: int,
+    ) -> dict:
+        return self._db.facets(
+            any_of=None if genre is None else [genre],
+            min_rating=min_rating,
+            max_rating=max_rating,
+            min_year=min_year,
+            max_year=max_year,
+            director=director,
+            top_directors=limit,
+        )
+
+    def search_movies(self, query: str, limit: int) -> list[dict]:
+        return [m.to_dict() for m in self._db.search_titles(query, limit)]
+
+    def get_movie(self, movie_id: int) -> dict:
+        movie = self._db.get_by_id(movie_id)
+        if movie is None:
+            raise HTTPError(404, "Фильм с таким ID не найден.")
+        return movie.to_dict()
+
+    def _user(self, name: str) -> ConsoleUser:
+        user = self._users.get(name)
+        if user is None:
+            raise HTTPError(404, "Пользователь не найден.")
+        return user
+
+    @staticmethod
+    def _user_dict(user: ConsoleUser) -> dict:
+        return {
+            "name": user.name,
+            "genres": list(user.preferred_genres),
+            "ratings": {str(k): v for k, v in user.ratings.items()},
+        }
+
+    # ---
+    # HTTP
+    # ---
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8080) -> asyncio.Server:
+        return await asyncio.start_server(self._handle_connection, host, port)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    async def _call(self, func: Callable, *args) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(func, *args)
+        )
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    writer.write(_response(431, {"error": "Слишком длинные заголовки"}, False))
+                    break
+
+                # без разобранных заголовков границы следующего запроса
+                # неизвестны — такое соединение закрываем
+                keep_alive = False
+                try:
+                    method, target, keep_alive, length = _parse_head(head)
+                    if length > MAX_BODY:
+                        keep_alive = False
+                        raise HTTPError(413, "Слишком большое тело запроса")
+                    body = await reader.readexactly(length) if length else b""
+                    status, payload = await self._dispatch(method, target, body)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except asyncio.IncompleteReadError:
+                    break
+                except Exception as e:
+                    print(f"Ошибка обработки запроса: {e!r}")
+                    status, payload = 500, {"error": "Внутренняя ошибка"}
+
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method: str, target: str, body: bytes) -> tuple[int, Any]:
+        url = urlsplit(target)
+        parts = [unquote(p) for p in url.path.split("/") if p]
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+
+        try:
+            if parts == ["users"]:
+                _allow(method, "POST")
+                data = _json_body(body)
+                return 201, await self._call(self.register, str(data.get("name", "")))
+
+            if len(parts) == 3 and parts[0] == "users":
+                name, action = parts[1], parts[2]
+                if action == "ratings":
+                    _allow(method, "POST")
+                    data = _json_body(body)
+                    return 200, await self._call(
+                        self.rate, name, int(data["movie_id"]), float(data["score"])
+                    )
+                if action == "preferences":
+                    _allow(method, "PUT")
+                    genres = _json_body(body).get("genres")
+                    if not isinstance(genres, list):
+                        raise HTTPError(400, "Нужно подать список жанров")
+                    return 200, await self._call(self.set_preferences, name, genres)
+                if action == "recommendations":
+                    _allow(method, "GET")
+                    return 200, await self._call(
+                        self.recommend,
+                        name,
+                        params.get("strategy", "genres"),
+                        _optional(params, "min_rating", float),
+                        _optional(params, "min_year", int),
+                        _limit(params, MAX_RECOMMENDATIONS),
+                    )
+
+            if parts == ["movies"]:
+                _allow(method, "GET")
+                return 200, await self._call(
+                    self.find_movies,
+                    params.get("genre"),
+                    _optional(params, "min_rating", float),
+                    _optional(params, "max_rating", float),
+                    _optional(params, "min_year", int),
+                    _optional(params, "max_year", int),
+                    params.get("order_by", "rating"),
+                    _limit(params, DEFAULT_PAGE),
+                )
+
+            if parts == ["movies", "facets"]:
+                _allow(method, "GET")
+                return 200, await self._call(
+                    self.movie_facets,
+                    params.get("genre"),
+                    params.get("director"),
+                    _optional(params, "min_rating", float),
+                    _optional(params, "max_rating", float),
+                    _optional(params, "min_year", int),
+                    _optional(params, "max_year", int),
+                    _limit(params, DEFAULT_PAGE),
+                )
+
+            if parts == ["movies", "search"]:
+                _allow(method, "GET")
+                return 200, await self._call(
+                    self.search_movies, params.get("q", ""), _limit(params, DEFAULT_PAGE)
+                )
+
+            if len(parts) == 2 and parts[0] == "movies":
+                _allow(method, "GET")
+                return 200, await self._call(self.get_movie, int(parts[1]))
+        except (KeyError, TypeError, ValueError, OverflowError) as e:
+            raise HTTPError(400, f"Некорректный запрос: {e}")
+
+        raise HTTPError(404, "Неизвестный адрес")
+
+
+# ---
+# РАЗБОР И ФОРМИРОВАНИЕ HTTP
+# ---
+
+
+def _parse_head(head: bytes) -> tuple[str, str, bool, int]:
+    """Стартовая строка и заголовки: метод, путь, keep-alive, Content-Length."""
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, version = lines[0].split(" ", 2)
+    except ValueError:
+        raise HTTPError(400, "Некорректная стартовая строка")
+
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            key, _, value = line.partition(":")
+            headers[key.strip().lower()] = value.strip()
+
+    connection = headers.get("connection", "").lower()
+    if version == "HTTP/1.1":
+        keep_alive = connection != "close"
+    else:
+        keep_alive = connection == "keep-alive"
+
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise HTTPError(400, "Некорректный Content-Length")
+    return method, target, keep_alive, length
+
+
+def _response(status: int, payload: Any, keep_alive: bool) -> bytes:
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+        "Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+        "\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+def _allow(method: str, expected: str) -> None:
+    if method != expected:
+        raise HTTPError(405, f"Ожидался метод {expected}")
+
+
+def _json_body(body: bytes) -> dict:
+    try:
+        data = json.loads(body or b"{}")
+    except json.JSONDecodeError as e:
+        raise HTTPError(400, f"Некорректный JSON: {e}")
+    if not isinstance(data, dict):
+        raise HTTPError(400, "Ожидался JSON-объект")
+    return data
+
+
+def _optional(params: dict, key: str, cast: Callable) -> Any:
+    value = params.get(key)
+    if value in (None, ""):
+        return None
+    value = cast(value)
+    # float() принимает "inf" и "nan" — границей они быть не могут
+    if isinstance(value, float) and not math.isfinite(value):
+        raise ValueError(f"{key} должен быть конечным числом")
+    return value
+
+
+def _limit(params: dict, default: int) -> int:
+    limit = int(params.get("limit", default))
+    if limit < 0:
+        raise ValueError("limit не может быть отрицательным")
+    return limit
+
+
+async def main(host: str, port: int, movies_path: str) -> None:
+    service = RecommendationService(MovieDB(movies_path))
+    server = await service.serve(host, port)
+    addresses = ", ".join(str(s.getsockname()) for s in server.sockets)
+    print(f"Сервис рекомендаций слушает {addresses}", flush=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--movies", default="test_movies.json")
+    args = parser.parse_args()
+    try:
+        asyncio.run(main(args.host, args.port, args.movies))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,33 @@
+import sys, os
+import json
+
+import pytest
+
+# модули проекта импортируются от корня репозитория
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.entities.movie import Movie
+
+
+def make_records(count: int = 60) -> list:
+    """Каталог с повторяющимися рейтингами и годами (равные ключи в индексах)."""
+    genres = Movie.allowed_genres
+    return [
+        {
+            "id": i,
+            "title": f"Фильм {i}",
+            "genres": [genres[i % len(genres)], genres[(i * 3 + 1) % len(genres)]],
+            "year": 1980 + i % 25,
+            "rating": (i * 7) % 101 / 10,
+            "director": f"Режиссёр {i % 6}",
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+@pytest.fixture
+def movies_json(tmp_path):
+    """Путь к JSON-каталогу MovieDB во временной папке."""
+    path = tmp_path / "movies.json"
+    path.write_text(json.dumps(make_records(), ensure_ascii=False), encoding="utf-8")
+    return str(path)
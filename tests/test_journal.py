@@ -0,0 +1,115 @@
+import builtins
+import os
+
+import pytest
+
+import utils.movie_db as movie_db
+from core.entities.movie import Movie
+from utils.movie_db import MovieDB
+
+
+def disk_full(*args, **kwargs):
+    raise OSError("disk full")
+
+
+def state(db: MovieDB) -> list:
+    return [m.to_dict() for m in db.db]
+
+
+def test_journal_is_replayed_after_restart(movies_json):
+    db = MovieDB(movies_json, journal=True, compact_threshold=100)
+    db.add(Movie(1000, "Новый", ["драма"], 2001, 6.5))
+    db.delete(5)
+    db.update(Movie(7, "Обновлённый", ["комедия"], 1999, 8.0))
+    assert os.path.exists(movies_json + ".journal")
+
+    reopened = MovieDB(movies_json, journal=True, compact_threshold=100)
+    assert state(reopened) == state(db)
+    assert reopened.get_by_id(5) is None
+    assert reopened.get_by_id(7).title == "Обновлённый"
+    assert reopened.skipped_records == 0
+
+
+def test_torn_last_line_is_skipped_on_replay(movies_json):
+    db = MovieDB(movies_json, journal=True, compact_threshold=100)
+    db.add(Movie(1000, "Новый", ["драма"], 2001, 6.5))
+    with open(movies_json + ".journal", "a", encoding="utf-8") as f:
+        f.write('{"op": "delete", "id"')
+
+    reopened = MovieDB(movies_json, journal=True, compact_threshold=100)
+    assert reopened.get_by_id(1000) is not None
+    assert reopened.skipped_records == 1
+
+
+@pytest.mark.parametrize("in_transaction", [False, True])
+def test_compaction_failure_keeps_journaled_operations(movies_json, in_transaction):
+    db = MovieDB(movies_json, journal=True, compact_threshold=1)
+    # журнал пишется, а свернуть его в JSON не получается
+    db._write_files = disk_full
+
+    if in_transaction:
+        with db.transaction():
+            db.add(Movie(1000, "Новый", ["драма"], 2001, 6.5))
+            db.delete(1)
+    else:
+        db.add(Movie(1000, "Новый", ["драма"], 2001, 6.5))
+        db.delete(1)
+
+    # операции уже в журнале — в памяти они не откатываются
+    assert db.get_by_id(1000) is not None
+    assert db.get_by_id(1) is None
+
+    reopened = MovieDB(movies_json, journal=True, compact_threshold=1)
+    assert state(reopened) == state(db)
+
+    # следующая запись сворачивает журнал
+    reopened.delete(2)
+    assert not os.path.exists(movies_json + ".journal")
+    assert MovieDB(movies_json).get_by_id(1000) is not None
+
+
+class TornFile:
+    """Файл журнала, запись в который обрывается на середине."""
+
+    def __init__(self, f):
+        self._f = f
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._f.close()
+
+    def seek(self, *args):
+        return self._f.seek(*args)
+
+    def truncate(self, size):
+        return self._f.truncate(size)
+
+    def write(self, data):
+        self._f.write(bytes(data[: len(data) // 2]))
+        raise OSError("disk full")
+
+
+def test_failed_journal_append_is_truncated_and_rolled_back(movies_json, monkeypatch):
+    db = MovieDB(movies_json, journal=True, compact_threshold=100)
+    db.add(Movie(1000, "Первый", ["драма"], 2001, 6.5))
+    journal = movies_json + ".journal"
+    size = os.path.getsize(journal)
+    before = state(db)
+
+    monkeypatch.setattr(
+        movie_db, "open", lambda *a, **k: TornFile(builtins.open(*a, **k)), raising=False
+    )
+    with pytest.raises(OSError):
+        with db.transaction():
+            db.add(Movie(1001, "Второй", ["драма"], 2002, 5.0))
+            db.delete(1)
+    monkeypatch.undo()
+
+    assert os.path.getsize(journal) == size
+    assert state(db) == before
+
+    reopened = MovieDB(movies_json, journal=True)
+    assert reopened.skipped_records == 0
+    assert state(reopened) == before
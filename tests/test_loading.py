@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from core.entities.movie import Movie
+from utils.movie_db import MovieDB
+
+MODES = [
+    {},
+    {"columnar": True},
+    {"snapshot": True},
+    {"concurrent": True},
+]
+
+BAD_RECORDS = [
+    {"id": 1, "title": "A", "genres": ["драма"], "year": 1994, "rating": 7.0},
+    # год-строка: раньше запись попадала в db, но не в индексы
+    {"id": 2, "title": "B", "genres": ["драма"], "year": "1994", "rating": 7.0},
+    # год не помещается в колонку array("i")
+    {"id": 3, "title": "C", "genres": ["драма"], "year": 2**40, "rating": 7.0},
+    {"id": 4, "title": "D", "genres": ["нет такого"], "year": 2000, "rating": 7.0},
+    {"id": 5, "title": "E", "genres": ["драма"], "year": 2000, "rating": 70},
+    {"id": 6, "title": "F", "genres": ["драма"], "year": 2001, "rating": 8.0},
+    {"id": 7, "title": "G", "genres": ["драма"], "year": 1999.0, "rating": 8.0},
+    {"title": "без id"},
+    "не объект",
+]
+
+
+@pytest.fixture
+def bad_json(tmp_path):
+    path = tmp_path / "bad.json"
+    path.write_text(json.dumps(BAD_RECORDS, ensure_ascii=False), encoding="utf-8")
+    return str(path)
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_malformed_records_are_skipped(bad_json, mode):
+    skipped = []
+    db = MovieDB(bad_json, on_bad_record=lambda item, e: skipped.append(item), **mode)
+
+    assert sorted(m.id for m in db.db) == [1, 6]
+    assert db.skipped_records == len(BAD_RECORDS) - 2
+    assert len(skipped) == db.skipped_records
+
+    # индексы согласованы с db: пропущенные записи не оставили следов
+    assert [m.id for m in db.sort_by_year()] == [1, 6]
+    assert [m.id for m in db.find_in_range(min_year=1990)] == [6, 1]
+    assert [m.id for m in db.find_by_genre("драма")] == [1, 6]
+    assert db.facets()["decades"] == {1990: 1, 2000: 1}
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_database_stays_consistent_after_skipped_records(bad_json, mode):
+    db = MovieDB(bad_json, **mode)
+    db.add(Movie(10, "Новый", ["комедия"], 1995, 6.0))
+    db.delete(1)
+
+    assert [m.id for m in db.sort_by_year()] == [10, 6]
+    assert [m.id for m in db.page(limit=10, order_by="rating").movies] == [6, 10]
+    assert db.get_by_title("новый").id == 10
+
+
+def test_snapshot_is_used_for_clean_catalog_only(bad_json):
+    MovieDB(bad_json, snapshot=True)
+    # снапшот пишется из уже проверенных фильмов — битых записей в нём нет
+    db = MovieDB(bad_json, snapshot=True)
+    assert sorted(m.id for m in db.db) == [1, 6]
+    assert db.skipped_records == 0
+
+
+def test_jsonl_with_broken_line(tmp_path):
+    path = tmp_path / "movies.jsonl"
+    lines = [json.dumps(r, ensure_ascii=False) for r in BAD_RECORDS[:1] + BAD_RECORDS[5:6]]
+    path.write_text(lines[0] + "\n{не json\n" + lines[1] + "\n", encoding="utf-8")
+
+    db = MovieDB(str(path))
+    assert sorted(m.id for m in db.db) == [1, 6]
+    assert db.skipped_records == 1
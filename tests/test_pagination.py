@@ -0,0 +1,113 @@
+import pytest
+
+from core.entities.movie import Movie
+from utils.mapped_movie_db import MappedMovieDB
+from utils.movie_db import MovieDB
+from utils.sqlite_db import SQLiteMovieDB
+
+QUERIES = [
+    {},
+    {"order_by": "rating"},
+    {"order_by": "year"},
+    {"order_by": "year", "reverse": True},
+    {"order_by": "rating", "reverse": False, "min_year": 1990},
+    {"order_by": "rating", "any_of": ["драма", "ужасы"], "min_rating": 3, "max_rating": 8.5},
+    {"order_by": "year", "all_of": ["комедия", "фантастика"]},
+    {"none_of": ["драма"], "reverse": True},
+    {"any_of": ["нет такого"]},
+]
+
+
+@pytest.fixture(params=["movie_db", "mapped", "sqlite"])
+def catalog(request, movies_json, tmp_path):
+    """Один и тот же каталог в каждом хранилище."""
+    if request.param == "movie_db":
+        yield MovieDB(movies_json)
+    elif request.param == "mapped":
+        MovieDB(movies_json, snapshot=True)
+        with MappedMovieDB(movies_json + ".snap") as db:
+            yield db
+    else:
+        with SQLiteMovieDB.from_json(str(tmp_path / "movies.sqlite"), movies_json) as db:
+            yield db
+
+
+def walk(db, limit: int, **query) -> list:
+    movies, cursor = [], None
+    while True:
+        page = db.page(limit=limit, cursor=cursor, **query)
+        movies.extend(page.movies)
+        if page.next_cursor is None:
+            return movies
+        assert len(page.movies) == limit
+        cursor = page.next_cursor
+
+
+def sort_key(movie: Movie, order_by: str):
+    return movie.id if order_by == "id" else getattr(movie, order_by)
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_pages_cover_iter_movies(catalog, movies_json, query):
+    expected = list(catalog.iter_movies(**query))
+    for limit in (1, 7, 1000):
+        assert [m.id for m in walk(catalog, limit, **query)] == [m.id for m in expected]
+
+    # тот же набор и порядок по полю, что у MovieDB (равные ключи — в порядке хранилища)
+    reference = list(MovieDB(movies_json).iter_movies(**query))
+    order_by = query.get("order_by", "id")
+    assert sorted(m.id for m in expected) == sorted(m.id for m in reference)
+    assert [sort_key(m, order_by) for m in expected] == [
+        sort_key(m, order_by) for m in reference
+    ]
+
+
+def test_page_errors(catalog):
+    with pytest.raises(ValueError):
+        catalog.page(limit=0)
+    with pytest.raises(ValueError):
+        catalog.page(order_by="title")
+    with pytest.raises(ValueError):
+        catalog.page(genre="драма")
+    with pytest.raises(ValueError):
+        catalog.page(cursor="не курсор")
+
+    cursor = catalog.page(limit=3, order_by="year").next_cursor
+    with pytest.raises(ValueError):
+        catalog.page(cursor=cursor, order_by="rating")
+    with pytest.raises(ValueError):
+        catalog.page(cursor=cursor, order_by="year", reverse=True)
+
+
+def test_find_by_director(catalog, movies_json):
+    reference = MovieDB(movies_json)
+    for director in ("Режиссёр 0", "Режиссёр 5"):
+        assert sorted(m.id for m in catalog.find_by_director(director)) == sorted(
+            m.id for m in reference.find_by_director(director)
+        )
+    assert catalog.find_by_director("Нет такого") == []
+
+
+@pytest.mark.parametrize("mode", [{}, {"columnar": True}, {"concurrent": True}])
+def test_cursor_survives_changes_between_pages(movies_json, mode):
+    db = MovieDB(movies_json, **mode)
+    first = db.page(limit=10, order_by="rating")
+    seen = [m.id for m in first.movies]
+
+    # удаляем ещё не выданный фильм и добавляем фильм выше курсора
+    remaining = [m.id for m in db.iter_movies(order_by="rating")][10:]
+    db.delete(remaining[0])
+    db.add(Movie(1000, "Лучший", ["драма"], 2000, 10.0))
+
+    rest = walk_from(db, first.next_cursor, order_by="rating")
+    assert rest == remaining[1:]
+    assert not set(rest) & set(seen)
+
+
+def walk_from(db, cursor, **query) -> list:
+    ids = []
+    while cursor is not None:
+        page = db.page(limit=4, cursor=cursor, **query)
+        ids.extend(m.id for m in page.movies)
+        cursor = page.next_cursor
+    return ids
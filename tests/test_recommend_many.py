@@ -0,0 +1,78 @@
+import random
+
+import pytest
+
+from core.entities.movie import Movie
+from recommender.collaborative import SimilarUsersStrategy
+from recommender.similarity import UserLSHIndex
+from recommender.strategies import (
+    RecommendationEngine,
+    UserGenreRecommendationStrategy,
+    UserSnapshot,
+)
+
+
+def make_catalog(count: int = 300) -> list:
+    rnd = random.Random(1)
+    return [
+        Movie(
+            i,
+            f"Фильм {i}",
+            rnd.sample(Movie.allowed_genres, 2),
+            rnd.randint(1950, 2024),
+            rnd.randint(0, 100) / 10,
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def make_rated_users(movies: list, count: int = 40) -> list:
+    rnd = random.Random(2)
+    users = []
+    for i in range(count):
+        ratings = {
+            m.id: float(rnd.randint(1, 10)) for m in rnd.sample(movies[:60], 12)
+        }
+        users.append(
+            UserSnapshot(f"user{i}", rnd.sample(Movie.allowed_genres, 2), ratings)
+        )
+    return users
+
+
+def ids(movies: list) -> list:
+    return [m.id for m in movies]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_recommend_many_similar_users_matches_loop(workers):
+    movies = make_catalog()
+    users = make_rated_users(movies)
+    index = UserLSHIndex()
+    for user in users:
+        index.add_user(user)
+    engine = RecommendationEngine(SimilarUsersStrategy(index, top_n=5))
+    by_name = {u.name: u for u in users}
+
+    expected = {
+        u.name: ids(engine.recommend(movies, user=u, users=by_name)) for u in users
+    }
+    batch = dict(
+        engine.recommend_many(
+            movies, users, workers=workers, chunk_size=8, users=by_name
+        )
+    )
+
+    assert {name: ids(result) for name, result in batch.items()} == expected
+    assert any(expected.values())
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_recommend_many_genres_matches_loop(workers):
+    movies = make_catalog()
+    users = make_rated_users(movies)
+    engine = RecommendationEngine(UserGenreRecommendationStrategy(top_n=5))
+
+    expected = {u.name: ids(engine.recommend(movies, user=u)) for u in users}
+    batch = dict(engine.recommend_many(movies, users, workers=workers, chunk_size=8))
+
+    assert {name: ids(result) for name, result in batch.items()} == expected
@@ -0,0 +1,122 @@
+import pytest
+
+import utils.movie_db as movie_db
+from core.entities.movie import Movie
+from core.entities.user import User
+from utils.movie_db import MovieDB
+from utils.user_db import UserDB
+
+MODES = [
+    {},
+    {"columnar": True},
+    {"journal": True},
+    {"concurrent": True},
+]
+
+
+def disk_full(*args, **kwargs):
+    raise OSError("disk full")
+
+
+def state(db: MovieDB) -> tuple:
+    """Всё, что видно снаружи: порядок каталога, индексов и счётчики."""
+    return (
+        [m.to_dict() for m in db.db],
+        [m.id for m in db.find_in_range(min_rating=0)],
+        [m.id for m in db.page(limit=1000, order_by="year").movies],
+        [m.id for m in db.find_by_director("Режиссёр 1")],
+        db.facets(),
+    )
+
+
+def mutate(db: MovieDB) -> None:
+    db.delete(11)
+    db.delete(4)
+    db.update(Movie(21, "Новое название", ["драма"], 1999, 5.0))
+    db.add(Movie(1001, "Добавленный", ["комедия"], 2000, 5.0))
+    db.delete(1)
+    db.update(Movie(6, "Ещё одно", ["аниме"], 1998, 9.0))
+    db.delete(1001)
+    db.add(Movie(1002, "Второй", ["комедия"], 2000, 5.0))
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_rollback_restores_catalog_and_order(movies_json, mode):
+    db = MovieDB(movies_json, **mode)
+    order = [m.id for m in db.db]
+    before = state(db)
+
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            mutate(db)
+            raise RuntimeError("стоп")
+
+    assert state(db) == before
+    if mode.get("concurrent"):
+        assert [m.id for m in db.snapshot().db] == order
+
+    # сохранение после отката не переставляет фильмы в файле
+    db.save()
+    assert [m.id for m in MovieDB(movies_json, **mode).db] == order
+
+
+@pytest.mark.parametrize("mode", [{}, {"columnar": True}])
+def test_failed_save_rolls_back_transaction(movies_json, mode, monkeypatch):
+    db = MovieDB(movies_json, **mode)
+    before = state(db)
+    monkeypatch.setattr(movie_db, "atomic_write", disk_full)
+
+    with pytest.raises(OSError):
+        with db.transaction():
+            mutate(db)
+
+    assert state(db) == before
+
+
+def test_failed_journal_append_rolls_back_single_operation(movies_json):
+    db = MovieDB(movies_json, journal=True)
+    before = state(db)
+    db._append_journal = disk_full
+
+    for operation in (
+        lambda: db.delete(7),
+        lambda: db.update(Movie(8, "Другое", ["драма"], 2000, 5.0)),
+        lambda: db.add(Movie(1001, "Новый", ["драма"], 2000, 5.0)),
+    ):
+        with pytest.raises(OSError):
+            operation()
+    assert state(db) == before
+
+
+def test_nested_transaction_joins_outer(movies_json):
+    db = MovieDB(movies_json)
+    before = state(db)
+
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            db.delete(3)
+            with db.transaction():
+                db.delete(5)
+            raise RuntimeError("стоп")
+
+    assert state(db) == before
+
+
+def test_user_rollback_restores_order(tmp_path):
+    db = UserDB(str(tmp_path / "users.json"))
+    db.add_users([User(f"user{i}", "secret") for i in range(10)])
+    order = list(db.by_id)
+    names = {key: user.user_name for key, user in db.by_id.items()}
+
+    replacement = User("replacement", "secret")
+    replacement.id = order[7]
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            db.add_user(User("new", "secret"))
+            db.delete_user(order[4])
+            db.delete_user(order[0])
+            db.add_user(replacement)
+            raise RuntimeError("стоп")
+
+    assert list(db.by_id) == order
+    assert {key: user.user_name for key, user in db.by_id.items()} == names
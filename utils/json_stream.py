@@ -0,0 +1,94 @@
+import json
+from typing import Any, Iterator, TextIO
+
+_WHITESPACE = " \t\r\n"
+
+
+def iter_json_array(f: TextIO, chunk_size: int = 1 << 16) -> Iterator[Any]:
+    """
+    Читает JSON-массив верхнего уровня по одному элементу.
+    В памяти одновременно держится только буфер размером около chunk_size
+    и текущий элемент, а не весь файл и весь распарсенный список.
+    Пустой файл считается пустым массивом.
+    """
+    decoder = json.JSONDecoder()
+    buf = f.read(chunk_size)
+    eof = not buf
+    pos = _skip(buf, 0, _WHITESPACE)
+
+    if pos == len(buf) and eof:
+        return
+    if buf[pos:pos + 1] != "[":
+        raise json.JSONDecodeError("Ожидался JSON-массив", buf, pos)
+    pos += 1
+    expect_comma = False
+    after_comma = False
+
+    while True:
+        # добираем буфер, пока после pos нет значимого символа
+        pos = _skip(buf, pos, _WHITESPACE)
+        while pos == len(buf) and not eof:
+            buf, pos, eof = _refill(f, buf, pos, chunk_size)
+            pos = _skip(buf, pos, _WHITESPACE)
+        if pos == len(buf):
+            raise json.JSONDecodeError("Незакрытый JSON-массив", buf, pos)
+
+        char = buf[pos]
+        if char == "]" and (expect_comma or not after_comma):
+            return
+        if expect_comma:
+            if char != ",":
+                raise json.JSONDecodeError("Ожидалась запятая", buf, pos)
+            pos += 1
+            expect_comma = False
+            after_comma = True
+            continue
+
+        while True:
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                buf, pos, eof = _refill(f, buf, pos, chunk_size)
+                continue
+            # за элементом должен идти разделитель; если его не видно,
+            # значение (например, число 1.5e|10) могло обрезаться — дочитываем
+            after = _skip(buf, end, _WHITESPACE)
+            if not eof and (after == len(buf) or buf[after] not in ",]"):
+                buf, pos, eof = _refill(f, buf, pos, chunk_size)
+                continue
+            break
+
+        yield item
+        pos = end
+        expect_comma = True
+        after_comma = False
+
+
+def iter_json_lines(f: TextIO) -> Iterator[Any]:
+    """
+    Читает JSON Lines: по одному JSON-значению на строку.
+    Битая строка не прерывает чтение — вместо значения отдаётся
+    исключение json.JSONDecodeError, пустые строки пропускаются.
+    """
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            yield e
+
+
+def _skip(buf: str, pos: int, chars: str) -> int:
+    while pos < len(buf) and buf[pos] in chars:
+        pos += 1
+    return pos
+
+
+def _refill(f: TextIO, buf: str, pos: int, chunk_size: int):
+    """Отбрасывает разобранную часть буфера и дочитывает следующий кусок."""
+    chunk = f.read(chunk_size)
+    return buf[pos:] + chunk, 0, not chunk
@@ -0,0 +1,605 @@
+import sys, os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import math
+import mmap
+import threading
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Optional, Tuple
+from core.entities.movie import Movie
+from utils.snapshot import (
+    KIND_MOVIES,
+    MOVIE_DIRECTOR_OFFSETS,
+    MOVIE_DIRECTOR_REFS,
+    MOVIE_DIRECTORS,
+    MOVIE_GENRE_ORDER,
+    MOVIE_GENRE_ORDER_OFFSETS,
+    MOVIE_GENRES,
+    MOVIE_ID_ORDER,
+    MOVIE_IDS,
+    MOVIE_RATING_ORDER,
+    MOVIE_RATINGS,
+    MOVIE_TITLE_OFFSETS,
+    MOVIE_TITLE_ORDER,
+    MOVIE_TITLES,
+    MOVIE_YEAR_ORDER,
+    MOVIE_YEARS,
+    read_snapshot,
+)
+from utils.movie_db import (
+    ORDINAL_BITS,
+    ORDINAL_MASK,
+    PAGE_DEFAULT_REVERSE,
+    MoviePage,
+    decode_cursor,
+    encode_cursor,
+    page_filter_masks,
+)
+from utils.title_index import TitleIndex
+
+
+class MappedMovieTable:
+    """
+    Колонки снапшота фильмов прямо из mmap (memoryview без копирования).
+    Повторяет read-интерфейс MovieTable (ids, ratings, genre_masks, scan,
+    table[row]), поэтому стратегии работают с ним так же, как с колоночным
+    MovieDB. Строка декодируется в Movie только при обращении.
+    """
+
+    def __init__(self, snapshot_path: str):
+        if sys.byteorder != "little":
+            raise ValueError("mmap-режим поддерживается только на little-endian")
+
+        self._file = open(snapshot_path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        # CRC не проверяем: это O(размер файла), см. MappedMovieDB.verify()
+        snap = read_snapshot(self._map, KIND_MOVIES, verify=False)
+        s = snap.sections
+        self.count = snap.count
+
+        self.ids = s[MOVIE_IDS].cast("q")
+        self.years = s[MOVIE_YEARS].cast("i")
+        self.ratings = s[MOVIE_RATINGS].cast("H")
+        self.genre_masks = s[MOVIE_GENRES].cast("I")
+        self.directors = s[MOVIE_DIRECTOR_REFS].cast("I")
+        self.id_order = s[MOVIE_ID_ORDER].cast("I")
+        self.title_order = s[MOVIE_TITLE_ORDER].cast("I")
+        self.rating_order = s[MOVIE_RATING_ORDER].cast("I")
+        self.year_order = s[MOVIE_YEAR_ORDER].cast("I")
+
+        self._title_offsets = s[MOVIE_TITLE_OFFSETS].cast("Q")
+        self._titles = s[MOVIE_TITLES]
+        self._director_offsets = s[MOVIE_DIRECTOR_OFFSETS].cast("Q")
+        self._director_blob = s[MOVIE_DIRECTORS]
+        self._genre_order_offsets = s[MOVIE_GENRE_ORDER_OFFSETS].cast("Q")
+        self._genre_orders = s[MOVIE_GENRE_ORDER]
+
+    def close(self):
+        for view in (
+            self.ids, self.years, self.ratings, self.genre_masks, self.directors,
+            self.id_order, self.title_order, self.rating_order, self.year_order,
+            self._title_offsets, self._titles,
+            self._director_offsets, self._director_blob,
+            self._genre_order_offsets, self._genre_orders,
+        ):
+            view.release()
+        self._map.close()
+        self._file.close()
+
+    # ---
+    # ЧТЕНИЕ СТРОК
+    # ---
+
+    def title(self, row: int) -> str:
+        offsets = self._title_offsets
+        return bytes(self._titles[offsets[row]:offsets[row + 1]]).decode("utf-8")
+
+    def director(self, row: int) -> str:
+        return self.director_name(self.directors[row])
+
+    def director_name(self, ref: int) -> str:
+        """Имя режиссёра по номеру в словаре режиссёров (колонка directors)."""
+        offsets = self._director_offsets
+        return bytes(self._director_blob[offsets[ref]:offsets[ref + 1]]).decode("utf-8")
+
+    def director_ref(self, name: str) -> Optional[int]:
+        """Номер режиссёра в словаре (проход по словарю); None — такого нет."""
+        for ref in range(len(self._director_offsets) - 1):
+            if self.director_name(ref) == name:
+                return ref
+        return None
+
+    def genre_order(self, row: int) -> bytes:
+        offsets = self._genre_order_offsets
+        return bytes(self._genre_orders[offsets[row]:offsets[row + 1]])
+
+    def __getitem__(self, row: int) -> Movie:
+        return Movie.trusted(
+            self.ids[row],
+            self.title(row),
+            self.genre_masks[row],
+            self.years[row],
+            self.ratings[row] / 10,
+            self.director(row),
+            self.genre_order(row),
+        )
+
+    def __len__(self) -> int:
+        return self.count
+
+    def scan(
+        self,
+        genre_mask: int = 0,
+        min_rating: Optional[float] = None,
+        min_year: Optional[int] = None,
+        max_rating: Optional[float] = None,
+        max_year: Optional[int] = None,
+    ) -> List[int]:
+        """Как MovieTable.scan: номера строк, прошедших фильтры."""
+        min_rating_key = (
+            -1 if min_rating is None else math.ceil(round(min_rating * 10, 6))
+        )
+        max_rating_key = (
+            100 if max_rating is None else math.floor(round(max_rating * 10, 6))
+        )
+        min_year = -(2 ** 31) if min_year is None else min_year
+        max_year = 2 ** 31 if max_year is None else max_year
+
+        return [
+            row
+            for row, (mask, rating, year) in enumerate(
+                zip(self.genre_masks, self.ratings, self.years)
+            )
+            if (not genre_mask or mask & genre_mask)
+            and min_rating_key <= rating <= max_rating_key
+            and min_year <= year <= max_year
+        ]
+
+
+class _MappedRows:
+    """Последовательность фильмов в порядке строк файла (MappedMovieDB.db)."""
+
+    def __init__(self, table: MappedMovieTable):
+        self._table = table
+
+    @property
+    def table(self) -> MappedMovieTable:
+        return self._table
+
+    def __iter__(self) -> Iterator[Movie]:
+        table = self._table
+        for row in range(len(table)):
+            yield table[row]
+
+    def __getitem__(self, row: int) -> Movie:
+        if not 0 <= row < len(self._table):
+            raise IndexError(row)
+        return self._table[row]
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+
+class _SortedIndex(Mapping):
+    """
+    Индекс ключ -> Movie бинарным поиском по перестановке строк из файла:
+    в памяти процесса ничего не строится.
+    """
+
+    def __init__(self, table: MappedMovieTable, order, key_of):
+        self._table = table
+        self._order = order
+        self._key_of = key_of
+
+    def _find(self, key) -> Optional[int]:
+        order, key_of = self._order, self._key_of
+        i = bisect_left(order, key, key=key_of)
+        if i < len(order) and key_of(order[i]) == key:
+            return order[i]
+        return None
+
+    def __getitem__(self, key) -> Movie:
+        row = self._find(key)
+        if row is None:
+            raise KeyError(key)
+        return self._table[row]
+
+    def __contains__(self, key) -> bool:
+        return self._find(key) is not None
+
+    def __iter__(self):
+        key_of = self._key_of
+        return (key_of(row) for row in self._order)
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+
+class MappedMovieDB:
+    """
+    Read-only каталог поверх mmap снапшота MovieDB (MovieDB(snapshot=True)
+    пишет его рядом с JSON как <db>.snap).
+
+    Открытие — O(1): читается только заголовок, колонки остаются в page cache
+    и общие для всех процессов, открывших тот же файл. by_id / by_title ищут
+    бинарным поиском по перестановкам, сохранённым в файле; Movie создаётся
+    только для фильмов, которые вернул запрос.
+    """
+
+    def __init__(self, snapshot_path: str):
+        self._snapshot_path = snapshot_path
+        self.table = MappedMovieTable(snapshot_path)
+
+        self.db = _MappedRows(self.table)
+        self.by_id = _SortedIndex(self.table, self.table.id_order, self.table.ids.__getitem__)
+        self.by_title = _SortedIndex(
+            self.table, self.table.title_order, lambda row: self.table.title(row).lower()
+        )
+
+        # каталог неизменяем — версия для кеша рекомендаций постоянна
+        self.version = 0
+
+        # индекс названий строится при первом search_titles
+        self._title_index: Optional[TitleIndex] = None
+        self._title_lock = threading.Lock()
+
+    def close(self):
+        self.table.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def verify(self):
+        """Полная проверка CRC (читает весь файл)."""
+        with open(self._snapshot_path, "rb") as f:
+            read_snapshot(f.read(), KIND_MOVIES)
+
+    # ---
+    # ИЗМЕНЕНИЯ ЗАПРЕЩЕНЫ
+    # ---
+
+    def add(self, movie: Movie):
+        raise ValueError("База открыта только для чтения.")
+
+    def delete(self, movie_id: int):
+        raise ValueError("База открыта только для чтения.")
+
+    def update(self, movie: Movie):
+        raise ValueError("База открыта только для чтения.")
+
+    # ---
+    # ПОИСК
+    # ---
+
+    def get_by_id(self, movie_id: int) -> Optional[Movie]:
+        return self.by_id.get(movie_id)
+
+    def get_by_title(self, title: str) -> Optional[Movie]:
+        return self.by_title.get(title.lower())
+
+    def find_by_genre(self, genre: str) -> List[Movie]:
+        return self.find_by_genres(any_of=[genre])
+
+    def find_by_director(self, director: str) -> List[Movie]:
+        """То же, что MovieDB.find_by_director, проходом по колонке ссылок."""
+        table = self.table
+        ref = table.director_ref(director)
+        if ref is None:
+            return []
+        return [table[row] for row, r in enumerate(table.directors) if r == ref]
+
+    def search_titles(
+        self, query: str, limit: int = 10, fuzzy: bool = True
+    ) -> List[Movie]:
+        """То же, что MovieDB.search_titles; индекс — в памяти процесса."""
+        if self._title_index is None:
+            with self._title_lock:
+                if self._title_index is None:
+                    table = self.table
+                    self._title_index = TitleIndex.build(
+                        (row, table.title(row)) for row in range(len(table))
+                    )
+        table = self.table
+        return [table[row] for row in self._title_index.find(query, limit, fuzzy)]
+
+    def find_by_genres(
+        self,
+        any_of: Optional[List[str]] = None,
+        all_of: Optional[List[str]] = None,
+        none_of: Optional[List[str]] = None,
+    ) -> List[Movie]:
+        """То же, что MovieDB.find_by_genres, проходом по колонке масок."""
+        any_mask = self._mask(any_of)
+        all_mask = self._mask(all_of)
+        none_mask = self._mask(none_of)
+        if any_mask is None or all_mask is None:
+            return []
+
+        table = self.table
+        return [
+            table[row]
+            for row, mask in enumerate(table.genre_masks)
+            if (not any_mask or mask & any_mask)
+            and mask & all_mask == all_mask
+            and not mask & (none_mask or 0)
+        ]
+
+    @staticmethod
+    def _mask(genres: Optional[List[str]]) -> Optional[int]:
+        """Маска жанров; None — в фильтре есть жанр, которого нет в каталоге."""
+        genres = genres or []
+        if any(g not in Movie.allowed_genres for g in genres):
+            return None
+        return Movie.genres_to_mask(genres)
+
+    # ---
+    # ФАСЕТЫ
+    # ---
+
+    def facets(
+        self,
+        any_of: Optional[List[str]] = None,
+        all_of: Optional[List[str]] = None,
+        none_of: Optional[List[str]] = None,
+        min_rating: Optional[float] = None,
+        max_rating: Optional[float] = None,
+        min_year: Optional[int] = None,
+        max_year: Optional[int] = None,
+        director: Optional[str] = None,
+        top_directors: Optional[int] = None,
+    ) -> Dict[str, Dict]:
+        """
+        То же, что MovieDB.facets (жанры — как в find_by_genres этого класса).
+        Битсетов здесь нет: один проход по колонкам масок, годов и ссылок
+        на режиссёров, Counter считает различные значения, а жанры
+        и имена режиссёров разворачиваются уже из счётчиков.
+        """
+        table = self.table
+        rows = self._filter_rows(
+            any_of, all_of, none_of, min_rating, max_rating, min_year, max_year, director
+        )
+        if rows is None:
+            masks = Counter(table.genre_masks)
+            years = Counter(table.years)
+            refs = Counter(table.directors)
+        else:
+            masks = Counter(map(table.genre_masks.__getitem__, rows))
+            years = Counter(map(table.years.__getitem__, rows))
+            refs = Counter(map(table.directors.__getitem__, rows))
+
+        genres = Counter()
+        for mask, count in masks.items():
+            for genre in Movie.mask_to_genres(mask):
+                genres[genre] += count
+
+        decades: Dict[int, int] = {}
+        for year in sorted(years):
+            decade = year // 10 * 10
+            decades[decade] = decades.get(decade, 0) + years[year]
+
+        return {
+            "genres": dict(genres.most_common()),
+            "decades": decades,
+            "directors": {
+                table.director_name(ref): count
+                for ref, count in refs.most_common(top_directors)
+            },
+        }
+
+    def _filter_rows(
+        self,
+        any_of: Optional[List[str]],
+        all_of: Optional[List[str]],
+        none_of: Optional[List[str]],
+        min_rating: Optional[float],
+        max_rating: Optional[float],
+        min_year: Optional[int],
+        max_year: Optional[int],
+        director: Optional[str],
+    ) -> Optional[List[int]]:
+        """Строки, прошедшие фильтры; None — фильтров нет (все строки)."""
+        if not (any_of or all_of or none_of) and all(
+            v is None for v in (min_rating, max_rating, min_year, max_year, director)
+        ):
+            return None
+
+        any_mask = self._mask(any_of)
+        all_mask = self._mask(all_of)
+        none_mask = self._mask(none_of) or 0
+        if any_mask is None or all_mask is None:
+            return []
+
+        table = self.table
+        ref = -1
+        if director is not None:
+            ref = table.director_ref(director)
+            if ref is None:
+                return []
+
+        rating_lo = -1 if min_rating is None else math.ceil(round(min_rating * 10, 6))
+        rating_hi = 100 if max_rating is None else math.floor(round(max_rating * 10, 6))
+        year_lo = -(2 ** 31) if min_year is None else min_year
+        year_hi = 2 ** 31 if max_year is None else max_year
+
+        return [
+            row
+            for row, (mask, rating, year, director_ref) in enumerate(
+                zip(table.genre_masks, table.ratings, table.years, table.directors)
+            )
+            if (not any_mask or mask & any_mask)
+            and mask & all_mask == all_mask
+            and not mask & none_mask
+            and rating_lo <= rating <= rating_hi
+            and year_lo <= year <= year_hi
+            and (ref < 0 or director_ref == ref)
+        ]
+
+    # ---
+    # СОРТИРОВКА
+    # ---
+
+    def sort_by_rating(self, reverse: bool = True) -> List[Movie]:
+        return self.find_in_range(order_by="rating", reverse=reverse)
+
+    def sort_by_year(self, reverse: bool = False) -> List[Movie]:
+        return self.find_in_range(order_by="year", reverse=reverse)
+
+    def find_in_range(
+        self,
+        min_rating: Optional[float] = None,
+        max_rating: Optional[float] = None,
+        min_year: Optional[int] = None,
+        max_year: Optional[int] = None,
+        order_by: str = "rating",
+        reverse: Optional[bool] = None,
+    ) -> List[Movie]:
+        """То же, что MovieDB.find_in_range, по перестановкам из файла."""
+        table = self.table
+        rating_lo = None if min_rating is None else math.ceil(round(min_rating * 10, 6))
+        rating_hi = None if max_rating is None else math.floor(round(max_rating * 10, 6))
+
+        if order_by == "rating":
+            order, key_of = table.rating_order, table.ratings.__getitem__
+            lo, hi = rating_lo, rating_hi
+            other, other_lo, other_hi = table.years, min_year, max_year
+            if reverse is None:
+                reverse = True
+        elif order_by == "year":
+            order, key_of = table.year_order, table.years.__getitem__
+            lo, hi = min_year, max_year
+            other, other_lo, other_hi = table.ratings, rating_lo, rating_hi
+            if reverse is None:
+                reverse = False
+        else:
+            raise ValueError(f"Нельзя упорядочить по полю: {order_by}")
+
+        start = 0 if lo is None else bisect_left(order, lo, key=key_of)
+        stop = len(order) if hi is None else bisect_right(order, hi, key=key_of)
+        rows = range(stop - 1, start - 1, -1) if reverse else range(start, stop)
+
+        result = []
+        for i in rows:
+            row = order[i]
+            value = other[row]
+            if other_lo is not None and value < other_lo:
+                continue
+            if other_hi is not None and value > other_hi:
+                continue
+            result.append(table[row])
+        return result
+
+    # ---
+    # ПОСТРАНИЧНЫЙ ОБХОД
+    # ---
+
+    def page(
+        self,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        order_by: str = "id",
+        reverse: Optional[bool] = None,
+        **filters,
+    ) -> MoviePage:
+        """
+        То же, что MovieDB.page. Ключ курсора — как у MovieDB, только вместо
+        ordinal'а номер строки файла: (значение << 32) | строка, для "id" — ID.
+        """
+        if limit <= 0:
+            raise ValueError("Размер страницы должен быть положительным.")
+        if reverse is None:
+            reverse = PAGE_DEFAULT_REVERSE.get(order_by, False)
+        after = None if cursor is None else decode_cursor(cursor, order_by, reverse)
+
+        movies: List[Movie] = []
+        last_key = None
+        for key, movie in self._iter_keyed(order_by, reverse, after, filters):
+            if len(movies) == limit:
+                return MoviePage(movies, encode_cursor(order_by, reverse, last_key))
+            movies.append(movie)
+            last_key = key
+        return MoviePage(movies, None)
+
+    def iter_movies(
+        self,
+        order_by: str = "id",
+        reverse: Optional[bool] = None,
+        **filters,
+    ) -> Iterator[Movie]:
+        """То же, что MovieDB.iter_movies (фильтры — те же ключевые аргументы)."""
+        if reverse is None:
+            reverse = PAGE_DEFAULT_REVERSE.get(order_by, False)
+        for _, movie in self._iter_keyed(order_by, reverse, None, filters):
+            yield movie
+
+    def _iter_keyed(
+        self, order_by: str, reverse: bool, after: Optional[int], filters: dict
+    ) -> Iterator[Tuple[int, Movie]]:
+        """
+        (ключ, фильм) после ключа after: бинарный поиск по перестановке
+        из файла, фильтры проверяются по колонкам до создания Movie.
+        Файл неизменяем, поэтому порции, как у MovieDB, не нужны.
+        """
+        masks = page_filter_masks(filters)
+        if masks is None:
+            return
+        any_mask, all_mask, none_mask = masks
+
+        min_rating, max_rating = filters.get("min_rating"), filters.get("max_rating")
+        rating_lo = None if min_rating is None else math.ceil(round(min_rating * 10, 6))
+        rating_hi = None if max_rating is None else math.floor(round(max_rating * 10, 6))
+        year_lo, year_hi = filters.get("min_year"), filters.get("max_year")
+
+        table = self.table
+        ratings, years, genre_masks = table.ratings, table.years, table.genre_masks
+        # перестановки в файле отсортированы стабильно: равные значения — по строке
+        if order_by == "id":
+            order, key_of, lo, hi = table.id_order, table.ids.__getitem__, None, None
+        elif order_by == "rating":
+            order = table.rating_order
+            key_of = lambda row: (ratings[row] << ORDINAL_BITS) | row
+            lo = None if rating_lo is None else rating_lo << ORDINAL_BITS
+            hi = None if rating_hi is None else (rating_hi << ORDINAL_BITS) | ORDINAL_MASK
+        elif order_by == "year":
+            order = table.year_order
+            key_of = lambda row: (years[row] << ORDINAL_BITS) | row
+            lo = None if year_lo is None else year_lo << ORDINAL_BITS
+            hi = None if year_hi is None else (year_hi << ORDINAL_BITS) | ORDINAL_MASK
+        else:
+            raise ValueError(f"Нельзя упорядочить по полю: {order_by}")
+
+        if after is not None:
+            if reverse:
+                hi = after - 1 if hi is None else min(hi, after - 1)
+            else:
+                lo = after + 1 if lo is None else max(lo, after + 1)
+
+        start = 0 if lo is None else bisect_left(order, lo, key=key_of)
+        stop = len(order) if hi is None else bisect_right(order, hi, key=key_of)
+        for i in range(stop - 1, start - 1, -1) if reverse else range(start, stop):
+            row = order[i]
+            mask = genre_masks[row]
+            if any_mask and not mask & any_mask:
+                continue
+            if mask & all_mask != all_mask or mask & none_mask:
+                continue
+            rating = ratings[row]
+            if rating_lo is not None and rating < rating_lo:
+                continue
+            if rating_hi is not None and rating > rating_hi:
+                continue
+            year = years[row]
+            if year_lo is not None and year < year_lo:
+                continue
+            if year_hi is not None and year > year_hi:
+                continue
+            yield key_of(row), table[row]
+
+    def print_all(self):
+        for m in self.db:
+            print(m)
@@ -0,0 +1,272 @@
+"""
+Встроенная инструментация хранилищ и движка рекомендаций.
+
+    from utils.metrics import metrics
+
+    metrics.enable(memory=True)   # по умолчанию выключено
+    ...
+    metrics.dump()                # таблица в stdout
+    metrics.export("stats.json")  # то же в JSON
+
+По каждой операции ("MovieDB.add", "RecommendationEngine.recommend[RatingStrategy]"
+и т.д.): число вызовов и ошибок, суммарное/минимальное/максимальное время,
+гистограмма задержек (корзины по степеням двойки наносекунд, из неё p50/p90/p99),
+прочитанные и записанные байты. С memory=True — ещё чистый прирост памяти
+по tracemalloc за вызовы операции и сводка по хранилищам (префикс имени до точки).
+
+Выключенная инструментация ничего не стоит: методы, помеченные @instrumented,
+остаются исходными функциями, обёртки ставятся только на время enable().
+"""
+import functools
+import json
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, TextIO, Tuple
+
+_BUCKETS = 64
+
+
+class OpStats:
+    """Накопленная статистика одной операции."""
+
+    __slots__ = (
+        "count",
+        "errors",
+        "total_ns",
+        "min_ns",
+        "max_ns",
+        "buckets",
+        "bytes_read",
+        "bytes_written",
+        "mem_net",
+    )
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.errors = 0
+        self.total_ns = 0
+        self.min_ns = 0
+        self.max_ns = 0
+        # buckets[i] — вызовы длительностью [2**(i-1), 2**i) нс
+        self.buckets = [0] * _BUCKETS
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.mem_net = 0
+
+    def add(self, elapsed_ns: int, failed: bool, mem_delta: int) -> None:
+        if self.count == 0 or elapsed_ns < self.min_ns:
+            self.min_ns = elapsed_ns
+        if elapsed_ns > self.max_ns:
+            self.max_ns = elapsed_ns
+        self.count += 1
+        self.errors += failed
+        self.total_ns += elapsed_ns
+        self.buckets[min(elapsed_ns.bit_length(), _BUCKETS - 1)] += 1
+        self.mem_net += mem_delta
+
+    def percentile(self, q: float) -> int:
+        """Верхняя граница корзины, в которую попадает q-й квантиль, нс."""
+        if not self.count:
+            return 0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank:
+                return min(1 << i, self.max_ns)
+        return self.max_ns
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "total_ms": self.total_ns / 1e6,
+            "mean_us": self.total_ns / self.count / 1e3 if self.count else 0.0,
+            "min_us": self.min_ns / 1e3,
+            "max_us": self.max_ns / 1e3,
+            "p50_us": self.percentile(0.50) / 1e3,
+            "p90_us": self.percentile(0.90) / 1e3,
+            "p99_us": self.percentile(0.99) / 1e3,
+            "histogram": {
+                f"<{1 << i}ns": n for i, n in enumerate(self.buckets) if n
+            },
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "mem_net": self.mem_net,
+        }
+
+
+class Metrics:
+    """Реестр статистики операций (один на процесс — utils.metrics.metrics)."""
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self._memory = False
+        self._started_tracemalloc = False
+        self._ops: Dict[str, OpStats] = {}
+        self._lock = threading.Lock()
+
+    def enable(self, memory: bool = False) -> None:
+        """Включает сбор; memory=True — ещё и учёт памяти через tracemalloc."""
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self._memory = memory
+        self.enabled = True
+        for owner, attr, func, name in _registry:
+            setattr(owner, attr, _wrap(func, name))
+
+    def disable(self) -> None:
+        self.enabled = False
+        self._memory = False
+        for owner, attr, func, name in _registry:
+            setattr(owner, attr, func)
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def reset(self) -> None:
+        with self._lock:
+            self._ops.clear()
+
+    # ---
+    # ЗАПИСЬ
+    # ---
+
+    def _stats(self, name: str) -> OpStats:
+        stats = self._ops.get(name)
+        if stats is None:
+            stats = self._ops.setdefault(name, OpStats())
+        return stats
+
+    def call(self, name: str, func: Callable, args: tuple, kwargs: dict):
+        """Вызывает func и записывает время (и память) под именем name."""
+        memory = self._memory
+        before = tracemalloc.get_traced_memory()[0] if memory else 0
+        failed = True
+        start = time.perf_counter_ns()
+        try:
+            result = func(*args, **kwargs)
+            failed = False
+            return result
+        finally:
+            elapsed = time.perf_counter_ns() - start
+            delta = tracemalloc.get_traced_memory()[0] - before if memory else 0
+            with self._lock:
+                self._stats(name).add(elapsed, failed, delta)
+
+    def add_bytes(self, name: str, read: int = 0, written: int = 0) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self._stats(name)
+            stats.bytes_read += read
+            stats.bytes_written += written
+
+    # ---
+    # ВЫГРУЗКА
+    # ---
+
+    def stats(self) -> Dict[str, dict]:
+        """Статистика всех операций: имя -> словарь (см. OpStats.to_dict)."""
+        with self._lock:
+            return {name: s.to_dict() for name, s in sorted(self._ops.items())}
+
+    def memory_by_store(self) -> Dict[str, int]:
+        """Чистый прирост памяти по хранилищам/компонентам (префикс имени до точки)."""
+        totals: Dict[str, int] = {}
+        with self._lock:
+            for name, s in self._ops.items():
+                store = name.split(".", 1)[0]
+                totals[store] = totals.get(store, 0) + s.mem_net
+        return totals
+
+    def export(self, path: str) -> None:
+        report = {"operations": self.stats()}
+        if self._memory or any(s.mem_net for s in self._ops.values()):
+            report["memory_by_store"] = self.memory_by_store()
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    def dump(self, file: Optional[TextIO] = None) -> None:
+        file = file or sys.stdout
+        stats = self.stats()
+        if not stats:
+            print("Статистика пуста (инструментация выключена?)", file=file)
+            return
+
+        print(
+            f"{'операция':<52} {'вызовы':>8} {'всего, мс':>10} {'p50, мкс':>10} "
+            f"{'p99, мкс':>10} {'чтение':>10} {'запись':>10} {'память':>10}",
+            file=file,
+        )
+        for name, s in stats.items():
+            print(
+                f"{name:<52} {s['count']:>8} {s['total_ms']:>10.2f} {s['p50_us']:>10.1f} "
+                f"{s['p99_us']:>10.1f} {_size(s['bytes_read']):>10} "
+                f"{_size(s['bytes_written']):>10} {_size(s['mem_net']):>10}",
+                file=file,
+            )
+
+        if self._memory:
+            print("Память по хранилищам:", file=file)
+            for store, total in sorted(self.memory_by_store().items()):
+                print(f"  {store:<30} {_size(total):>10}", file=file)
+
+
+def _size(n: int) -> str:
+    if not n:
+        return "—"
+    for unit in ("Б", "КБ", "МБ"):
+        if abs(n) < 1024:
+            return f"{n:.0f} {unit}"
+        n /= 1024
+    return f"{n:.1f} ГБ"
+
+
+metrics = Metrics()
+
+
+# (класс, атрибут, исходная функция, имя операции) всех @instrumented методов
+_registry: List[Tuple[type, str, Callable, str]] = []
+
+
+def _wrap(func: Callable, name: str) -> Callable:
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return metrics.call(name, func, args, kwargs)
+
+    return wrapper
+
+
+class _Instrumented:
+    """
+    Метка метода на время создания класса: в __set_name__ заменяется
+    обратно на исходную функцию и запоминается в реестре, чтобы
+    enable()/disable() могли ставить и снимать обёртку.
+    """
+
+    def __init__(self, func: Callable, name: str) -> None:
+        self._func = func
+        self._name = name
+
+    def __set_name__(self, owner: type, attr: str) -> None:
+        _registry.append((owner, attr, self._func, self._name))
+        if metrics.enabled:
+            setattr(owner, attr, _wrap(self._func, self._name))
+        else:
+            setattr(owner, attr, self._func)
+
+
+def instrumented(name: str):
+    """
+    Декоратор метода: замер вызовов под именем name, пока metrics включены.
+    Применяется только к методам класса (нужен __set_name__).
+    """
+
+    def decorate(func):
+        return _Instrumented(func, name)
+
+    return decorate
@@ -1,147 +1,1521 @@
 import sys, os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import base64
+import functools
 import json
-from typing import Dict, List, Optional
+import math
+import threading
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from contextlib import contextmanager
+from itertools import compress
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
 from core.entities.movie import Movie
+from utils.json_stream import iter_json_array, iter_json_lines
+from utils.snapshot import (
+    KIND_MOVIES,
+    MOVIE_DIRECTOR_OFFSETS,
+    MOVIE_DIRECTOR_REFS,
+    MOVIE_DIRECTORS,
+    MOVIE_GENRE_ORDER,
+    MOVIE_GENRE_ORDER_OFFSETS,
+    MOVIE_GENRES,
+    MOVIE_IDS,
+    MOVIE_RATINGS,
+    MOVIE_TITLE_OFFSETS,
+    MOVIE_TITLES,
+    MOVIE_YEARS,
+    SnapshotError,
+    is_fresh,
+    read_snapshot,
+    unpack_array,
+    unpack_bytes,
+    unpack_strings,
+    write_movie_snapshot,
+)
+from utils.movie_table import MovieTable, MovieTableView, OrdinalMapping
+from utils.title_index import TitleIndex
+from utils.metrics import instrumented, metrics
+from utils.persistence import BackgroundFlusher, atomic_write
+
+# ключ сортированного индекса: (значение << ORDINAL_BITS) | ordinal
+ORDINAL_BITS = 32
+ORDINAL_MASK = (1 << ORDINAL_BITS) - 1
+
+# допустимый год: |год| < 2**31 (колонка array("i"), ключ индекса в int64)
+YEAR_LIMIT = 1 << 31
+
+# символы bin() -> байты-флаги для itertools.compress
+_BIN_FLAGS = bytes.maketrans(b"01", b"\x00\x01")
+
+# порядок по умолчанию для iter_movies/page: True — по убыванию
+PAGE_DEFAULT_REVERSE = {"id": False, "rating": True, "year": False}
+
+
+class MoviePage(NamedTuple):
+    movies: List[Movie]
+    next_cursor: Optional[str]   # None — это последняя страница
+
+
+def page_filter_masks(filters: dict) -> Optional[Tuple[int, int, int]]:
+    """
+    Маски жанров (any, all, none) для фильтров page/iter_movies;
+    None — выборка заведомо пуста. Неизвестный ключ фильтра — ValueError.
+    """
+    unknown = set(filters) - {
+        "any_of", "all_of", "none_of", "min_rating", "max_rating", "min_year", "max_year"
+    }
+    if unknown:
+        raise ValueError(f"Неизвестные фильтры: {', '.join(sorted(unknown))}")
+
+    any_of = filters.get("any_of")
+    all_of = filters.get("all_of")
+    none_of = filters.get("none_of")
+    allowed = Movie.allowed_genres
+    if all_of and any(g not in allowed for g in all_of):
+        return None
+    any_mask = Movie.genres_to_mask([g for g in any_of or () if g in allowed])
+    if any_of and not any_mask:
+        return None
+    all_mask = Movie.genres_to_mask(all_of or [])
+    none_mask = Movie.genres_to_mask([g for g in none_of or () if g in allowed])
+    return any_mask, all_mask, none_mask
+
+
+def encode_cursor(order_by: str, reverse: bool, key: int) -> str:
+    """
+    Курсор страницы: порядок обхода и ключ последнего выданного фильма.
+    Ключ у каждого хранилища свой (MovieDB — ключ индекса), курсор
+    годится только для того хранилища, которое его выдало.
+    """
+    raw = f"{order_by}:{int(reverse)}:{key}".encode("ascii")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str, order_by: str, reverse: bool) -> int:
+    """Ключ из курсора encode_cursor; ValueError — курсор испорчен или чужой."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_order, cursor_reverse, key = raw.decode("ascii").split(":")
+        key = int(key)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Некорректный курсор страницы.")
+    if cursor_order != order_by or cursor_reverse != str(int(reverse)):
+        raise ValueError("Курсор выдан для другого порядка сортировки.")
+    return key
+
+
+def _reads_snapshot(method):
+    """
+    Запрос к опубликованному снимку (concurrent=True): метод выполняется
+    целиком на одном неизменяемом состоянии, без блокировок.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        # без concurrent снимка нет — обходимся без вызова _view()
+        if self._published is None:
+            return method(self, *args, **kwargs)
+        return method(self._view(), *args, **kwargs)
+
+    return wrapper
 
 
 class MovieDB:
     """
     Хранилище фильмов
     Работает с объектами Movie
+
+    columnar=True — компактный режим для больших каталогов: фильмы лежат
+    в MovieTable, а db/by_id/by_title становятся read-only представлениями,
+    которые создают Movie при каждом обращении.
+
+    flush_interval — сохранять в фоновом потоке не чаще раза в столько секунд
+    (см. BackgroundFlusher); при завершении работы вызвать close().
+
+    concurrent=True — режим для многих потоков-читателей: после каждого
+    изменения (или транзакции) писатель публикует неизменяемую копию
+    индексов одной атомарной заменой ссылки. Запросы (get_by_*, find_*,
+    sort_by_*) читают снимок без блокировок; для нескольких согласованных
+    запросов подряд — db.snapshot(). Запись — O(n) на копирование,
+    поэтому режим рассчитан на каталоги, которые читают намного чаще,
+    чем меняют.
+
+    facets — счётчики по жанрам, десятилетиям и режиссёрам для страниц
+    каталога; без фильтра берутся из поддерживаемых агрегатов.
+
+    page / iter_movies — постраничный и ленивый обход каталога в порядке
+    id, рейтинга или года: страница стоит O(размер страницы), курсор
+    переживает изменения каталога между запросами.
+
+    search_titles — поиск по названию с автодополнением и опечатками
+    (см. TitleIndex). Индекс строится при первом поиске (в concurrent —
+    сразу при загрузке) и дальше поддерживается add/update/delete.
     """
 
-    def __init__(self, db_path: str):
+    def __init__(
+        self,
+        db_path: str,
+        journal: bool = False,
+        compact_threshold: int = 1000,
+        columnar: bool = False,
+        on_bad_record: Optional[Callable[[Any, Exception], None]] = None,
+        snapshot: bool = False,
+        flush_interval: Optional[float] = None,
+        concurrent: bool = False,
+    ):
+        if journal and flush_interval is not None:
+            raise ValueError("Журнал и фоновое сохранение несовместимы.")
+        if concurrent and columnar:
+            raise ValueError("Режим concurrent поддерживается только без columnar.")
+
         self._db_path = db_path
 
-        # список всех фильмов
-        self.db: List[Movie] = []
+        # бинарный снапшот рядом с JSON: пишется при save(),
+        # при старте читается вместо JSON, если построен по его текущей версии
+        self._snapshot_path = db_path + ".snap"
+        self._snapshot_enabled = snapshot
 
-        # индексы для ускорения поиска
-        self.by_id: Dict[int, Movie] = {}
-        self.by_title: Dict[str, Movie] = {}
+        # битые записи при загрузке: счётчик и необязательный callback(item, error)
+        self._on_bad_record = on_bad_record
+        self.skipped_records = 0
+
+        # журнал изменений: каждая операция дописывается одной строкой,
+        # полный снапшот пишется только при компактификации
+        self._journal_path = db_path + ".journal"
+        self._journal_enabled = journal
+        self._compact_threshold = compact_threshold
+        self._journal_size = 0
+
+        # открытая транзакция: отложенные записи и журнал отката
+        self._batch: Optional[List[dict]] = None
+        self._undo: List[tuple] = []
+
+        # колоночное хранение: вместо списка Movie — MovieTable,
+        # объекты создаются только при чтении
+        self._columnar = columnar
+        self._reset_memory()
+
+        # растёт при любом изменении каталога в памяти (для кешей поверх базы)
+        self.version = 0
+
+        # изменения и копирование каталога для фонового сохранения
+        self._lock = threading.RLock()
+
+        # concurrent: опубликованный снимок для читателей и поток,
+        # который сейчас ведёт транзакцию (он видит свои изменения сразу)
+        self._concurrent = concurrent
+        self._published: Optional["MovieDB"] = None
+        self._writer: Optional[int] = None
+        self._read_only = False
 
         # загрузка базы
         self.load_db()
 
+        self._flusher: Optional[BackgroundFlusher] = None
+        if flush_interval is not None:
+            self._flusher = BackgroundFlusher(self._save_in_background, flush_interval)
+
+    @staticmethod
+    def open_readonly(db_path: str):
+        """
+        Read-only каталог поверх mmap снапшота <db_path>.snap
+        (см. MappedMovieDB). Снапшот строит MovieDB(db_path, snapshot=True).
+        """
+        from utils.mapped_movie_db import MappedMovieDB
+
+        return MappedMovieDB(db_path + ".snap")
+
     # ---
     # ЗАГРУЗКА И СОХРАНЕНИЕ
     # ---
 
+    @instrumented("MovieDB.load_db")
     def load_db(self):
-        """Загружает JSON и превращает каждый словарь в Movie-объект."""
+        """
+        Загружает базу потоково: записи читаются и превращаются в Movie
+        по одной, без промежуточного списка словарей.
+        Формат по расширению: .jsonl — JSON Lines, иначе JSON-массив.
+        """
+        self._check_writable()
+        self._reset_memory()
+        self.skipped_records = 0
+
+        # при массовой загрузке индексы строятся один раз в конце
+        self._pending_genres = {}
+        if self._load_snapshot():
+            self._build_indexes()
+            self._replay_journal()
+            if self._concurrent:
+                self._get_title_index()
+            self._publish()
+            print("База загружена из снапшота, фильмов:", len(self.db))
+            return
 
         try:
             with open(self._db_path, "r", encoding="utf-8") as f:
-                raw_data = json.load(f)
+                if metrics.enabled:
+                    metrics.add_bytes("MovieDB.load_db", read=os.fstat(f.fileno()).st_size)
+                for item in self._iter_raw(f):
+                    if isinstance(item, Exception):
+                        self._report_bad_record(None, item)
+                        continue
+                    try:
+                        movie = Movie.from_dict(item)
+                        self._add_to_memory(movie)
+                    except Exception as e:
+                        self._report_bad_record(item, e)
         except FileNotFoundError:
             print("База не найдена — создаю новую.")
-            raw_data = []
         except json.JSONDecodeError:
             print("Ошибка в JSON — создаю пустую базу.")
-            raw_data = []
+            self._reset_memory()
+            self._pending_genres = {}
+        self._build_indexes()
 
-        self.db = []
-        self.by_id = {}
-        self.by_title = {}
+        # снапшот отсутствует или устарел — строим по только что прочитанному JSON
+        if self._snapshot_enabled and os.path.exists(self._db_path):
+            self._write_snapshot()
 
-        for item in raw_data:
-            try:
-                movie = Movie.from_dict(item)
-                self._add_to_memory(movie)
-            except Exception as e:
-                print(f"Пропущена запись: {item} ({e})")
+        self._replay_journal()
+
+        # снимки читателей не строят индекс сами — копируют готовый
+        if self._concurrent:
+            self._get_title_index()
+        self._publish()
 
+        if self.skipped_records:
+            print("Пропущено записей:", self.skipped_records)
         print("База загружена, фильмов:", len(self.db))
 
+    def _iter_raw(self, f):
+        if self._is_jsonl():
+            return iter_json_lines(f)
+        return iter_json_array(f)
+
+    def _is_jsonl(self) -> bool:
+        return self._db_path.endswith(".jsonl")
+
+    def _report_bad_record(self, item, error: Exception):
+        """Учитывает битую запись и передаёт её в on_bad_record."""
+        self.skipped_records += 1
+        if self._on_bad_record is not None:
+            self._on_bad_record(item, error)
+
+    @instrumented("MovieDB.save")
     def save(self):
-        """Сохраняет базу в JSON."""
-        data = [movie.to_dict() for movie in self.db]
+        """
+        Сохраняет базу в JSON (или JSON Lines для .jsonl).
+        С фоновым сохранением только помечает базу изменённой —
+        запись сделает поток BackgroundFlusher.
+        """
+        self._check_writable()
+        if self._flusher is not None:
+            self._flusher.mark_dirty()
+            return
 
-        with open(self._db_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        with self._lock:
+            self._write_files(self.db)
+
+        # JSON уже содержит все изменения из журнала
+        self._truncate_journal()
 
         print("База сохранена.")
 
+    def flush(self):
+        """Дожидается записи на диск всех изменений."""
+        if self._flusher is not None:
+            self._flusher.flush()
+
+    def close(self):
+        """Дописывает изменения и останавливает фоновое сохранение."""
+        if self._flusher is not None:
+            self._flusher.close()
+
+    def _save_in_background(self):
+        # под блокировкой только копия списка фильмов (объекты Movie
+        # не меняются на месте — update заменяет объект), сериализация
+        # и диск — уже без неё
+        with self._lock:
+            movies = list(self.db)
+        self._write_files(movies)
+
+    def _write_files(self, movies):
+        """Атомарно пишет JSON и, если включён, бинарный снапшот."""
+        with atomic_write(self._db_path) as f:
+            if self._is_jsonl():
+                for movie in movies:
+                    f.write(json.dumps(movie.to_dict(), ensure_ascii=False) + "\n")
+            else:
+                data = [movie.to_dict() for movie in movies]
+                json.dump(data, f, ensure_ascii=False, indent=2)
+
+        if self._snapshot_enabled:
+            write_movie_snapshot(self._snapshot_path, movies, self._db_path)
+
+        if metrics.enabled:
+            written = os.path.getsize(self._db_path)
+            if self._snapshot_enabled:
+                written += os.path.getsize(self._snapshot_path)
+            metrics.add_bytes("MovieDB.save", written=written)
+
+    # ---
+    # БИНАРНЫЙ СНАПШОТ
+    # ---
+
+    def _write_snapshot(self):
+        write_movie_snapshot(self._snapshot_path, self.db, self._db_path)
+
+    def _load_snapshot(self) -> bool:
+        """Загружает фильмы из свежего снапшота; False — нужен JSON."""
+        if not self._snapshot_enabled or not is_fresh(
+            self._snapshot_path, self._db_path
+        ):
+            return False
+
+        try:
+            with open(self._snapshot_path, "rb") as f:
+                data = f.read()
+            snap = read_snapshot(data, KIND_MOVIES)
+            metrics.add_bytes("MovieDB.load_db", read=len(data))
+        except (OSError, SnapshotError) as e:
+            print(f"Снапшот не подошёл, читаю JSON: {e}")
+            return False
+
+        s = snap.sections
+        ids = unpack_array("q", s[MOVIE_IDS])
+        years = unpack_array("i", s[MOVIE_YEARS])
+        ratings = unpack_array("H", s[MOVIE_RATINGS])
+        masks = unpack_array("I", s[MOVIE_GENRES])
+        title_offsets = unpack_array("Q", s[MOVIE_TITLE_OFFSETS])
+        titles = unpack_strings(title_offsets, s[MOVIE_TITLES])
+        director_refs = unpack_array("I", s[MOVIE_DIRECTOR_REFS])
+        directors = unpack_strings(
+            unpack_array("Q", s[MOVIE_DIRECTOR_OFFSETS]), s[MOVIE_DIRECTORS]
+        )
+        genre_orders = unpack_bytes(
+            unpack_array("Q", s[MOVIE_GENRE_ORDER_OFFSETS]), s[MOVIE_GENRE_ORDER]
+        )
+
+        director_names = [directors[ref] for ref in director_refs]
+        if self._columnar:
+            # колоночный режим: колонки снапшота становятся колонками таблицы
+            self._by_ordinal.load_columns(
+                ids, years, ratings, masks, title_offsets, s[MOVIE_TITLES],
+                director_refs, directors, genre_orders,
+            )
+            self._title_ordinal.update((t.lower(), i) for i, t in enumerate(titles))
+        else:
+            # снапшот проверен CRC и записан из валидных фильмов —
+            # доверенный конструктор без повторной проверки полей и сразу
+            # все фильмы: ordinal — номер строки снапшота
+            movies = list(
+                map(
+                    Movie.trusted,
+                    ids,
+                    titles,
+                    masks,
+                    years,
+                    [rating / 10 for rating in ratings],
+                    director_names,
+                    genre_orders,
+                )
+            )
+            self.db.extend(movies)
+            self._by_ordinal.extend(movies)
+            self.by_id.update(zip(ids, movies))
+            self.by_title.update((m.title.lower(), m) for m in movies)
+
+        self._ordinal_of.update(zip(ids, range(snap.count)))
+        self._rating_keys = array("i", ratings)
+        self._year_keys = array("i", years)
+        self._directors = director_names
+        # различных масок мало: ordinal'ы группируются по маске за один проход,
+        # а списки жанров собираются из групп (не проход по колонке на жанр)
+        by_mask: Dict[int, List[int]] = {}
+        for i, mask in enumerate(masks):
+            group = by_mask.get(mask)
+            if group is None:
+                by_mask[mask] = [i]
+            else:
+                group.append(i)
+        for bit, genre in enumerate(Movie.allowed_genres):
+            ordinals: List[int] = []
+            for mask, group in by_mask.items():
+                if mask >> bit & 1:
+                    ordinals.extend(group)
+            if ordinals:
+                self._pending_genres[genre] = ordinals
+        self.version += 1
+        return True
+
+    # ---
+    # ЖУРНАЛ ИЗМЕНЕНИЙ
+    # ---
+
+    def compact(self):
+        """Сворачивает журнал в новый снапшот JSON."""
+        self.save()
+
+    def _replay_journal(self):
+        """Применяет к загруженному снапшоту операции из журнала."""
+        self._journal_size = 0
+
+        try:
+            f = open(self._journal_path, "r", encoding="utf-8")
+        except FileNotFoundError:
+            return
+
+        with f:
+            if metrics.enabled:
+                metrics.add_bytes("MovieDB.journal", read=os.fstat(f.fileno()).st_size)
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    self._apply_record(json.loads(line))
+                except Exception as e:
+                    # в т.ч. недописанная последняя строка после сбоя
+                    self._report_bad_record(line, e)
+                self._journal_size += 1
+
+        print("Применён журнал, операций:", self._journal_size)
+
+    def _apply_record(self, record: dict):
+        """Применяет к памяти одну запись журнала."""
+        op = record["op"]
+
+        if op == "add":
+            movie = Movie.from_dict(record["movie"])
+            if movie.id in self.by_id:
+                raise ValueError("Фильм с таким ID уже существует.")
+            self._add_to_memory(movie)
+        elif op == "update":
+            movie = Movie.from_dict(record["movie"])
+            old = self.by_id.get(movie.id)
+            if old is None:
+                raise ValueError("Такого фильма нет, обновить нельзя.")
+            self._remove_from_memory(old)
+            self._add_to_memory(movie)
+        elif op == "delete":
+            movie = self.by_id.get(record["id"])
+            if movie is None:
+                raise ValueError("Фильм с таким ID не найден.")
+            self._remove_from_memory(movie)
+        else:
+            raise ValueError(f"Неизвестная операция: {op}")
+
+    def _append_journal(self, records: List[dict]):
+        """
+        Дописывает записи в конец журнала. Если запись оборвалась,
+        журнал обрезается до прежней длины: откатываемый в памяти пакет
+        не должен частично примениться при следующем старте.
+        """
+        data = "".join(
+            json.dumps(record, ensure_ascii=False) + "\n" for record in records
+        ).encode("utf-8")
+        # без буфера: после ошибки в нём не останется хвоста, который
+        # допишется при закрытии файла
+        with open(self._journal_path, "ab", buffering=0) as f:
+            start = f.seek(0, os.SEEK_END)
+            try:
+                view = memoryview(data)
+                while view:
+                    view = view[f.write(view):]
+            except BaseException:
+                f.truncate(start)
+                raise
+        self._journal_size += len(records)
+        if metrics.enabled:
+            metrics.add_bytes("MovieDB.journal", written=len(data))
+
+    def _truncate_journal(self):
+        """Удаляет журнал после записи полного снапшота."""
+        try:
+            os.remove(self._journal_path)
+        except FileNotFoundError:
+            pass
+        self._journal_size = 0
+
+    def _persist(self, record: dict):
+        """
+        Фиксирует одно изменение на диске.
+        Без журнала — полная перезапись JSON, с журналом — одна строка
+        в конец файла и компактификация при превышении порога.
+        Внутри транзакции запись откладывается до commit.
+        Если запись не удалась (в том числе фоновое сохранение уже
+        остановлено close()), изменение откатывается в памяти.
+        """
+        if self._batch is not None:
+            self._batch.append(record)
+            return
+
+        try:
+            self._write_records([record])
+        except BaseException:
+            self._revert(self._undo)
+            raise
+        finally:
+            self._undo = []
+        self._publish()
+
+    def _write_records(self, records: List[dict]):
+        """
+        Записывает изменения на диск. Исключение означает, что они
+        не сохранились и вызывающий должен откатить их в памяти.
+        """
+        if not self._journal_enabled:
+            self.save()
+            return
+
+        self._append_journal(records)
+
+        # записи уже в журнале — изменение зафиксировано и после рестарта
+        # будет применено, поэтому сбой компактификации его не откатывает:
+        # журнал остаётся, свернуть его попробуем при следующей записи
+        if self._journal_size >= self._compact_threshold:
+            try:
+                self.compact()
+            except Exception as e:
+                print(f"Компактификация не удалась, журнал сохранён: {e}")
+
+    # ---
+    # ТРАНЗАКЦИИ
+    # ---
+
+    @contextmanager
+    def transaction(self):
+        """
+        Пакетное изменение базы:
+
+            with db.transaction():
+                db.add(...)
+                db.delete(...)
+
+        Операции внутри блока сразу видны в памяти и индексах,
+        а на диск пишутся один раз при выходе из блока.
+        При исключении все изменения блока откатываются.
+        Вложенный transaction() присоединяется к внешнему.
+        Фоновое сохранение не увидит незавершённый блок.
+        """
+        with self._lock:
+            if self._batch is not None:
+                yield self
+                return
+
+            self._check_writable()
+            self._batch = []
+            self._undo = []
+            self._writer = threading.get_ident()
+            try:
+                yield self
+                if self._batch:
+                    self._write_records(self._batch)
+            except BaseException:
+                self._rollback()
+                raise
+            finally:
+                self._batch = None
+                self._undo = []
+                self._writer = None
+                self._publish()
+
+    def _rollback(self):
+        """Отменяет в памяти все операции открытой транзакции."""
+        self._revert(self._undo)
+        print("Транзакция отменена, операций:", len(self._undo))
+
+    def _revert(self, entries: List[tuple]):
+        for entry in reversed(entries):
+            op = entry[0]
+            if op == "add":
+                self._remove_from_memory(entry[1])
+            elif op == "delete":
+                self._add_to_memory(entry[1], entry[2])
+            elif op == "update":
+                self._remove_from_memory(entry[2])
+                self._add_to_memory(entry[1], entry[3])
+
+    def _log_undo(self, *entry):
+        # вне транзакции журнал держит одну операцию до её записи (_persist)
+        self._undo.append(entry)
+
+    # ---
+    # СНИМКИ ДЛЯ ЧИТАТЕЛЕЙ (concurrent=True)
+    # ---
+
+    def snapshot(self) -> "MovieDB":
+        """
+        Текущий неизменяемый снимок каталога: MovieDB только для чтения,
+        который не меняется, пока писатели публикуют новые версии.
+        Без concurrent — сама база.
+        """
+        return self._published if self._published is not None else self
+
+    def _view(self) -> "MovieDB":
+        """Состояние, которое видит текущий поток."""
+        published = self._published
+        if published is None or self._writer == threading.get_ident():
+            return self
+        return published
+
+    def _publish(self):
+        """
+        Копирует индексы в новый снимок и публикует его заменой одной
+        ссылки: читатель видит либо старое состояние целиком, либо новое.
+        """
+        if not self._concurrent:
+            return
+
+        snap = MovieDB.__new__(MovieDB)
+        snap.__dict__.update(
+            _db_path=self._db_path,
+            _columnar=False,
+            _concurrent=False,
+            _published=None,
+            _writer=None,
+            _read_only=True,
+            # писать снимку нечего: flush()/close() — пустые операции,
+            # save() и load_db() отказывают через _check_writable
+            _flusher=None,
+            _lock=threading.RLock(),
+            _batch=None,
+            version=self.version,
+            db=list(self.db),
+            by_id=dict(self.by_id),
+            by_title=dict(self.by_title),
+            _by_ordinal=list(self._by_ordinal),
+            _genre_bits=dict(self._genre_bits),
+            _all_bits=self._all_bits,
+            _rating_index=array("q", self._rating_index),
+            _year_index=array("q", self._year_index),
+            _rating_keys=array("i", self._rating_keys),
+            _year_keys=array("i", self._year_keys),
+            _id_index=array("q", self._id_index),
+            _directors=list(self._directors),
+            _director_index={
+                d: array("I", postings) for d, postings in self._director_index.items()
+            },
+            _decade_bits=dict(self._decade_bits),
+            _title_index=(
+                None if self._title_index is None else self._title_index.copy()
+            ),
+        )
+        self._published = snap
+
+    def _check_writable(self):
+        if self._read_only:
+            raise ValueError("Снимок базы только для чтения.")
+
     # ---
     # ВНУТРЕННИЕ ОПЕРАЦИИ
     # ---
 
-    def _add_to_memory(self, movie: Movie):
-        """Добавляет фильм в память и индексы."""
-        self.db.append(movie)
+    def _reset_memory(self):
+        """Создаёт пустые структуры в памяти и индексы."""
+        # плотные порядковые номера (ordinal) фильмов для битовых индексов;
+        # освободившиеся номера переиспользуются
+        self._ordinal_of: Dict[int, int] = {}
+        self._free_ordinals: List[int] = []
+
+        if self._columnar:
+            # строки таблицы адресуются ordinal'ом, индексы хранят только номера
+            self._by_ordinal = MovieTable()
+            self._title_ordinal: Dict[str, int] = {}
+            self.db = MovieTableView(self._by_ordinal)
+            self.by_id = OrdinalMapping(self._ordinal_of, self._by_ordinal)
+            self.by_title = OrdinalMapping(self._title_ordinal, self._by_ordinal)
+        else:
+            self._by_ordinal: List[Optional[Movie]] = []
+
+            # список всех фильмов
+            self.db: List[Movie] = []
+
+            # индексы для ускорения поиска
+            self.by_id: Dict[int, Movie] = {}
+            self.by_title: Dict[str, Movie] = {}
+
+        # инвертированный индекс: жанр -> битсет ordinal'ов (int как bitset)
+        self._genre_bits: Dict[str, int] = {}
+        self._all_bits = 0
+
+        # сортированные индексы по рейтингу (в десятых) и году;
+        # ключи, с которыми фильм попал в индекс, храним по ordinal
+        self._rating_index = array("q")
+        self._year_index = array("q")
+        self._rating_keys = array("i")
+        self._year_keys = array("i")
+
+        # отсортированные id (порядок по умолчанию для page/iter_movies)
+        self._id_index = array("q")
+
+        # режиссёр, с которым фильм попал в индекс, по ordinal;
+        # режиссёр -> отсортированные ordinal'ы его фильмов
+        self._directors: List[Optional[str]] = []
+        self._director_index: Dict[str, array] = {}
+
+        # десятилетие -> битсет ordinal'ов (как жанры): счётчики facets — popcount
+        self._decade_bits: Dict[int, int] = {}
+
+        # жанр -> ordinal'ы, пока идёт массовая загрузка (None — обычный режим)
+        self._pending_genres: Optional[Dict[str, List[int]]] = None
+
+        # поиск по названиям; None — ещё не нужен, построится при первом поиске
+        self._title_index: Optional[TitleIndex] = None
+
+    def _add_to_memory(self, movie: Movie, place: Optional[Tuple[int, int]] = None):
+        """
+        Добавляет фильм в память и индексы. place — (ordinal, позиция в db),
+        которые вернул _remove_from_memory: откат удаления возвращает фильм
+        на прежнее место, иначе фильм дописывается в конец.
+        """
+        self.version += 1
+        ordinal = self._index_movie(movie, None if place is None else place[0])
+        if self._columnar:
+            self._title_ordinal[movie.title.lower()] = ordinal
+            return
+
+        if place is None:
+            self.db.append(movie)
+        else:
+            self.db.insert(place[1], movie)
         self.by_id[movie.id] = movie
         self.by_title[movie.title.lower()] = movie
 
-    def _remove_from_memory(self, movie: Movie):
-        """Удаляет фильм из памяти и индексов."""
-        self.db.remove(movie)
+    def _remove_from_memory(self, movie: Movie) -> Optional[Tuple[int, int]]:
+        """
+        Удаляет фильм из памяти и индексов.
+        Возвращает его место (ordinal, позиция в db) для отката.
+        """
+        self.version += 1
+        ordinal = self._unindex_movie(movie)
+        if self._columnar:
+            self._title_ordinal.pop(movie.title.lower(), None)
+            # порядок db — порядок ordinal'ов
+            return None if ordinal is None else (ordinal, ordinal)
+
+        # list.remove сравнивает через __eq__ (по рейтингу), ищем по identity
+        position = None
+        for i, m in enumerate(self.db):
+            if m is movie:
+                del self.db[i]
+                position = i
+                break
         self.by_id.pop(movie.id, None)
         self.by_title.pop(movie.title.lower(), None)
+        if ordinal is None or position is None:
+            return None
+        return ordinal, position
+
+    def _index_movie(self, movie: Movie, ordinal: Optional[int] = None) -> int:
+        """
+        Выдаёт фильму ordinal (заданный — только свободный, при откате),
+        ставит его бит в битсеты жанров и добавляет в сортированные индексы.
+        """
+        rating_key, year_key = self._index_keys(movie)
+
+        if ordinal is not None:
+            self._free_ordinals.remove(ordinal)
+        elif self._free_ordinals:
+            ordinal = self._free_ordinals.pop()
+        if ordinal is not None:
+            self._by_ordinal[ordinal] = movie
+            self._rating_keys[ordinal] = rating_key
+            self._year_keys[ordinal] = year_key
+            self._directors[ordinal] = movie.director
+        else:
+            ordinal = len(self._by_ordinal)
+            self._by_ordinal.append(movie)
+            self._rating_keys.append(rating_key)
+            self._year_keys.append(year_key)
+            self._directors.append(movie.director)
+        self._ordinal_of[movie.id] = ordinal
+
+        if self._pending_genres is not None:
+            for genre in movie.genres:
+                self._pending_genres.setdefault(genre, []).append(ordinal)
+            return ordinal
+
+        insort(self._rating_index, (rating_key << ORDINAL_BITS) | ordinal)
+        insort(self._year_index, (year_key << ORDINAL_BITS) | ordinal)
+        insort(self._id_index, movie.id)
+
+        bit = 1 << ordinal
+        self._all_bits |= bit
+        for genre in movie.genres:
+            self._genre_bits[genre] = self._genre_bits.get(genre, 0) | bit
+
+        postings = self._director_index.get(movie.director)
+        if postings is None:
+            self._director_index[movie.director] = array("I", (ordinal,))
+        else:
+            insort(postings, ordinal)
+        decade = year_key // 10 * 10
+        self._decade_bits[decade] = self._decade_bits.get(decade, 0) | bit
+
+        if self._title_index is not None:
+            self._title_index.add(ordinal, movie.title)
+
+        return ordinal
+
+    @staticmethod
+    def _index_keys(movie: Movie) -> Tuple[int, int]:
+        """
+        Ключи фильма в индексах рейтинга и года. Все поля, которые лежат
+        в типизированных колонках и индексах, проверяются до того, как фильм
+        попадёт хоть в одну структуру: _by_ordinal, _rating_keys, _year_keys
+        и _directors дописываются по одной, и ошибка на середине оставила бы
+        их рассинхронизированными (а запись с годом-строкой — в db,
+        но не в индексах).
+        """
+        movie_id = movie.id
+        # id лежит в array("q") (_id_index, колонка ids MovieTable)
+        if type(movie_id) is not int or not -(1 << 63) <= movie_id < 1 << 63:
+            raise ValueError(f"ID должен быть целым числом, получено: {movie_id!r}")
+        if not isinstance(movie.title, str):
+            raise ValueError(f"Название должно быть строкой, получено: {movie.title!r}")
+        if not isinstance(movie.director, str):
+            raise ValueError(
+                f"Режиссёр должен быть строкой, получено: {movie.director!r}"
+            )
+
+        year = movie.year
+        # год лежит в array("i") и в старших битах ключа (год << ORDINAL_BITS)
+        if type(year) is not int or not -YEAR_LIMIT <= year < YEAR_LIMIT:
+            raise ValueError(f"Год должен быть целым числом, получено: {year!r}")
+        return round(movie.rating * 10), year
+
+    def _unindex_movie(self, movie: Movie) -> Optional[int]:
+        """Снимает фильм со всех индексов и освобождает его ordinal (его и возвращает)."""
+        ordinal = self._ordinal_of.pop(movie.id, None)
+        if ordinal is None:
+            return None
+
+        self._discard_key(
+            self._rating_index, (self._rating_keys[ordinal] << ORDINAL_BITS) | ordinal
+        )
+        self._discard_key(
+            self._year_index, (self._year_keys[ordinal] << ORDINAL_BITS) | ordinal
+        )
+        self._discard_key(self._id_index, movie.id)
+
+        # жанров немного — чистим бит во всех битсетах, не доверяя
+        # movie.genres (объект могли изменить на месте)
+        mask = ~(1 << ordinal)
+        self._all_bits &= mask
+        for genre, bits in list(self._genre_bits.items()):
+            bits &= mask
+            if bits:
+                self._genre_bits[genre] = bits
+            else:
+                self._genre_bits.pop(genre, None)
+
+        director = self._directors[ordinal]
+        postings = self._director_index.get(director)
+        if postings is not None:
+            self._discard_key(postings, ordinal)
+            if not postings:
+                del self._director_index[director]
+        self._directors[ordinal] = None
+
+        decade = self._year_keys[ordinal] // 10 * 10
+        bits = self._decade_bits.get(decade, 0) & ~(1 << ordinal)
+        if bits:
+            self._decade_bits[decade] = bits
+        else:
+            self._decade_bits.pop(decade, None)
+
+        if self._title_index is not None:
+            self._title_index.remove(ordinal)
+
+        self._by_ordinal[ordinal] = None
+        self._free_ordinals.append(ordinal)
+        return ordinal
+
+    def _build_indexes(self):
+        """
+        Строит битсеты жанров и сортированные индексы за один проход
+        после массовой загрузки: поштучная вставка стоила бы O(n) на фильм.
+        """
+        pending = self._pending_genres or {}
+        self._pending_genres = None
+
+        ordinals = sorted(self._ordinal_of.values())
+        self._id_index = array("q", sorted(self._ordinal_of))
+        self._rating_index = array(
+            "q",
+            sorted((self._rating_keys[o] << ORDINAL_BITS) | o for o in ordinals),
+        )
+        self._year_index = array(
+            "q",
+            sorted((self._year_keys[o] << ORDINAL_BITS) | o for o in ordinals),
+        )
+
+        self._all_bits = self._bits_from_ordinals(ordinals)
+        self._genre_bits = {
+            genre: self._bits_from_ordinals(genre_ordinals)
+            for genre, genre_ordinals in pending.items()
+        }
+
+        # ordinal'ы по возрастанию — postings режиссёров только дописываются
+        director_index: Dict[str, array] = {}
+        directors = self._directors
+        for o in ordinals:
+            postings = director_index.get(directors[o])
+            if postings is None:
+                director_index[directors[o]] = array("I", (o,))
+            else:
+                postings.append(o)
+        self._director_index = director_index
+
+        by_decade: Dict[int, List[int]] = {}
+        year_keys = self._year_keys
+        for o in ordinals:
+            by_decade.setdefault(year_keys[o] // 10 * 10, []).append(o)
+        self._decade_bits = {
+            decade: self._bits_from_ordinals(decade_ordinals)
+            for decade, decade_ordinals in by_decade.items()
+        }
+
+    def _get_title_index(self) -> TitleIndex:
+        """Индекс названий; при первом обращении строится по всему каталогу."""
+        index = self._title_index
+        if index is None:
+            with self._lock:
+                if self._title_index is None:
+                    table = self._by_ordinal
+                    if self._columnar:
+                        titles = ((o, table.title(o)) for o in table.ordinals())
+                    else:
+                        titles = (
+                            (o, m.title) for o, m in enumerate(table) if m is not None
+                        )
+                    self._title_index = TitleIndex.build(titles)
+                index = self._title_index
+        return index
+
+    @staticmethod
+    def _bits_from_ordinals(ordinals: List[int]) -> int:
+        if not ordinals:
+            return 0
+        buf = bytearray(max(ordinals) // 8 + 1)
+        for o in ordinals:
+            buf[o >> 3] |= 1 << (o & 7)
+        return int.from_bytes(buf, "little")
+
+    @staticmethod
+    def _discard_key(index: array, key: int):
+        i = bisect_left(index, key)
+        if i < len(index) and index[i] == key:
+            del index[i]
+
+    @staticmethod
+    def _ordinals_from_bits(bits: int) -> List[int]:
+        """Ordinal'ы битсета по возрастанию."""
+        if bits.bit_count() <= 64:
+            # редкий битсет: снимаем младшие биты, не разворачивая весь bin()
+            ordinals = []
+            while bits:
+                low = bits & -bits
+                ordinals.append(low.bit_length() - 1)
+                bits ^= low
+            return ordinals
+        # плотный: флаги из bin() и отбор на C
+        flags = bin(bits)[:1:-1].encode().translate(_BIN_FLAGS)
+        return list(compress(range(len(flags)), flags))
+
+    def _movies_from_bits(self, bits: int) -> List[Movie]:
+        """Разворачивает битсет ordinal'ов в список фильмов."""
+        # bin() строится на C; перевёрнутая строка: символ i — это бит i
+        flags = bin(bits)[:1:-1]
+        by_ordinal = self._by_ordinal
+        result = []
+        i = flags.find("1")
+        while i != -1:
+            result.append(by_ordinal[i])
+            i = flags.find("1", i + 1)
+        return result
 
     # ---
     # ПУБЛИЧНЫЕ CRUD ОПЕРАЦИИ
     # ---
 
+    @instrumented("MovieDB.add")
     def add(self, movie: Movie):
         """Добавляет новый фильм."""
-        if movie.id in self.by_id:
-            raise ValueError("Фильм с таким ID уже существует.")
+        with self._lock:
+            self._check_writable()
+            if movie.id in self.by_id:
+                raise ValueError("Фильм с таким ID уже существует.")
 
-        self._add_to_memory(movie)
-        self.save()
+            self._add_to_memory(movie)
+            self._log_undo("add", movie)
+            self._persist({"op": "add", "movie": movie.to_dict()})
 
+    @instrumented("MovieDB.delete")
     def delete(self, movie_id: int):
         """Удаляет фильм по ID."""
-        movie = self.by_id.get(movie_id)
-        if not movie:
-            raise ValueError("Фильм с таким ID не найден.")
+        with self._lock:
+            self._check_writable()
+            movie = self.by_id.get(movie_id)
+            if not movie:
+                raise ValueError("Фильм с таким ID не найден.")
 
-        self._remove_from_memory(movie)
-        self.save()
+            place = self._remove_from_memory(movie)
+            self._log_undo("delete", movie, place)
+            self._persist({"op": "delete", "id": movie_id})
 
+    @instrumented("MovieDB.update")
     def update(self, movie: Movie):
         """
         Обновляет фильм c тем же ID.
         Т.е. заменяет объект, если он существует.
         """
-        if movie.id not in self.by_id:
-            raise ValueError("Такого фильма нет, обновить нельзя.")
+        with self._lock:
+            self._check_writable()
+            if movie.id not in self.by_id:
+                raise ValueError("Такого фильма нет, обновить нельзя.")
+            # новый фильм проверяется до того, как старый снят с индексов
+            self._index_keys(movie)
 
-        # удаляем старый
-        old = self.by_id[movie.id]
-        self._remove_from_memory(old)
+            # удаляем старый
+            old = self.by_id[movie.id]
+            place = self._remove_from_memory(old)
 
-        # добавляем новый
-        self._add_to_memory(movie)
-        self.save()
+            # добавляем новый
+            self._add_to_memory(movie)
+            self._log_undo("update", old, movie, place)
+            self._persist({"op": "update", "movie": movie.to_dict()})
 
     # ---
     # ПОИСК
     # ---
 
+    @instrumented("MovieDB.get_by_id")
+    @_reads_snapshot
     def get_by_id(self, movie_id: int) -> Optional[Movie]:
         return self.by_id.get(movie_id)
 
+    @instrumented("MovieDB.get_by_title")
+    @_reads_snapshot
     def get_by_title(self, title: str) -> Optional[Movie]:
         return self.by_title.get(title.lower())
 
+    @instrumented("MovieDB.find_by_genre")
+    @_reads_snapshot
     def find_by_genre(self, genre: str) -> List[Movie]:
-        return [m for m in self.db if genre in m.genres]
+        return self._movies_from_bits(self._genre_bits.get(genre, 0))
+
+    @instrumented("MovieDB.find_by_genres")
+    @_reads_snapshot
+    def find_by_genres(
+        self,
+        any_of: Optional[List[str]] = None,
+        all_of: Optional[List[str]] = None,
+        none_of: Optional[List[str]] = None,
+    ) -> List[Movie]:
+        """
+        Поиск по нескольким жанрам через битсеты:
+          any_of  — есть хотя бы один из жанров (OR)
+          all_of  — есть все жанры (AND)
+          none_of — нет ни одного из жанров (NOT)
+        Пустой/не заданный фильтр не ограничивает выборку.
+        """
+        return self._movies_from_bits(self._genre_filter_bits(any_of, all_of, none_of))
+
+    @instrumented("MovieDB.find_by_director")
+    @_reads_snapshot
+    def find_by_director(self, director: str) -> List[Movie]:
+        by_ordinal = self._by_ordinal
+        return [by_ordinal[o] for o in self._director_index.get(director, ())]
+
+    def _genre_filter_bits(
+        self,
+        any_of: Optional[List[str]],
+        all_of: Optional[List[str]],
+        none_of: Optional[List[str]],
+    ) -> int:
+        genre_bits = self._genre_bits
+
+        if any_of:
+            bits = 0
+            for genre in any_of:
+                bits |= genre_bits.get(genre, 0)
+        else:
+            bits = self._all_bits
+
+        for genre in all_of or ():
+            bits &= genre_bits.get(genre, 0)
+            if not bits:
+                return 0
+
+        for genre in none_of or ():
+            bits &= ~genre_bits.get(genre, 0)
+
+        return bits
+
+    # ---
+    # ФАСЕТЫ
+    # ---
+
+    @instrumented("MovieDB.facets")
+    @_reads_snapshot
+    def facets(
+        self,
+        any_of: Optional[List[str]] = None,
+        all_of: Optional[List[str]] = None,
+        none_of: Optional[List[str]] = None,
+        min_rating: Optional[float] = None,
+        max_rating: Optional[float] = None,
+        min_year: Optional[int] = None,
+        max_year: Optional[int] = None,
+        director: Optional[str] = None,
+        top_directors: Optional[int] = None,
+    ) -> Dict[str, Dict]:
+        """
+        Счётчики для страниц каталога по фильмам, прошедшим фильтр
+        (жанры — как в find_by_genres, границы — как в find_in_range):
+            {"genres": {жанр: n}, "decades": {1990: n}, "directors": {режиссёр: n}}
+        Жанры и режиссёры — по убыванию числа фильмов, десятилетия — по возрастанию;
+        top_directors — только столько самых частых режиссёров.
+
+        Жанры и десятилетия хранятся битсетами, которые поддерживают
+        add/update/delete, — их счётчики всегда popcount (без фильтра —
+        самих битсетов, с фильтром — пересечений с битсетом выборки).
+        Режиссёры без фильтра — длины postings, с фильтром — один проход
+        по выборке на C (Counter по map).
+        """
+        genre_bits = self._genre_bits
+        if not (any_of or all_of or none_of) and all(
+            v is None for v in (min_rating, max_rating, min_year, max_year, director)
+        ):
+            genres = Counter({g: bits.bit_count() for g, bits in genre_bits.items()})
+            decades = {d: bits.bit_count() for d, bits in self._decade_bits.items()}
+            directors = Counter(
+                {d: len(postings) for d, postings in self._director_index.items()}
+            )
+        else:
+            bits = self._genre_filter_bits(any_of, all_of, none_of)
+            if director is not None:
+                bits &= self._bits_from_ordinals(self._director_index.get(director, ()))
+            if bits and (min_rating is not None or max_rating is not None):
+                bits &= self._range_bits(
+                    self._rating_index,
+                    self._rating_key(min_rating, math.ceil),
+                    self._rating_key(max_rating, math.floor),
+                )
+            if bits and (min_year is not None or max_year is not None):
+                bits &= self._range_bits(self._year_index, min_year, max_year)
+
+            genres = Counter()
+            for genre, g_bits in genre_bits.items():
+                count = (bits & g_bits).bit_count()
+                if count:
+                    genres[genre] = count
+
+            decades = {}
+            for decade, d_bits in self._decade_bits.items():
+                count = (bits & d_bits).bit_count()
+                if count:
+                    decades[decade] = count
+
+            directors = Counter(
+                map(self._directors.__getitem__, self._ordinals_from_bits(bits))
+            )
+
+        return {
+            "genres": dict(genres.most_common()),
+            "decades": dict(sorted(decades.items())),
+            "directors": dict(directors.most_common(top_directors)),
+        }
+
+    def _range_bits(self, index: array, lo: Optional[int], hi: Optional[int]) -> int:
+        """Битсет ordinal'ов, чьи ключи в сортированном индексе в [lo, hi]."""
+        start, stop = self._index_bounds(index, lo, hi)
+        return self._bits_from_ordinals([key & ORDINAL_MASK for key in index[start:stop]])
+
+    @instrumented("MovieDB.search_titles")
+    @_reads_snapshot
+    def search_titles(
+        self, query: str, limit: int = 10, fuzzy: bool = True
+    ) -> List[Movie]:
+        """
+        Поиск по названию для автодополнения. Регистр, ё/е, пунктуация
+        и кавычки не важны. Порядок: названия, начинающиеся с запроса;
+        названия со словами, начинающимися со слов запроса; при fuzzy=True —
+        похожие по триграммам (опечатки), по убыванию сходства.
+        """
+        by_ordinal = self._by_ordinal
+        return [
+            by_ordinal[o] for o in self._get_title_index().find(query, limit, fuzzy)
+        ]
 
     # ---
     # СОРТИРОВКА
     # ---
 
+    @instrumented("MovieDB.sort_by_rating")
+    @_reads_snapshot
     def sort_by_rating(self, reverse: bool = True) -> List[Movie]:
-        return sorted(self.db, key=lambda m: m.rating, reverse=reverse)
+        return self._movies_from_index(self._rating_index, 0, None, reverse)
 
+    @instrumented("MovieDB.sort_by_year")
+    @_reads_snapshot
     def sort_by_year(self, reverse: bool = False) -> List[Movie]:
-        return sorted(self.db, key=lambda m: m.year, reverse=reverse)
+        return self._movies_from_index(self._year_index, 0, None, reverse)
+
+    @instrumented("MovieDB.find_in_range")
+    @_reads_snapshot
+    def find_in_range(
+        self,
+        min_rating: Optional[float] = None,
+        max_rating: Optional[float] = None,
+        min_year: Optional[int] = None,
+        max_year: Optional[int] = None,
+        order_by: str = "rating",
+        reverse: Optional[bool] = None,
+    ) -> List[Movie]:
+        """
+        Фильмы с рейтингом и годом в заданных границах (включительно),
+        упорядоченные по order_by ("rating" или "year").
+        По умолчанию рейтинг — по убыванию, год — по возрастанию.
+
+        Диапазон по полю order_by берётся из индекса бинарным поиском,
+        второе поле проверяется только у попавших в него фильмов.
+        """
+        if order_by == "rating":
+            index, keys = self._rating_index, self._year_keys
+            lo = self._rating_key(min_rating, math.ceil)
+            hi = self._rating_key(max_rating, math.floor)
+            other_lo, other_hi = min_year, max_year
+            if reverse is None:
+                reverse = True
+        elif order_by == "year":
+            index, keys = self._year_index, self._rating_keys
+            lo, hi = min_year, max_year
+            other_lo = self._rating_key(min_rating, math.ceil)
+            other_hi = self._rating_key(max_rating, math.floor)
+            if reverse is None:
+                reverse = False
+        else:
+            raise ValueError(f"Нельзя упорядочить по полю: {order_by}")
+
+        start, stop = self._index_bounds(index, lo, hi)
+
+        if other_lo is None and other_hi is None:
+            return self._movies_from_index(index, start, stop, reverse)
+
+        by_ordinal = self._by_ordinal
+        result = []
+        for key in self._slice(index, start, stop, reverse):
+            ordinal = key & ORDINAL_MASK
+            value = keys[ordinal]
+            if other_lo is not None and value < other_lo:
+                continue
+            if other_hi is not None and value > other_hi:
+                continue
+            result.append(by_ordinal[ordinal])
+        return result
+
+    @staticmethod
+    def _index_bounds(
+        index: array, lo: Optional[int], hi: Optional[int]
+    ) -> Tuple[int, Optional[int]]:
+        """Отрезок сортированного индекса с ключами в [lo, hi]."""
+        start = 0 if lo is None else bisect_left(index, lo << ORDINAL_BITS)
+        stop = (
+            None
+            if hi is None
+            else bisect_right(index, (hi << ORDINAL_BITS) | ORDINAL_MASK)
+        )
+        return start, stop
+
+    @staticmethod
+    def _rating_key(rating: Optional[float], rounding) -> Optional[int]:
+        """Граница по рейтингу в десятых; rounding — ceil для min, floor для max."""
+        if rating is None:
+            return None
+        if not math.isfinite(rating):
+            raise ValueError("Граница рейтинга должна быть конечным числом.")
+        # поправка на погрешность float: 7.3 * 10 == 72.99999999999999
+        return rounding(round(rating * 10, 6))
+
+    @staticmethod
+    def _slice(index: array, start: int, stop: Optional[int], reverse: bool):
+        part = index[start:stop]
+        return reversed(part) if reverse else part
+
+    def _movies_from_index(
+        self, index: array, start: int, stop: Optional[int], reverse: bool
+    ) -> List[Movie]:
+        by_ordinal = self._by_ordinal
+        return [
+            by_ordinal[key & ORDINAL_MASK]
+            for key in self._slice(index, start, stop, reverse)
+        ]
+
+    # ---
+    # ПОСТРАНИЧНЫЙ ОБХОД
+    # ---
+
+    @instrumented("MovieDB.page")
+    @_reads_snapshot
+    def page(
+        self,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        order_by: str = "id",
+        reverse: Optional[bool] = None,
+        **filters,
+    ) -> MoviePage:
+        """
+        Страница каталога: до limit фильмов и курсор следующей страницы.
+        order_by — "id", "rating" или "year" (по умолчанию рейтинг — по
+        убыванию, остальное — по возрастанию); filters — как у iter_movies.
+        Курсор запоминает ключ последнего фильма, поэтому добавления
+        и удаления между страницами не сдвигают выдачу.
+        """
+        if limit <= 0:
+            raise ValueError("Размер страницы должен быть положительным.")
+        if reverse is None:
+            reverse = PAGE_DEFAULT_REVERSE.get(order_by, False)
+        after = None if cursor is None else decode_cursor(cursor, order_by, reverse)
+
+        movies: List[Movie] = []
+        last_key = None
+        # берём на один больше — узнать, есть ли следующая страница
+        for key, movie in self._iter_keyed(order_by, reverse, after, filters):
+            if len(movies) == limit:
+                return MoviePage(
+                    movies, encode_cursor(order_by, reverse, last_key)
+                )
+            movies.append(movie)
+            last_key = key
+        return MoviePage(movies, None)
+
+    @_reads_snapshot
+    def iter_movies(
+        self,
+        order_by: str = "id",
+        reverse: Optional[bool] = None,
+        any_of: Optional[List[str]] = None,
+        all_of: Optional[List[str]] = None,
+        none_of: Optional[List[str]] = None,
+        min_rating: Optional[float] = None,
+        max_rating: Optional[float] = None,
+        min_year: Optional[int] = None,
+        max_year: Optional[int] = None,
+    ) -> Iterator[Movie]:
+        """
+        Ленивый обход каталога в порядке order_by с фильтрами по жанрам
+        (как find_by_genres) и границами (как find_in_range): фильмы
+        достаются из индекса порциями по мере чтения, первые n стоят O(n).
+        """
+        if reverse is None:
+            reverse = PAGE_DEFAULT_REVERSE.get(order_by, False)
+        filters = dict(
+            any_of=any_of,
+            all_of=all_of,
+            none_of=none_of,
+            min_rating=min_rating,
+            max_rating=max_rating,
+            min_year=min_year,
+            max_year=max_year,
+        )
+        for _, movie in self._iter_keyed(order_by, reverse, None, filters):
+            yield movie
+
+    def _iter_keyed(
+        self, order_by: str, reverse: bool, after: Optional[int], filters: dict
+    ) -> Iterator[Tuple[int, Movie]]:
+        """
+        (ключ индекса, фильм) после ключа after. Индекс читается порциями,
+        каждая ищется бинарным поиском от последнего выданного ключа —
+        изменения каталога между порциями обход не ломают.
+        """
+        masks = page_filter_masks(filters)
+        if masks is None:
+            return
+        any_mask, all_mask, none_mask = masks
+
+        rating_lo = self._rating_key(filters.get("min_rating"), math.ceil)
+        rating_hi = self._rating_key(filters.get("max_rating"), math.floor)
+        year_lo, year_hi = filters.get("min_year"), filters.get("max_year")
+
+        # границы ключей по полю обхода; второе поле проверяется у фильма
+        if order_by == "id":
+            index, lo, hi = self._id_index, None, None
+        elif order_by == "rating":
+            index = self._rating_index
+            lo = None if rating_lo is None else rating_lo << ORDINAL_BITS
+            hi = None if rating_hi is None else (rating_hi << ORDINAL_BITS) | ORDINAL_MASK
+        elif order_by == "year":
+            index = self._year_index
+            lo = None if year_lo is None else year_lo << ORDINAL_BITS
+            hi = None if year_hi is None else (year_hi << ORDINAL_BITS) | ORDINAL_MASK
+        else:
+            raise ValueError(f"Нельзя упорядочить по полю: {order_by}")
+
+        if after is not None:
+            if reverse:
+                hi = after - 1 if hi is None else min(hi, after - 1)
+            else:
+                lo = after + 1 if lo is None else max(lo, after + 1)
+
+        by_id, by_ordinal = self.by_id, self._by_ordinal
+        chunk = 64
+        while True:
+            if reverse:
+                stop = len(index) if hi is None else bisect_right(index, hi)
+                keys = index[max(0, stop - chunk) : stop][::-1]
+            else:
+                start = 0 if lo is None else bisect_left(index, lo)
+                keys = index[start : start + chunk]
+            if not keys:
+                return
+
+            for key in keys:
+                if reverse:
+                    if lo is not None and key < lo:
+                        return
+                    hi = key - 1
+                else:
+                    if hi is not None and key > hi:
+                        return
+                    lo = key + 1
+
+                if order_by == "id":
+                    movie = by_id.get(key)
+                else:
+                    movie = by_ordinal[key & ORDINAL_MASK]
+                if movie is None:
+                    continue  # удалён, пока обход стоял между порциями
+
+                mask = movie.genre_mask
+                if any_mask and not mask & any_mask:
+                    continue
+                if mask & all_mask != all_mask or mask & none_mask:
+                    continue
+                if rating_lo is not None or rating_hi is not None:
+                    rating = round(movie.rating * 10)
+                    if rating_lo is not None and rating < rating_lo:
+                        continue
+                    if rating_hi is not None and rating > rating_hi:
+                        continue
+                if year_lo is not None and movie.year < year_lo:
+                    continue
+                if year_hi is not None and movie.year > year_hi:
+                    continue
+                yield key, movie
+
+            chunk = min(chunk * 2, 4096)
 
     # ---
 
+    @_reads_snapshot
     def print_all(self):
         for m in self.db:
             print(m)
@@ -0,0 +1,272 @@
+import sys, os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import math
+from array import array
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Optional
+from core.entities.movie import Movie
+
+
+class StringPool:
+    """
+    Пул интернированных строк: одинаковые строки (например, режиссёры)
+    хранятся один раз, в колонке лежит только номер строки.
+    """
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._strings: List[str] = []
+
+    def add(self, value: str) -> int:
+        string_id = self._ids.get(value)
+        if string_id is None:
+            string_id = len(self._strings)
+            self._ids[value] = string_id
+            self._strings.append(value)
+        return string_id
+
+    def __getitem__(self, string_id: int) -> str:
+        return self._strings[string_id]
+
+    def __len__(self) -> int:
+        return len(self._strings)
+
+
+class TextColumn:
+    """
+    Колонка уникальных строк (названия): UTF-8 байты подряд в одном
+    bytearray и смещения строк — без отдельного str-объекта на запись.
+    Перезаписанная строка остаётся мусором в буфере до перезагрузки базы.
+    """
+
+    def __init__(self):
+        self._data = bytearray()
+        self._starts = array("Q")
+        self._ends = array("Q")
+
+    @classmethod
+    def from_blob(cls, offsets: array, blob) -> "TextColumn":
+        """Колонка из готового UTF-8 блока и n + 1 смещений (формат снапшота)."""
+        column = cls()
+        column._data = bytearray(blob)
+        column._starts = offsets[:-1]
+        column._ends = offsets[1:]
+        return column
+
+    def append(self, value: str):
+        self._starts.append(0)
+        self._ends.append(0)
+        self[len(self._starts) - 1] = value
+
+    def __setitem__(self, row: int, value: str):
+        encoded = value.encode("utf-8")
+        self._starts[row] = len(self._data)
+        self._data += encoded
+        self._ends[row] = len(self._data)
+
+    def __getitem__(self, row: int) -> str:
+        return self._data[self._starts[row]:self._ends[row]].decode("utf-8")
+
+
+class MovieTable:
+    """
+    Колоночное хранилище фильмов, адресуемое по ordinal'у MovieDB.
+    Числа лежат в array-колонках, жанры — битовой маской и порядком
+    (Movie.genres_to_order, общие bytes-объекты),
+    строки — в TextColumn/StringPool. Объект Movie создаётся
+    только при обращении к строке таблицы.
+    """
+
+    def __init__(self):
+        self.ids = array("q")
+        self.years = array("i")
+        self.ratings = array("H")  # рейтинг в десятых долях
+        self.genre_masks = array("I")
+        self.genre_orders: List[bytes] = []
+        self.directors = array("I")
+        self.alive = bytearray()
+
+        self._titles = TextColumn()
+        self._director_pool = StringPool()
+        self._live = 0
+
+    # ---
+    # ЗАПИСЬ
+    # ---
+
+    def append(self, movie: Movie):
+        """Добавляет строку в конец таблицы."""
+        self.ids.append(0)
+        self.years.append(0)
+        self.ratings.append(0)
+        self.genre_masks.append(0)
+        self.genre_orders.append(b"")
+        self.directors.append(0)
+        self.alive.append(0)
+        self._titles.append("")
+        self[len(self.ids) - 1] = movie
+
+    def __setitem__(self, ordinal: int, movie: Optional[Movie]):
+        """Записывает фильм в строку ordinal; None — помечает строку удалённой."""
+        was_alive = self.alive[ordinal]
+
+        if movie is None:
+            self.alive[ordinal] = 0
+            self._live -= was_alive
+            return
+
+        self.ids[ordinal] = movie.id
+        self.years[ordinal] = movie.year
+        self.ratings[ordinal] = round(movie.rating * 10)
+        self.genre_masks[ordinal] = movie.genre_mask
+        self.genre_orders[ordinal] = Movie.genres_to_order(movie.genres)
+        self.directors[ordinal] = self._director_pool.add(movie.director)
+        self._titles[ordinal] = movie.title
+        self.alive[ordinal] = 1
+        self._live += 1 - was_alive
+
+    def load_columns(
+        self,
+        ids: array,
+        years: array,
+        ratings: array,
+        genre_masks: array,
+        title_offsets: array,
+        title_blob,
+        director_refs: array,
+        directors: List[str],
+        genre_orders: List[bytes],
+    ):
+        """Заполняет пустую таблицу готовыми колонками (из снапшота)."""
+        count = len(ids)
+        self.ids = ids
+        self.years = years
+        self.ratings = ratings
+        self.genre_masks = genre_masks
+        # одинаковые порядки — один bytes-объект на всю колонку
+        shared: Dict[bytes, bytes] = {}
+        self.genre_orders = [shared.setdefault(order, order) for order in genre_orders]
+        self.directors = director_refs
+        self.alive = bytearray(b"\x01") * count
+        self._titles = TextColumn.from_blob(title_offsets, title_blob)
+        self._director_pool = StringPool()
+        for director in directors:
+            self._director_pool.add(director)
+        self._live = count
+
+    # ---
+    # ЧТЕНИЕ
+    # ---
+
+    def __getitem__(self, ordinal: int) -> Optional[Movie]:
+        """Материализует Movie из строки таблицы."""
+        if not self.alive[ordinal]:
+            return None
+        # колонки заполняются только из проверенных Movie — без повторной проверки
+        return Movie.trusted(
+            self.ids[ordinal],
+            self._titles[ordinal],
+            self.genre_masks[ordinal],
+            self.years[ordinal],
+            self.ratings[ordinal] / 10,
+            self._director_pool[self.directors[ordinal]],
+            self.genre_orders[ordinal],
+        )
+
+    def __len__(self) -> int:
+        """Количество строк, включая удалённые."""
+        return len(self.ids)
+
+    def title(self, ordinal: int) -> str:
+        return self._titles[ordinal]
+
+    def live_count(self) -> int:
+        return self._live
+
+    def ordinals(self) -> Iterator[int]:
+        """Ordinal'ы живых строк по порядку."""
+        alive = self.alive
+        i = alive.find(1)
+        while i != -1:
+            yield i
+            i = alive.find(1, i + 1)
+
+    def scan(
+        self,
+        genre_mask: int = 0,
+        min_rating: Optional[float] = None,
+        min_year: Optional[int] = None,
+        max_rating: Optional[float] = None,
+        max_year: Optional[int] = None,
+    ) -> List[int]:
+        """
+        Полный проход по колонкам без создания Movie.
+        Возвращает ordinal'ы строк, у которых есть хотя бы один жанр
+        из genre_mask (0 — любой), а рейтинг и год в заданных границах.
+        """
+        min_rating_key = (
+            -1 if min_rating is None else math.ceil(round(min_rating * 10, 6))
+        )
+        max_rating_key = (
+            100 if max_rating is None else math.floor(round(max_rating * 10, 6))
+        )
+        min_year = -(2 ** 31) if min_year is None else min_year
+        max_year = 2 ** 31 if max_year is None else max_year
+
+        return [
+            ordinal
+            for ordinal, (alive, mask, rating, year) in enumerate(
+                zip(self.alive, self.genre_masks, self.ratings, self.years)
+            )
+            if alive
+            and (not genre_mask or mask & genre_mask)
+            and min_rating_key <= rating <= max_rating_key
+            and min_year <= year <= max_year
+        ]
+
+
+class MovieTableView:
+    """Read-only последовательность живых фильмов таблицы (MovieDB.db)."""
+
+    def __init__(self, table: MovieTable):
+        self._table = table
+
+    @property
+    def table(self) -> MovieTable:
+        """Таблица под представлением — для колоночных проходов без Movie."""
+        return self._table
+
+    def __iter__(self) -> Iterator[Movie]:
+        table = self._table
+        for ordinal in table.ordinals():
+            yield table[ordinal]
+
+    def __len__(self) -> int:
+        return self._table.live_count()
+
+    def __repr__(self) -> str:
+        return f"MovieTableView(movies={len(self)})"
+
+
+class OrdinalMapping(Mapping):
+    """
+    Read-only индекс ключ -> Movie поверх словаря ключ -> ordinal:
+    хранит только номера строк, Movie создаётся при обращении.
+    """
+
+    def __init__(self, ordinals: Dict, table: MovieTable):
+        self._ordinals = ordinals
+        self._table = table
+
+    def __getitem__(self, key) -> Movie:
+        return self._table[self._ordinals[key]]
+
+    def __contains__(self, key) -> bool:
+        return key in self._ordinals
+
+    def __iter__(self):
+        return iter(self._ordinals)
+
+    def __len__(self) -> int:
+        return len(self._ordinals)
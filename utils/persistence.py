@@ -0,0 +1,143 @@
+import os
+import threading
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+
+@contextmanager
+def atomic_write(path: str, mode: str = "w", encoding: Optional[str] = "utf-8"):
+    """
+    Запись файла без риска испортить старую версию:
+
+        with atomic_write(path) as f:
+            f.write(...)
+
+    Данные пишутся во временный файл рядом с целевым, сбрасываются на диск
+    (fsync) и атомарно подменяют его через os.replace. При сбое или исключении
+    на месте остаётся прежний файл целиком.
+    """
+    if "b" in mode:
+        encoding = None
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    try:
+        with open(tmp_path, mode, encoding=encoding) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+    _fsync_dir(os.path.dirname(os.path.abspath(path)))
+
+
+def _fsync_dir(directory: str):
+    """Фиксирует на диске саму подмену файла (запись в каталоге)."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return  # Windows: каталог так не открыть
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class BackgroundFlusher:
+    """
+    Фоновый поток, сохраняющий базу не чаще раза в interval секунд.
+
+    mark_dirty() только ставит флаг и сразу возвращается; все пометки,
+    пришедшие за интервал, сливаются в один вызов write() в фоне.
+    flush() синхронно пишет накопленное, close() дописывает и
+    останавливает поток (вызывать при завершении работы).
+
+    Ошибка записи в фоне не теряет изменения: флаг снова поднимается
+    и запись повторяется через интервал; последняя ошибка — в last_error.
+    """
+
+    def __init__(self, write: Callable[[], None], interval: float = 1.0):
+        self._write = write
+        self._interval = interval
+
+        self._cond = threading.Condition()
+        self._dirty = False
+        self._closed = False
+        # запись из фонового потока и из flush() не должны идти одновременно
+        self._io_lock = threading.Lock()
+
+        self.writes = 0
+        self.last_error: Optional[BaseException] = None
+
+        self._thread = threading.Thread(
+            target=self._run, name="BackgroundFlusher", daemon=True
+        )
+        self._thread.start()
+
+    @property
+    def dirty(self) -> bool:
+        return self._dirty
+
+    def mark_dirty(self):
+        """Сообщает, что есть несохранённые изменения."""
+        with self._cond:
+            if self._closed:
+                raise ValueError("Фоновое сохранение уже остановлено.")
+            self._dirty = True
+            self._cond.notify()
+
+    def flush(self):
+        """Синхронно сохраняет изменения, если они есть. Ошибку пробрасывает."""
+        self._write_pending(raise_errors=True)
+
+    def close(self):
+        """Дописывает изменения и останавливает поток."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        self.flush()
+
+    # ---
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._dirty or self._closed)
+                if self._closed:
+                    return  # остаток допишет close()
+                # окно слияния: пометки за интервал дадут одну запись
+                self._cond.wait_for(lambda: self._closed, timeout=self._interval)
+                if self._closed:
+                    return
+            self._write_pending(raise_errors=False)
+
+    def _write_pending(self, raise_errors: bool):
+        with self._io_lock:
+            with self._cond:
+                if not self._dirty:
+                    return
+                self._dirty = False
+
+            try:
+                self._write()
+            except BaseException as e:
+                with self._cond:
+                    self._dirty = True
+                self.last_error = e
+                if raise_errors:
+                    raise
+                print(f"Ошибка фонового сохранения: {e}")
+                return
+
+            self.writes += 1
+            self.last_error = None
@@ -0,0 +1,326 @@
+import sys, os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import struct
+import zlib
+from array import array
+from typing import Iterable, List, NamedTuple, Tuple
+from core.entities.movie import Movie
+from utils.persistence import atomic_write
+
+# ---
+# ФОРМАТ
+# ---
+#
+# [заголовок][таблица секций][секции, выровненные по 8 байт]
+#
+# Заголовок: magic, версия формата, тип (фильмы/пользователи), число записей,
+# mtime_ns и размер исходного JSON (для проверки свежести), CRC32 всех секций,
+# число секций. Таблица секций — пары (смещение, длина).
+# Числа лежат колонками фиксированной ширины (little-endian), строки —
+# общим UTF-8 блоком и колонкой смещений (n + 1 значение).
+# Для фильмов есть ещё перестановки строк, отсортированные по id, названию,
+# рейтингу и году, — по ним mmap-режим ищет без построения индексов в памяти.
+# Жанры фильма — битовая маска и, если порядок жанров не совпадает
+# с allowed_genres, байты Movie.genres_to_order (тем же блоком со смещениями).
+
+MAGIC = b"FMSN"
+FORMAT_VERSION = 4
+
+KIND_MOVIES = 1
+KIND_USERS = 2
+
+_HEADER = struct.Struct("<4sHHQqQII")
+_SECTION = struct.Struct("<QQ")
+_ALIGN = 8
+
+# секции снапшота фильмов
+(
+    MOVIE_IDS,
+    MOVIE_YEARS,
+    MOVIE_RATINGS,
+    MOVIE_GENRES,
+    MOVIE_TITLE_OFFSETS,
+    MOVIE_TITLES,
+    MOVIE_DIRECTOR_REFS,
+    MOVIE_DIRECTOR_OFFSETS,
+    MOVIE_DIRECTORS,
+    MOVIE_ID_ORDER,
+    MOVIE_TITLE_ORDER,
+    MOVIE_RATING_ORDER,
+    MOVIE_YEAR_ORDER,
+    MOVIE_GENRE_ORDER_OFFSETS,
+    MOVIE_GENRE_ORDER,
+) = range(15)
+
+# секции снапшота пользователей
+(
+    USER_IDS,
+    USER_NAME_OFFSETS,
+    USER_NAMES,
+    USER_PASSWORD_OFFSETS,
+    USER_PASSWORDS,
+    USER_GENRE_OFFSETS,
+    USER_GENRES,
+    USER_NEXT_ID,
+) = range(8)
+
+# разделитель жанров пользователя в строке
+_GENRE_SEP = "\x1f"
+
+
+class SnapshotError(ValueError):
+    """Снапшот повреждён, другой версии или другого типа."""
+
+
+class Snapshot(NamedTuple):
+    count: int
+    source_mtime_ns: int
+    source_size: int
+    sections: List[memoryview]
+
+
+# ---
+# НИЗКИЙ УРОВЕНЬ
+# ---
+
+
+def pack_array(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def unpack_array(typecode: str, data) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def pack_strings(strings: Iterable[str]) -> Tuple[bytes, bytes]:
+    """Строки -> (колонка смещений, UTF-8 блок)."""
+    return pack_bytes(value.encode("utf-8") for value in strings)
+
+
+def pack_bytes(values: Iterable[bytes]) -> Tuple[bytes, bytes]:
+    """Байтовые строки -> (колонка смещений, общий блок)."""
+    offsets = array("Q", [0])
+    blob = bytearray()
+    for value in values:
+        blob += value
+        offsets.append(len(blob))
+    return pack_array(offsets), bytes(blob)
+
+
+def unpack_strings(offsets: array, blob) -> List[str]:
+    data = bytes(blob)
+    return [
+        data[offsets[i]:offsets[i + 1]].decode("utf-8")
+        for i in range(len(offsets) - 1)
+    ]
+
+
+def unpack_bytes(offsets: array, blob) -> List[bytes]:
+    data = bytes(blob)
+    return [data[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+
+
+def source_stamp(source_path: str) -> Tuple[int, int]:
+    """(mtime_ns, размер) исходного JSON; (0, 0), если файла нет."""
+    try:
+        st = os.stat(source_path)
+    except FileNotFoundError:
+        return 0, 0
+    return st.st_mtime_ns, st.st_size
+
+
+def write_snapshot(
+    path: str,
+    kind: int,
+    count: int,
+    source_path: str,
+    sections: List[bytes],
+) -> None:
+    """Пишет снапшот во временный файл и атомарно подменяет старый."""
+    table_size = _SECTION.size * len(sections)
+    offset = _aligned(_HEADER.size + table_size)
+
+    layout = []
+    crc = 0
+    for data in sections:
+        layout.append((offset, len(data)))
+        crc = zlib.crc32(data, crc)
+        offset = _aligned(offset + len(data))
+
+    mtime_ns, size = source_stamp(source_path)
+    header = _HEADER.pack(
+        MAGIC, FORMAT_VERSION, kind, count, mtime_ns, size, crc, len(sections)
+    )
+
+    with atomic_write(path, "wb") as f:
+        f.write(header)
+        for section_offset, length in layout:
+            f.write(_SECTION.pack(section_offset, length))
+        for (section_offset, _), data in zip(layout, sections):
+            f.write(b"\0" * (section_offset - f.tell()))
+            f.write(data)
+
+
+def read_snapshot(buffer, kind: int, verify: bool = True) -> Snapshot:
+    """
+    Разбирает снапшот из bytes/mmap. Секции возвращаются как memoryview
+    без копирования. verify=False пропускает CRC (для mmap-режима,
+    где читать весь файл при открытии не нужно).
+    """
+    view = memoryview(buffer)
+    if len(view) < _HEADER.size:
+        raise SnapshotError("Снапшот обрезан")
+
+    magic, version, file_kind, count, mtime_ns, size, crc, n_sections = (
+        _HEADER.unpack_from(view, 0)
+    )
+    if magic != MAGIC:
+        raise SnapshotError("Это не снапшот FilmManager")
+    if version != FORMAT_VERSION:
+        raise SnapshotError(f"Неподдерживаемая версия снапшота: {version}")
+    if file_kind != kind:
+        raise SnapshotError("Снапшот другого типа")
+
+    sections = []
+    actual_crc = 0
+    for i in range(n_sections):
+        offset, length = _SECTION.unpack_from(view, _HEADER.size + i * _SECTION.size)
+        if offset + length > len(view):
+            raise SnapshotError("Снапшот обрезан")
+        section = view[offset:offset + length]
+        if verify:
+            actual_crc = zlib.crc32(section, actual_crc)
+        sections.append(section)
+
+    if verify and actual_crc != crc:
+        raise SnapshotError("Контрольная сумма снапшота не совпадает")
+
+    return Snapshot(count, mtime_ns, size, sections)
+
+
+def is_fresh(snapshot_path: str, source_path: str) -> bool:
+    """Снапшот построен по текущей версии исходного JSON."""
+    try:
+        with open(snapshot_path, "rb") as f:
+            header = f.read(_HEADER.size)
+    except FileNotFoundError:
+        return False
+    if len(header) < _HEADER.size:
+        return False
+
+    magic, version, _, _, mtime_ns, size, _, _ = _HEADER.unpack(header)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        return False
+    return (mtime_ns, size) == source_stamp(source_path)
+
+
+def _aligned(offset: int) -> int:
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+# ---
+# ФИЛЬМЫ
+# ---
+
+
+def encode_movies(movies: List[Movie]) -> List[bytes]:
+    """Секции снапшота фильмов (порядок — константы MOVIE_*)."""
+    directors: dict = {}
+    director_refs = array("I")
+    for m in movies:
+        director_refs.append(directors.setdefault(m.director, len(directors)))
+
+    title_offsets, titles = pack_strings(m.title for m in movies)
+    director_offsets, director_blob = pack_strings(directors)
+    genre_order = Movie.genres_to_order
+    order_offsets, orders = pack_bytes(genre_order(m.genres) for m in movies)
+
+    rows = range(len(movies))
+    id_order = array("I", sorted(rows, key=lambda i: movies[i].id))
+    title_order = array("I", sorted(rows, key=lambda i: movies[i].title.lower()))
+    rating_order = array("I", sorted(rows, key=lambda i: movies[i].rating))
+    year_order = array("I", sorted(rows, key=lambda i: movies[i].year))
+
+    return [
+        pack_array(array("q", (m.id for m in movies))),
+        pack_array(array("i", (m.year for m in movies))),
+        pack_array(array("H", (round(m.rating * 10) for m in movies))),
+        pack_array(array("I", (m.genre_mask for m in movies))),
+        title_offsets,
+        titles,
+        pack_array(director_refs),
+        director_offsets,
+        director_blob,
+        pack_array(id_order),
+        pack_array(title_order),
+        pack_array(rating_order),
+        pack_array(year_order),
+        order_offsets,
+        orders,
+    ]
+
+
+def write_movie_snapshot(path: str, movies: List[Movie], source_path: str) -> None:
+    movies = list(movies)
+    write_snapshot(path, KIND_MOVIES, len(movies), source_path, encode_movies(movies))
+
+
+# ---
+# ПОЛЬЗОВАТЕЛИ
+# ---
+
+
+def write_user_snapshot(
+    path: str, records: List[dict], source_path: str, next_id: int
+) -> None:
+    """Снапшот пользователей из словарей формата User.to_dict."""
+    name_offsets, names = pack_strings(r["user_name"] for r in records)
+    password_offsets, passwords = pack_strings(r["password"] for r in records)
+    genre_offsets, genres = pack_strings(
+        _GENRE_SEP.join(r["genres"]) for r in records
+    )
+    sections = [
+        pack_array(array("q", (r["id"] for r in records))),
+        name_offsets,
+        names,
+        password_offsets,
+        passwords,
+        genre_offsets,
+        genres,
+        pack_array(array("q", [next_id])),
+    ]
+    write_snapshot(path, KIND_USERS, len(records), source_path, sections)
+
+
+def read_user_records(buffer) -> Tuple[List[dict], int]:
+    """
+    Словари пользователей (формат User.to_dict) из снапшота
+    и следующий свободный ID.
+    """
+    snap = read_snapshot(buffer, KIND_USERS)
+    s = snap.sections
+    ids = unpack_array("q", s[USER_IDS])
+    names = unpack_strings(unpack_array("Q", s[USER_NAME_OFFSETS]), s[USER_NAMES])
+    passwords = unpack_strings(
+        unpack_array("Q", s[USER_PASSWORD_OFFSETS]), s[USER_PASSWORDS]
+    )
+    genres = unpack_strings(unpack_array("Q", s[USER_GENRE_OFFSETS]), s[USER_GENRES])
+    next_id = unpack_array("q", s[USER_NEXT_ID])[0]
+    records = [
+        {
+            "id": ids[i],
+            "user_name": names[i],
+            "password": passwords[i],
+            "genres": genres[i].split(_GENRE_SEP) if genres[i] else [],
+        }
+        for i in range(snap.count)
+    ]
+    return records, next_id
@@ -0,0 +1,591 @@
+import sys, os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import json
+import math
+import sqlite3
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+from core.entities.movie import Movie
+from core.entities.user import User
+from utils.movie_db import (
+    PAGE_DEFAULT_REVERSE,
+    MovieDB,
+    MoviePage,
+    decode_cursor,
+    encode_cursor,
+    page_filter_masks,
+)
+
+# Альтернатива JSON-хранилищам: тот же публичный API, что у MovieDB и UserDB,
+# но данные живут в SQLite-файле. Каждое изменение — отдельная короткая
+# транзакция (или одна на блок transaction()), в памяти ничего не держится,
+# поиск и сортировка идут по индексам базы.
+
+_MOVIE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS movies (
+    id        INTEGER PRIMARY KEY,
+    title     TEXT    NOT NULL,
+    title_key TEXT    NOT NULL,  -- title.lower(): lower() SQLite не знает кириллицу
+    genres    TEXT    NOT NULL,  -- JSON-список в исходном порядке
+    year      INTEGER NOT NULL,
+    rating    INTEGER NOT NULL,  -- десятые доли: 7.5 -> 75
+    director  TEXT    NOT NULL
+);
+CREATE TABLE IF NOT EXISTS movie_genres (
+    genre    TEXT    NOT NULL,
+    movie_id INTEGER NOT NULL REFERENCES movies(id) ON DELETE CASCADE,
+    PRIMARY KEY (genre, movie_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS movie_genres_by_movie ON movie_genres(movie_id);
+CREATE INDEX IF NOT EXISTS movies_by_title ON movies(title_key);
+CREATE INDEX IF NOT EXISTS movies_by_rating ON movies(rating, id);
+CREATE INDEX IF NOT EXISTS movies_by_year ON movies(year, id);
+CREATE INDEX IF NOT EXISTS movies_by_director ON movies(director);
+"""
+
+_USER_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id        INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_name TEXT NOT NULL,
+    password  TEXT NOT NULL,
+    genres    TEXT NOT NULL  -- JSON-список
+);
+"""
+
+_MOVIE_COLUMNS = "id, title, genres, year, rating, director"
+
+# ключ курсора страницы для порядка по rating/year: (значение << 64) | (id + 2**63)
+# — одно целое, упорядоченное так же, как пара (значение, id)
+_CURSOR_ID_BITS = 64
+_CURSOR_ID_BIAS = 1 << 63
+
+
+def _connect(db_path: str, schema: str) -> sqlite3.Connection:
+    """
+    Соединение в autocommit-режиме: транзакциями управляем сами
+    (см. _SQLiteStore.transaction).
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(schema)
+    return conn
+
+
+class _SQLiteStore:
+    """Общее для обоих хранилищ: соединение и вложенные транзакции."""
+
+    def __init__(self, db_path: str, schema: str):
+        self._db_path = db_path
+        self._conn = _connect(db_path, schema)
+        self._depth = 0
+
+        # растёт при любом изменении через этот объект (для кешей поверх базы)
+        self.version = 0
+
+    @contextmanager
+    def transaction(self):
+        """
+        Пакетное изменение: всё внутри блока коммитится одним COMMIT,
+        при исключении — ROLLBACK. Вложенные блоки присоединяются к внешнему.
+        """
+        if self._depth:
+            self._depth += 1
+            try:
+                yield self
+            finally:
+                self._depth -= 1
+            return
+
+        self._conn.execute("BEGIN")
+        self._depth = 1
+        try:
+            yield self
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            print("Транзакция отменена.")
+            raise
+        finally:
+            self._depth = 0
+
+    def save(self):
+        """Изменения уже записаны; оставлено для совместимости с JSON-хранилищами."""
+        print(f"База сохранена в {self._db_path}")
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _Rows:
+    """
+    Ленивая последовательность строк таблицы (аналог списка .db у JSON-хранилищ):
+    len() — COUNT(*), итерация — курсором, без загрузки всей таблицы.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, sql: str, count_sql: str, make):
+        self._conn = conn
+        self._sql = sql
+        self._count_sql = count_sql
+        self._make = make
+
+    def __iter__(self) -> Iterator:
+        make = self._make
+        for row in self._conn.execute(self._sql):
+            yield make(row)
+
+    def __getitem__(self, index: int):
+        if index < 0:
+            index += len(self)
+        row = self._conn.execute(self._sql + " LIMIT 1 OFFSET ?", (index,)).fetchone()
+        if index < 0 or row is None:
+            raise IndexError(index)
+        return self._make(row)
+
+    def __len__(self) -> int:
+        return self._conn.execute(self._count_sql).fetchone()[0]
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+
+class SQLiteMovieDB(_SQLiteStore):
+    """
+    Хранилище фильмов в SQLite с API MovieDB.
+    Индексы: жанр (movie_genres), название, рейтинг, год.
+    """
+
+    def __init__(self, db_path: str):
+        super().__init__(db_path, _MOVIE_SCHEMA)
+        self.db = _Rows(
+            self._conn,
+            f"SELECT {_MOVIE_COLUMNS} FROM movies ORDER BY id",
+            "SELECT COUNT(*) FROM movies",
+            self._movie,
+        )
+        print(f"База загружена, фильмов: {len(self.db)}")
+
+    @classmethod
+    def from_json(cls, db_path: str, json_path: str) -> "SQLiteMovieDB":
+        """Создаёт (дополняет) SQLite-базу фильмами из JSON MovieDB."""
+        source = MovieDB(json_path)
+        target = cls(db_path)
+        with target.transaction():
+            for movie in source.db:
+                if target.get_by_id(movie.id) is None:
+                    target.add(movie)
+        return target
+
+    @staticmethod
+    def _movie(row) -> Movie:
+        movie_id, title, genres, year, rating, director = row
+        return Movie(movie_id, title, json.loads(genres), year, rating / 10, director)
+
+    @staticmethod
+    def _rating_key(rating: float) -> int:
+        return round(rating * 10)
+
+    def _query(self, where: str = "", params: tuple = (), order: str = "id") -> List[Movie]:
+        sql = f"SELECT {_MOVIE_COLUMNS} FROM movies"
+        if where:
+            sql += " WHERE " + where
+        sql += " ORDER BY " + order
+        return [self._movie(row) for row in self._conn.execute(sql, params)]
+
+    def __len__(self) -> int:
+        return len(self.db)
+
+    # ---
+    # ПУБЛИЧНЫЕ CRUD ОПЕРАЦИИ
+    # ---
+
+    def add(self, movie: Movie):
+        """Добавляет новый фильм."""
+        if self.get_by_id(movie.id) is not None:
+            raise ValueError("Фильм с таким ID уже существует.")
+
+        with self.transaction():
+            self._insert(movie)
+        self.version += 1
+
+    def delete(self, movie_id: int):
+        """Удаляет фильм по ID (жанры удаляются каскадом тем же запросом)."""
+        cur = self._conn.execute("DELETE FROM movies WHERE id = ?", (movie_id,))
+        if cur.rowcount == 0:
+            raise ValueError("Фильм с таким ID не найден.")
+        self.version += 1
+
+    def update(self, movie: Movie):
+        """Заменяет фильм с тем же ID."""
+        if self.get_by_id(movie.id) is None:
+            raise ValueError("Такого фильма нет, обновить нельзя.")
+
+        with self.transaction():
+            self._conn.execute("DELETE FROM movies WHERE id = ?", (movie.id,))
+            self._insert(movie)
+        self.version += 1
+
+    def _insert(self, movie: Movie):
+        genres = movie.genres
+        self._conn.execute(
+            "INSERT INTO movies (id, title, title_key, genres, year, rating, director)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                movie.id,
+                movie.title,
+                movie.title.lower(),
+                json.dumps(genres, ensure_ascii=False),
+                movie.year,
+                self._rating_key(movie.rating),
+                movie.director,
+            ),
+        )
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO movie_genres (genre, movie_id) VALUES (?, ?)",
+            [(genre, movie.id) for genre in genres],
+        )
+
+    # ---
+    # ПОИСК
+    # ---
+
+    def get_by_id(self, movie_id: int) -> Optional[Movie]:
+        found = self._query("id = ?", (movie_id,))
+        return found[0] if found else None
+
+    def get_by_title(self, title: str) -> Optional[Movie]:
+        found = self._query("title_key = ?", (title.lower(),))
+        return found[0] if found else None
+
+    def find_by_genre(self, genre: str) -> List[Movie]:
+        return self.find_by_genres(any_of=[genre])
+
+    def find_by_director(self, director: str) -> List[Movie]:
+        return self._query("director = ?", (director,))
+
+    def find_by_genres(
+        self,
+        any_of: Optional[List[str]] = None,
+        all_of: Optional[List[str]] = None,
+        none_of: Optional[List[str]] = None,
+    ) -> List[Movie]:
+        """Те же фильтры any_of / all_of / none_of, что у MovieDB.find_by_genres."""
+        where, params = self._where(any_of, all_of, none_of)
+        return self._query(where, params)
+
+    def _where(
+        self,
+        any_of: Optional[List[str]] = None,
+        all_of: Optional[List[str]] = None,
+        none_of: Optional[List[str]] = None,
+        min_rating: Optional[float] = None,
+        max_rating: Optional[float] = None,
+        min_year: Optional[int] = None,
+        max_year: Optional[int] = None,
+        director: Optional[str] = None,
+    ) -> Tuple[str, tuple]:
+        """Условие WHERE и параметры для фильтров поиска (пустое — без фильтра)."""
+        where, params = [], []
+
+        def genre_subquery(genres: List[str]) -> str:
+            params.extend(genres)
+            marks = ", ".join("?" * len(genres))
+            return f"SELECT movie_id FROM movie_genres WHERE genre IN ({marks})"
+
+        if any_of:
+            where.append(f"id IN ({genre_subquery(any_of)})")
+        if all_of:
+            unique = list(dict.fromkeys(all_of))
+            where.append(
+                f"id IN ({genre_subquery(unique)}"
+                f" GROUP BY movie_id HAVING COUNT(*) = {len(unique)})"
+            )
+        if none_of:
+            where.append(f"id NOT IN ({genre_subquery(none_of)})")
+        if min_rating is not None:
+            where.append("rating >= ?")
+            params.append(math.ceil(round(min_rating * 10, 6)))
+        if max_rating is not None:
+            where.append("rating <= ?")
+            params.append(math.floor(round(max_rating * 10, 6)))
+        if min_year is not None:
+            where.append("year >= ?")
+            params.append(min_year)
+        if max_year is not None:
+            where.append("year <= ?")
+            params.append(max_year)
+        if director is not None:
+            where.append("director = ?")
+            params.append(director)
+
+        return " AND ".join(where), tuple(params)
+
+    # ---
+    # ФАСЕТЫ
+    # ---
+
+    def facets(
+        self,
+        any_of: Optional[List[str]] = None,
+        all_of: Optional[List[str]] = None,
+        none_of: Optional[List[str]] = None,
+        min_rating: Optional[float] = None,
+        max_rating: Optional[float] = None,
+        min_year: Optional[int] = None,
+        max_year: Optional[int] = None,
+        director: Optional[str] = None,
+        top_directors: Optional[int] = None,
+    ) -> Dict[str, Dict]:
+        """
+        То же, что MovieDB.facets: три GROUP BY по фильмам, прошедшим фильтр.
+        Десятилетия складываются из счётчиков по годам в Python: деление
+        в SQLite округляет к нулю, а десятилетие отрицательного года — вниз.
+        """
+        where, params = self._where(
+            any_of, all_of, none_of, min_rating, max_rating, min_year, max_year, director
+        )
+        movies = "movies"
+        genre_rows = "SELECT genre, COUNT(*) FROM movie_genres"
+        if where:
+            movies += " WHERE " + where
+            genre_rows += f" WHERE movie_id IN (SELECT id FROM {movies})"
+        execute = self._conn.execute
+
+        genres = execute(
+            genre_rows + " GROUP BY genre ORDER BY COUNT(*) DESC, genre", params
+        ).fetchall()
+
+        decades: Dict[int, int] = {}
+        for year, count in execute(
+            f"SELECT year, COUNT(*) FROM {movies} GROUP BY year ORDER BY year", params
+        ):
+            decade = year // 10 * 10
+            decades[decade] = decades.get(decade, 0) + count
+
+        directors = execute(
+            f"SELECT director, COUNT(*) FROM {movies} GROUP BY director"
+            " ORDER BY COUNT(*) DESC, director LIMIT ?",
+            params + (-1 if top_directors is None else top_directors,),
+        ).fetchall()
+
+        return {
+            "genres": dict(genres),
+            "decades": decades,
+            "directors": dict(directors),
+        }
+
+    # ---
+    # СОРТИРОВКА
+    # ---
+
+    def sort_by_rating(self, reverse: bool = True) -> List[Movie]:
+        return self.find_in_range(order_by="rating", reverse=reverse)
+
+    def sort_by_year(self, reverse: bool = False) -> List[Movie]:
+        return self.find_in_range(order_by="year", reverse=reverse)
+
+    def find_in_range(
+        self,
+        min_rating: Optional[float] = None,
+        max_rating: Optional[float] = None,
+        min_year: Optional[int] = None,
+        max_year: Optional[int] = None,
+        order_by: str = "rating",
+        reverse: Optional[bool] = None,
+    ) -> List[Movie]:
+        """То же, что MovieDB.find_in_range, одним запросом по индексу."""
+        if order_by not in ("rating", "year"):
+            raise ValueError(f"Нельзя упорядочить по полю: {order_by}")
+        if reverse is None:
+            reverse = order_by == "rating"
+
+        where, params = self._where(
+            min_rating=min_rating, max_rating=max_rating, min_year=min_year, max_year=max_year
+        )
+
+        direction = "DESC" if reverse else "ASC"
+        order = f"{order_by} {direction}, id {direction}"
+        return self._query(where, params, order)
+
+    # ---
+    # ПОСТРАНИЧНЫЙ ОБХОД
+    # ---
+
+    def page(
+        self,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        order_by: str = "id",
+        reverse: Optional[bool] = None,
+        **filters,
+    ) -> MoviePage:
+        """
+        То же, что MovieDB.page, keyset-пагинацией: страница —
+        WHERE (поле, id) > (?, ?) ORDER BY поле, id LIMIT ? по индексу,
+        без OFFSET, поэтому дальние страницы не дороже первых.
+        """
+        if limit <= 0:
+            raise ValueError("Размер страницы должен быть положительным.")
+        if reverse is None:
+            reverse = PAGE_DEFAULT_REVERSE.get(order_by, False)
+        after = None if cursor is None else decode_cursor(cursor, order_by, reverse)
+
+        # берём на один больше — узнать, есть ли следующая страница
+        rows = self._keyed_rows(order_by, reverse, after, limit + 1, filters)
+        movies = [movie for _, movie in rows[:limit]]
+        if len(rows) > limit:
+            return MoviePage(movies, encode_cursor(order_by, reverse, rows[limit - 1][0]))
+        return MoviePage(movies, None)
+
+    def iter_movies(
+        self,
+        order_by: str = "id",
+        reverse: Optional[bool] = None,
+        **filters,
+    ) -> Iterator[Movie]:
+        """
+        То же, что MovieDB.iter_movies: читает порциями тем же keyset-запросом,
+        что и page(), курсор базы между порциями не держится.
+        """
+        if reverse is None:
+            reverse = PAGE_DEFAULT_REVERSE.get(order_by, False)
+        after, chunk = None, 64
+        while True:
+            rows = self._keyed_rows(order_by, reverse, after, chunk, filters)
+            for _, movie in rows:
+                yield movie
+            if len(rows) < chunk:
+                return
+            after = rows[-1][0]
+            chunk = min(chunk * 2, 4096)
+
+    def _keyed_rows(
+        self,
+        order_by: str,
+        reverse: bool,
+        after: Optional[int],
+        limit: int,
+        filters: dict,
+    ) -> List[Tuple[int, Movie]]:
+        """До limit пар (ключ курсора, фильм) после ключа after."""
+        if order_by not in ("id", "rating", "year"):
+            raise ValueError(f"Нельзя упорядочить по полю: {order_by}")
+        if page_filter_masks(filters) is None:
+            return []
+
+        where, params = self._where(**filters)
+        conditions = [where] if where else []
+        op, direction = ("<", "DESC") if reverse else (">", "ASC")
+        if order_by == "id":
+            order = f"id {direction}"
+            if after is not None:
+                conditions.append(f"id {op} ?")
+                params += (after,)
+        else:
+            order = f"{order_by} {direction}, id {direction}"
+            if after is not None:
+                conditions.append(f"({order_by}, id) {op} (?, ?)")
+                params += (
+                    after >> _CURSOR_ID_BITS,
+                    (after & ((1 << _CURSOR_ID_BITS) - 1)) - _CURSOR_ID_BIAS,
+                )
+
+        sql = f"SELECT {_MOVIE_COLUMNS} FROM movies"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += f" ORDER BY {order} LIMIT ?"
+
+        # колонка поля обхода в _MOVIE_COLUMNS
+        column = {"id": 0, "year": 3, "rating": 4}[order_by]
+        result = []
+        for row in self._conn.execute(sql, params + (limit,)):
+            if order_by == "id":
+                key = row[0]
+            else:
+                key = (row[column] << _CURSOR_ID_BITS) | (row[0] + _CURSOR_ID_BIAS)
+            result.append((key, self._movie(row)))
+        return result
+
+    def print_all(self):
+        for m in self.db:
+            print(m)
+
+
+class SQLiteUserDB(_SQLiteStore):
+    """
+    Хранилище пользователей в SQLite с API UserDB.
+    ID выдаёт сама база (AUTOINCREMENT), без просмотра всех пользователей.
+    """
+
+    def __init__(self, db_path: str):
+        super().__init__(db_path, _USER_SCHEMA)
+        self.db = _Rows(
+            self._conn,
+            "SELECT id, user_name, password, genres FROM users ORDER BY id",
+            "SELECT COUNT(*) FROM users",
+            self._user,
+        )
+        print(f"База загружена, пользователей: {len(self.db)}")
+
+    @staticmethod
+    def _user(row) -> User:
+        user_id, user_name, password, genres = row
+        return User.from_dict(
+            {
+                "id": user_id,
+                "user_name": user_name,
+                "password": password,
+                "genres": json.loads(genres),
+            }
+        )
+
+    def add_user(self, user: User) -> None:
+        """Добавляет пользователя; ID 0 — выдать новый."""
+        data = user.to_dict()
+        genres = json.dumps(data["genres"], ensure_ascii=False)
+
+        with self.transaction():
+            if user.id == 0:
+                cur = self._conn.execute(
+                    "INSERT INTO users (user_name, password, genres) VALUES (?, ?, ?)",
+                    (data["user_name"], data["password"], genres),
+                )
+                user.id = cur.lastrowid
+            else:
+                if self.get_user(user.id) is not None:
+                    print(f"Предупреждение: пользователь с ID {user.id} уже существует")
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO users (id, user_name, password, genres)"
+                    " VALUES (?, ?, ?, ?)",
+                    (user.id, data["user_name"], data["password"], genres),
+                )
+        self.version += 1
+
+    def delete_user(self, user_id: int) -> None:
+        """Удаляет пользователя по ID."""
+        cur = self._conn.execute("DELETE FROM users WHERE id = ?", (user_id,))
+        if cur.rowcount == 0:
+            raise ValueError("Пользователь с таким ID не найден.")
+        self.version += 1
+
+    def get_user(self, user_id: int) -> Optional[User]:
+        """Получить пользователя по ID."""
+        row = self._conn.execute(
+            "SELECT id, user_name, password, genres FROM users WHERE id = ?",
+            (user_id,),
+        ).fetchone()
+        return self._user(row) if row else None
+
+    def __len__(self) -> int:
+        """Количество пользователей."""
+        return len(self.db)
+
+    def __str__(self) -> str:
+        return f"SQLiteUserDB(users={len(self)}, path={self._db_path})"
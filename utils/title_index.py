@@ -0,0 +1,289 @@
+"""
+Индекс поиска по названиям фильмов: автодополнение и нечёткий поиск.
+
+Названия нормализуются (normalize_title): нижний регистр, ё -> е,
+пунктуация и кавычки («», „“, "") -> пробел. Три структуры над
+нормализованными названиями, все адресуются ordinal'ом фильма:
+
+  _prefixes — отсортированный список (название, ordinal): названия,
+              начинающиеся с запроса, лежат одним отрезком, который
+              находится бинарным поиском (плоское представление
+              префиксного дерева, по памяти дешевле словаря на узел);
+  _words    — отсортированный список слов и postings слово -> ordinal'ы:
+              совпадение с началом любого слова названия;
+  _trigrams — триграмма -> слова словаря, в которых она есть: поиск
+              с опечатками сначала находит похожие слова (сходство как
+              в pg_trgm), затем названия с ними. Словарь на порядок меньше
+              каталога, поэтому частые триграммы не тянут за собой
+              postings на весь каталог.
+"""
+import math
+import re
+from collections import Counter
+from array import array
+from bisect import bisect_left, insort
+from heapq import nsmallest
+from typing import Dict, Iterable, List, Set, Tuple
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+# минимальное сходство по триграммам для нечёткого поиска
+DEFAULT_THRESHOLD = 0.3
+
+
+def normalize_title(title: str) -> str:
+    """
+    Ключ названия для поиска: "«Ёлки» — 2" -> "елки 2".
+    """
+    return _NON_WORD.sub(" ", title.casefold().replace("ё", "е")).strip()
+
+
+def word_trigrams(word: str) -> Set[str]:
+    """
+    Триграммы слова, дополненного двумя пробелами слева и одним справа:
+    "кот" -> "  к", " ко", "кот", "от ".
+    """
+    padded = f"  {word} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class TitleIndex:
+    """
+    Поисковый индекс названий. Хранит только ordinal'ы — фильмы по ним
+    достаёт владелец индекса (MovieDB, MappedMovieDB).
+    """
+
+    def __init__(self):
+        self._titles: Dict[int, str] = {}
+        self._prefixes: List[Tuple[str, int]] = []
+        self._words: List[str] = []
+        self._word_postings: Dict[str, array] = {}
+        self._trigrams: Dict[str, List[str]] = {}
+
+    @classmethod
+    def build(cls, titles: Iterable[Tuple[int, str]]) -> "TitleIndex":
+        """
+        Строит индекс по парам (ordinal, название) за один проход.
+        При возрастающих ordinal'ах postings только дописываются,
+        сортировка списков — один раз в конце.
+        """
+        index = cls()
+        for ordinal, title in titles:
+            index._insert(ordinal, title, bulk=True)
+        index._prefixes.sort()
+        index._words = sorted(index._word_postings)
+        return index
+
+    def copy(self) -> "TitleIndex":
+        index = TitleIndex.__new__(TitleIndex)
+        index._titles = dict(self._titles)
+        index._prefixes = list(self._prefixes)
+        index._words = list(self._words)
+        index._word_postings = {
+            word: array("I", postings) for word, postings in self._word_postings.items()
+        }
+        index._trigrams = {gram: list(words) for gram, words in self._trigrams.items()}
+        return index
+
+    def __len__(self) -> int:
+        return len(self._titles)
+
+    # ---
+    # ИЗМЕНЕНИЯ
+    # ---
+
+    def add(self, ordinal: int, title: str):
+        self._insert(ordinal, title, bulk=False)
+
+    def remove(self, ordinal: int):
+        """
+        Снимает название с индекса. Берётся сохранённая нормализованная
+        форма, так что объект фильма могли изменить на месте.
+        """
+        normalized = self._titles.pop(ordinal, None)
+        if normalized is None:
+            return
+
+        i = bisect_left(self._prefixes, (normalized, ordinal))
+        if i < len(self._prefixes) and self._prefixes[i] == (normalized, ordinal):
+            del self._prefixes[i]
+
+        for word in set(normalized.split()):
+            postings = self._word_postings[word]
+            _discard(postings, ordinal)
+            if postings:
+                continue
+            # слово ушло из каталога — убираем его из словаря
+            del self._word_postings[word]
+            del self._words[bisect_left(self._words, word)]
+            for gram in word_trigrams(word):
+                words = self._trigrams[gram]
+                words.remove(word)
+                if not words:
+                    del self._trigrams[gram]
+
+    def _insert(self, ordinal: int, title: str, bulk: bool):
+        if ordinal in self._titles:
+            self.remove(ordinal)
+
+        normalized = normalize_title(title)
+        self._titles[ordinal] = normalized
+        if bulk:
+            self._prefixes.append((normalized, ordinal))
+        else:
+            insort(self._prefixes, (normalized, ordinal))
+
+        for word in set(normalized.split()):
+            postings = self._word_postings.get(word)
+            if postings is not None:
+                _append(postings, ordinal)
+                continue
+            # новое слово словаря
+            self._word_postings[word] = array("I", (ordinal,))
+            if not bulk:
+                insort(self._words, word)
+            for gram in word_trigrams(word):
+                words = self._trigrams.get(gram)
+                if words is None:
+                    self._trigrams[gram] = [word]
+                else:
+                    words.append(word)
+
+    # ---
+    # ПОИСК
+    # ---
+
+    def find(self, query: str, limit: int = 10, fuzzy: bool = True) -> List[int]:
+        """
+        Выдача для строки поиска: complete(), а если результатов меньше
+        limit и fuzzy=True — дополнение из search() (опечатки).
+        """
+        ordinals = self.complete(query, limit)
+        if fuzzy and len(ordinals) < limit:
+            seen = set(ordinals)
+            for ordinal, _ in self.search(query, limit + len(ordinals)):
+                if ordinal not in seen:
+                    ordinals.append(ordinal)
+                    if len(ordinals) == limit:
+                        break
+        return ordinals
+
+    def complete(self, query: str, limit: int = 10) -> List[int]:
+        """
+        Автодополнение: сначала названия, которые начинаются с запроса
+        (по алфавиту), затем те, где каждое слово запроса — начало
+        какого-то слова названия.
+        """
+        normalized = normalize_title(query)
+        if not normalized or limit <= 0:
+            return []
+
+        result: List[int] = []
+        prefixes = self._prefixes
+        i = bisect_left(prefixes, (normalized,))
+        while i < len(prefixes) and len(result) < limit:
+            title, ordinal = prefixes[i]
+            if not title.startswith(normalized):
+                break
+            result.append(ordinal)
+            i += 1
+        if len(result) == limit:
+            return result
+
+        # кандидаты — по самому длинному (обычно самому редкому) слову запроса,
+        # остальные слова проверяются по названию
+        query_words = normalized.split()
+        anchor = max(query_words, key=len)
+        others = list(query_words)
+        others.remove(anchor)
+        seen = set(result)
+        words = self._words
+        j = bisect_left(words, anchor)
+        while j < len(words) and words[j].startswith(anchor):
+            for ordinal in self._word_postings[words[j]]:
+                if ordinal in seen:
+                    continue
+                seen.add(ordinal)
+                title_words = self._titles[ordinal].split()
+                if all(any(t.startswith(w) for t in title_words) for w in others):
+                    result.append(ordinal)
+                    if len(result) == limit:
+                        return result
+            j += 1
+        return result
+
+    def similar_words(
+        self, word: str, threshold: float = DEFAULT_THRESHOLD
+    ) -> Dict[str, float]:
+        """Слова словаря, похожие на word по триграммам: слово -> сходство."""
+        grams = word_trigrams(word)
+        counts: Counter = Counter()
+        for gram in grams:
+            counts.update(self._trigrams.get(gram, ()))
+
+        # при сходстве >= threshold общих триграмм не меньше need
+        need = max(1, math.ceil(threshold * len(grams)))
+        result = {}
+        for candidate, shared in counts.items():
+            if shared < need:
+                continue
+            score = shared / (len(grams) + len(word_trigrams(candidate)) - shared)
+            if score >= threshold:
+                result[candidate] = score
+        return result
+
+    def search(
+        self, query: str, limit: int = 10, threshold: float = DEFAULT_THRESHOLD
+    ) -> List[Tuple[int, float]]:
+        """
+        Нечёткий поиск: (ordinal, оценка) по убыванию оценки.
+        Каждое слово запроса сопоставляется с похожими словами словаря
+        (опечатка оставляет большую часть триграмм общими, поэтому "матрца"
+        находит "матрица"); оценка названия — сумма лучших сходств слов
+        запроса, делённая на число слов в большем из двух.
+        """
+        query_words = normalize_title(query).split()
+        if not query_words or limit <= 0:
+            return []
+
+        matches = [self.similar_words(word, threshold) for word in query_words]
+
+        # кандидаты — названия с похожим на самое редкое слово запроса
+        postings = self._word_postings
+        anchor = min(
+            (m for m in matches if m),
+            key=lambda m: sum(len(postings[w]) for w in m),
+            default=None,
+        )
+        if anchor is None:
+            return []
+        candidates = set()
+        for word in anchor:
+            candidates.update(postings[word])
+
+        scored = []
+        for ordinal in candidates:
+            title_words = self._titles[ordinal].split()
+            total = 0.0
+            for match in matches:
+                total += max((match.get(w, 0.0) for w in title_words), default=0.0)
+            score = total / max(len(query_words), len(title_words))
+            scored.append((-score, len(title_words), ordinal))
+
+        return [(ordinal, -neg) for neg, _, ordinal in nsmallest(limit, scored)]
+
+
+def _append(postings: array, ordinal: int):
+    """Вставка с сохранением порядка; обычно ordinal новый — в конец."""
+    if not postings or postings[-1] < ordinal:
+        postings.append(ordinal)
+    else:
+        i = bisect_left(postings, ordinal)
+        if i == len(postings) or postings[i] != ordinal:
+            postings.insert(i, ordinal)
+
+
+def _discard(postings: array, ordinal: int):
+    i = bisect_left(postings, ordinal)
+    if i < len(postings) and postings[i] == ordinal:
+        del postings[i]
@@ -5,35 +5,103 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from pathlib import Path
 import json
-from typing import Dict, List, Optional
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
 from core.entities.user import User
+from utils.metrics import instrumented, metrics
+from utils.persistence import BackgroundFlusher, atomic_write
+from utils.snapshot import (
+    SnapshotError,
+    is_fresh,
+    read_user_records,
+    write_user_snapshot,
+)
 
 
 class UserDB:
     """
     Хранилище User'ов
     Работает с объектами User
+
+    flush_interval — save() только помечает базу изменённой, а запись идёт
+    в фоновом потоке не чаще раза в столько секунд; при завершении — close().
     """
 
-    def __init__(self, db_path: str) -> None:
+    def __init__(
+        self,
+        db_path: str,
+        snapshot: bool = False,
+        flush_interval: Optional[float] = None,
+    ) -> None:
         self._db_path = Path(db_path).absolute()
         self._db_path.parent.mkdir(parents=True, exist_ok=True)
 
-        self.db: List[User] = []  # список всех пользователей
-        self.by_id: Dict[int, User] = {}  # быстрый доступ по ID
+        # бинарный снапшот рядом с JSON (см. utils/snapshot.py)
+        self._snapshot_path = Path(str(self._db_path) + ".snap")
+        self._snapshot_enabled = snapshot
+
+        # пользователи по ID в порядке добавления
+        self.by_id: Dict[int, User] = {}
+        # следующий свободный ID: только растёт и сохраняется вместе с базой,
+        # поэтому при старте не нужно искать максимум
+        self._next_id = 1
+
+        # журнал отката открытой транзакции (None — транзакции нет)
+        self._undo: Optional[List[tuple]] = None
+        # порядок ID до первого удаления/замены в транзакции: откат
+        # возвращает пользователей на их места, а не в конец
+        self._order: Optional[List[int]] = None
+
+        # изменения и копирование базы для фонового сохранения
+        self._lock = threading.RLock()
 
         self.load_db()
 
+        self._flusher: Optional[BackgroundFlusher] = None
+        if flush_interval is not None:
+            self._flusher = BackgroundFlusher(self._save_in_background, flush_interval)
+
+    @property
+    def db(self) -> Iterable[User]:
+        """Все пользователи в порядке добавления (живое представление)."""
+        return self.by_id.values()
+
+    @instrumented("UserDB.load_db")
     def load_db(self) -> None:
         """
         Загрузка JSON и преобразование словаря в User объект.
+        Файл — {"next_id": N, "users": [...]}; старый формат (просто список)
+        тоже читается.
         """
         raw_data = []
+        next_id = 1
+        from_snapshot = False
+
+        if self._snapshot_enabled and is_fresh(
+            str(self._snapshot_path), str(self._db_path)
+        ):
+            try:
+                data = self._snapshot_path.read_bytes()
+                raw_data, next_id = read_user_records(data)
+                metrics.add_bytes("UserDB.load_db", read=len(data))
+                from_snapshot = True
+            except (OSError, SnapshotError) as e:
+                print(f"Снапшот не подошёл, читаю JSON: {e}")
 
-        if self._db_path.exists():
+        if from_snapshot:
+            print(f"Пользователи прочитаны из снапшота: {self._snapshot_path}")
+        elif self._db_path.exists():
             try:
                 with open(self._db_path, "r", encoding="utf-8") as f:
+                    if metrics.enabled:
+                        metrics.add_bytes(
+                            "UserDB.load_db", read=os.fstat(f.fileno()).st_size
+                        )
                     raw_data = json.load(f)
+                if isinstance(raw_data, dict):
+                    next_id = raw_data.get("next_id", 1)
+                    raw_data = raw_data.get("users", [])
             except json.JSONDecodeError as e:
                 print(f"Ошибка в JSON файле {self._db_path}: {e}")
                 print("Создаю пустую базу.")
@@ -42,8 +110,8 @@ class UserDB:
             print(f"База не найдена - создаю новую: {self._db_path}")
 
         # Очищаем текущие данные
-        self.db.clear()
         self.by_id.clear()
+        self._next_id = next_id
 
         # Загружаем данные
         loaded_count = 0
@@ -55,50 +123,203 @@ class UserDB:
             except Exception as e:
                 print(f"Пропущена запись: {item} ({e})")
 
+        if self._snapshot_enabled and not from_snapshot and self._db_path.exists():
+            self._write_snapshot()
+
         print(
             f"База загружена, пользователей: {len(self.db)} (успешно загружено: {loaded_count})"
         )
 
+    @instrumented("UserDB.save")
     def save(self) -> None:
         """Сохраняет всех пользователей в JSON файл."""
-        # Преобразуем всех пользователей в словари
-        data = [user.to_dict() for user in self.db]
+        if self._flusher is not None:
+            self._flusher.mark_dirty()
+            return
 
         try:
-            with open(self._db_path, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            self._write_files(self._collect())
             print(f"База сохранена в {self._db_path}")
         except Exception as e:
             print(f"Ошибка при сохранении базы: {e}")
 
-    def _add_to_memory(self, user: User) -> None:
-        """Добавляет пользователя в обе структуры данных."""
-        # Автоматически генерируем ID если он не задан
+    def flush(self) -> None:
+        """Дожидается записи на диск всех изменений."""
+        if self._flusher is not None:
+            self._flusher.flush()
+
+    def close(self) -> None:
+        """Дописывает изменения и останавливает фоновое сохранение."""
+        if self._flusher is not None:
+            self._flusher.close()
+
+    def _collect(self) -> dict:
+        """Состояние базы для записи (словари — копия, User можно менять дальше)."""
+        with self._lock:
+            return {
+                "next_id": self._next_id,
+                "users": [user.to_dict() for user in self.by_id.values()],
+            }
+
+    def _save_in_background(self) -> None:
+        self._write_files(self._collect())
+
+    def _write_files(self, data: dict) -> None:
+        """Атомарно пишет JSON и, если включён, бинарный снапшот."""
+        with atomic_write(str(self._db_path)) as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        if self._snapshot_enabled:
+            self._write_snapshot(data)
+
+        if metrics.enabled:
+            written = self._db_path.stat().st_size
+            if self._snapshot_enabled:
+                written += self._snapshot_path.stat().st_size
+            metrics.add_bytes("UserDB.save", written=written)
+
+    def _write_snapshot(self, data: Optional[dict] = None) -> None:
+        if data is None:
+            data = self._collect()
+        write_user_snapshot(
+            str(self._snapshot_path),
+            data["users"],
+            str(self._db_path),
+            data["next_id"],
+        )
+
+    def _add_to_memory(self, user: User) -> Optional[User]:
+        """
+        Добавляет пользователя в хранилище за O(1).
+        Возвращает вытесненного пользователя с тем же ID, если он был.
+        """
+        # Автоматически выдаём ID если он не задан
         if user.id == 0:
-            new_id = max(self.by_id.keys(), default=0) + 1
-            user.id = new_id
+            user.id = self._next_id
+        if user.id >= self._next_id:
+            self._next_id = user.id + 1
 
         # Проверяем уникальность ID
-        if user.id in self.by_id:
+        existing_user = self.by_id.pop(user.id, None)
+        if existing_user is not None:
             print(f"Предупреждение: пользователь с ID {user.id} уже существует")
-            # Удаляем старого пользователя с таким же ID
-            existing_user = self.by_id[user.id]
-            self.db.remove(existing_user)
 
-        self.db.append(user)
         self.by_id[user.id] = user
+        return existing_user
 
+    def _remove_from_memory(self, user: User) -> None:
+        """Удаляет пользователя из хранилища."""
+        self.by_id.pop(user.id, None)
+
+    @instrumented("UserDB.add_user")
     def add_user(self, user: User) -> None:
         """Публичный метод для добавления пользователя."""
-        self._add_to_memory(user)
+        with self._lock:
+            assigned_id = user.id == 0
+            if self._undo is not None:
+                self._remember_order(user.id)
+            replaced = self._add_to_memory(user)
+            if self._undo is not None:
+                self._undo.append(("add", user, replaced, assigned_id))
+
+    @instrumented("UserDB.add_users")
+    def add_users(self, users: Iterable[User]) -> int:
+        """
+        Добавляет пользователей пачкой (линейно по их числу).
+        Возвращает количество добавленных.
+        """
+        add_to_memory = self._add_to_memory
+        count = 0
+        with self._lock:
+            undo = self._undo
+            for user in users:
+                assigned_id = user.id == 0
+                if undo is not None:
+                    self._remember_order(user.id)
+                replaced = add_to_memory(user)
+                if undo is not None:
+                    undo.append(("add", user, replaced, assigned_id))
+                count += 1
+        return count
+
+    @instrumented("UserDB.delete_user")
+    def delete_user(self, user_id: int) -> None:
+        """Удаляет пользователя по ID."""
+        with self._lock:
+            user = self.by_id.get(user_id)
+            if user is None:
+                raise ValueError("Пользователь с таким ID не найден.")
+
+            if self._undo is not None:
+                self._remember_order(user_id)
+            self._remove_from_memory(user)
+            if self._undo is not None:
+                self._undo.append(("delete", user))
+
+    @contextmanager
+    def transaction(self):
+        """
+        Пакетное изменение базы: add_user/delete_user внутри блока
+        применяются к памяти сразу, а на диск пишутся один раз при выходе.
+        При исключении (в том числе при ошибке записи) изменения блока
+        откатываются.
+        """
+        with self._lock:
+            if self._undo is not None:
+                yield self
+                return
+
+            self._undo = []
+            try:
+                yield self
+                if self._undo:
+                    # не через save(): он глотает ошибки записи, а неудачная
+                    # запись должна откатить блок
+                    if self._flusher is not None:
+                        self._flusher.mark_dirty()
+                    else:
+                        self._write_files(self._collect())
+                        print(f"База сохранена в {self._db_path}")
+            except BaseException:
+                self._rollback()
+                raise
+            finally:
+                self._undo = None
+                self._order = None
+
+    def _remember_order(self, user_id: int) -> None:
+        """Запоминает порядок перед первой операцией, которая его меняет."""
+        if self._order is None and user_id in self.by_id:
+            self._order = list(self.by_id)
+
+    def _rollback(self) -> None:
+        """Отменяет в памяти все операции открытой транзакции."""
+        for entry in reversed(self._undo):
+            if entry[0] == "add":
+                _, user, replaced, assigned_id = entry
+                self._remove_from_memory(user)
+                if replaced is not None:
+                    self._add_to_memory(replaced)
+                if assigned_id:
+                    user.id = 0
+            else:
+                self._add_to_memory(entry[1])
+
+        if self._order is not None:
+            # пользователи, добавленные до снимка порядка, уже убраны
+            by_id = self.by_id
+            restored = {key: by_id[key] for key in self._order if key in by_id}
+            by_id.clear()
+            by_id.update(restored)
+        print(f"Транзакция отменена, операций: {len(self._undo)}")
 
+    @instrumented("UserDB.get_user")
     def get_user(self, user_id: int) -> Optional[User]:
         """Получить пользователя по ID."""
         return self.by_id.get(user_id)
 
     def __len__(self) -> int:
         """Количество пользователей."""
-        return len(self.db)
+        return len(self.by_id)
 
     def __str__(self) -> str:
         return f"UserDB(users={len(self)}, path={self._db_path})"